@@ -1,13 +1,28 @@
+import asyncio
+import codecs
+import contextlib
+import contextvars
+import copy
 import random
 import subprocess
 import json
 import re
 import os
+import queue
+import threading
+import time
 from typing import Optional
 from pathlib import Path
 from datetime import datetime
 from prompts import AvalonPrompts
 from game_logger import GameLogger
+from history_compressor import HistoryCompressor, TokenCounter
+from http_client import get_async_client, get_connection_pool
+from prefix_cache import PrefixKVCache, crop_cache
+from stream_parsers import ChoiceParser, SentenceParser, TeamParser, split_reasoning
+from generation_policy import DEFAULT_POLICY, StopScanner, action_context, is_reasoning_model, server_settings, thinks
+from structured_output import current_response_schema, response_schema_context, team_schema, validate_team
+from tracing import Tracer, trace_event
 
 class Player:
     """Represents a player in the Avalon game."""
@@ -96,13 +111,185 @@ class AvalonGame:
         return f"Mission Status: {good_wins} Success, {evil_wins} Fail | Rejections this round: {self.rejection_count}/5"
 
 
+class ModelResponse(str):
+    """
+    Text returned by a backend, plus whatever call metadata the server reported.
+
+    It is a plain str for all parsing purposes; `usage` holds token counts
+    (prompt_tokens, completion_tokens), `timings` holds durations in ms and
+    `reasoning` holds a reasoning model's thinking, kept out of the text.
+    """
+
+    def __new__(cls, text, usage=None, timings=None, reasoning=''):
+        response = super().__new__(cls, text)
+        response.usage = usage or {}
+        response.timings = timings or {}
+        response.reasoning = reasoning or ''
+        return response
+
+    @classmethod
+    def from_output(cls, text, usage=None, timings=None, reasoning=''):
+        """Build a response from raw model output, moving <think> blocks into `reasoning`."""
+        inline_reasoning, answer = split_reasoning(text)
+        reasoning = '\n\n'.join(part for part in (reasoning.strip(), inline_reasoning) if part)
+        return cls(answer, usage=usage, timings=timings, reasoning=reasoning)
+
+    def full_text(self):
+        """The text with its reasoning put back in front as a <think> block."""
+        if not self.reasoning:
+            return str(self)
+        return f"<think>\n{self.reasoning}\n</think>\n\n{self}"
+
+
 class BaseAI:
     """Base class for AI backends."""
 
+    # Per-phase max tokens / stop sequences / temperature; see generation_policy
+    generation_policy = DEFAULT_POLICY
+
     def call_model(self, prompt, max_retries=3):
         """Call the AI model. Must be implemented by subclasses."""
         raise NotImplementedError
 
+    async def acall_model(self, prompt, max_retries=3):
+        """
+        Async version of call_model.
+
+        Backends with a native async transport override this; the default
+        runs the blocking call_model in a worker thread.
+        """
+        return await asyncio.to_thread(self.call_model, prompt, max_retries)
+
+    def stream_model(self, prompt, max_retries=3):
+        """
+        Yield the response in pieces as the backend produces them.
+
+        Closing the generator early cancels generation where the backend
+        allows it. The last piece may be an empty ModelResponse that only
+        carries usage. The default yields the whole call_model response.
+        """
+        response = self.call_model(prompt, max_retries)
+        if response:
+            yield response
+
+    async def astream_model(self, prompt, max_retries=3):
+        """
+        Async version of stream_model.
+
+        Backends with only a blocking stream have it run in a worker thread;
+        otherwise the default yields the whole acall_model response.
+        """
+        if type(self).stream_model is not BaseAI.stream_model:
+            async for piece in _iterate_in_thread(lambda: self.stream_model(prompt, max_retries)):
+                yield piece
+            return
+
+        response = await self.acall_model(prompt, max_retries)
+        if response:
+            yield response
+
+    def stream_until(self, prompt, parser, max_retries=3):
+        """
+        Stream the response into `parser` and stop generating as soon as it
+        holds a final answer. Returns the text received, or None.
+        """
+        stream = self.stream_model(prompt, max_retries)
+        metadata, received = {}, []
+        try:
+            for piece in stream:
+                metadata = _response_metadata(piece) or metadata
+                received.append(piece)
+                if parser.feed(piece):
+                    break
+        finally:
+            stream.close()
+        parser.finish()
+        if not parser.text.strip():
+            return None
+        if not metadata.get('usage'):
+            metadata['usage'] = estimated_usage(prompt, ''.join(received))
+        return ModelResponse.from_output(parser.text, **metadata)
+
+    async def astream_until(self, prompt, parser, max_retries=3):
+        """Async version of stream_until."""
+        stream = self.astream_model(prompt, max_retries)
+        metadata, received = {}, []
+        try:
+            async for piece in stream:
+                metadata = _response_metadata(piece) or metadata
+                received.append(piece)
+                if parser.feed(piece):
+                    break
+        finally:
+            await stream.aclose()
+        parser.finish()
+        if not parser.text.strip():
+            return None
+        if not metadata.get('usage'):
+            metadata['usage'] = estimated_usage(prompt, ''.join(received))
+        return ModelResponse.from_output(parser.text, **metadata)
+
+    def choose(self, prompt, choices, max_retries=3):
+        """
+        Pick one of `choices` (vote labels, mission cards, player names).
+
+        The default streams a free-form answer, stops once it clearly names a
+        choice, and otherwise falls back to extract_choice; backends that can
+        score the choices directly override this. Returns None if no valid
+        choice was found. The choice carries the response's usage and reasoning.
+        """
+        parser = ChoiceParser(choices)
+        response = self.stream_until(prompt, parser, max_retries)
+        return _decision(parser.answer or self.extract_choice(response, choices), response)
+
+    async def achoose(self, prompt, choices, max_retries=3):
+        """Async version of choose."""
+        parser = ChoiceParser(choices)
+        response = await self.astream_until(prompt, parser, max_retries)
+        return _decision(parser.answer or self.extract_choice(response, choices), response)
+
+    def select_team(self, prompt, player_names, team_size, max_retries=3):
+        """
+        Answer a team-selection prompt with a comma-separated list of names.
+
+        The default streams an unconstrained answer and stops at the first
+        line listing a valid team, which is returned on its own; backends that
+        can restrict decoding to valid names override this.
+        """
+        parser = TeamParser(player_names, team_size)
+        response = self.stream_until(prompt, parser, max_retries)
+        return _team_answer(parser, response)
+
+    async def aselect_team(self, prompt, player_names, team_size, max_retries=3):
+        """Async version of select_team."""
+        parser = TeamParser(player_names, team_size)
+        response = await self.astream_until(prompt, parser, max_retries)
+        return _team_answer(parser, response)
+
+    def get_model_name(self):
+        """Model identifier used in logs and cache keys."""
+        return ''
+
+    def check_health(self):
+        """True if the backend can take calls right now (used by routers); assumed by default."""
+        return True
+
+    def get_generation_params(self):
+        """Settings besides the prompt that influence the response (for cache keys)."""
+        return {}
+
+    def phase_settings(self):
+        """Generation policy entry for the action currently being decided."""
+        return self.generation_policy.for_action()
+
+    def is_thinking(self):
+        """Whether the current call thinks before answering (the policy's think setting, else the model)."""
+        return thinks(self.phase_settings(), self.get_model_name())
+
+    def request_settings(self):
+        """Policy settings for the current phase that the server should enforce."""
+        return server_settings(self.phase_settings(), self.is_thinking())
+
     def extract_choice(self, response, valid_choices):
         """Extract a valid choice from AI response."""
         if not response:
@@ -124,6 +311,167 @@ class BaseAI:
         return None
 
 
+# Estimates token counts for calls whose server reported none
+_usage_counter = TokenCounter()
+
+
+def estimated_usage(prompt, text):
+    """
+    Usage of a call that ended without the server's counts (ollama run, or a
+    stream stopped before its final usage event), estimated from the prompt
+    and the text received, and marked as estimated.
+    """
+    return {'prompt_tokens': _usage_counter.count(prompt), 'completion_tokens': _usage_counter.count(text),
+            'estimated': True}
+
+
+def _response_metadata(piece):
+    """Usage/timings carried by a streamed piece, as ModelResponse keyword arguments."""
+    usage, timings = getattr(piece, 'usage', None), getattr(piece, 'timings', None)
+    if not usage and not timings:
+        return {}
+    return {'usage': usage, 'timings': timings}
+
+
+# Errors swallowed by backend retry loops, for middleware that decides on retries itself
+_call_errors = contextvars.ContextVar('avalon_call_errors', default=None)
+
+
+@contextlib.contextmanager
+def collect_backend_errors():
+    """
+    Collect the exceptions that backend calls made inside the block catch and log.
+
+    Errors are also passed on to an enclosing collector, so a decision still
+    sees the failed attempts a retrying wrapper handled.
+    """
+    errors = []
+    parent = _call_errors.get()
+    token = _call_errors.set(errors)
+    try:
+        yield errors
+    finally:
+        _call_errors.reset(token)
+        if parent is not None:
+            parent.extend(errors)
+
+
+_current_game = contextvars.ContextVar('avalon_game_id', default=None)
+
+
+def current_game():
+    """Id of the game whose decision is being made in this context, or None."""
+    return _current_game.get()
+
+
+@contextlib.contextmanager
+def game_context(game_id):
+    """Mark backend calls made inside the block as belonging to game `game_id`."""
+    token = _current_game.set(game_id)
+    try:
+        yield
+    finally:
+        _current_game.reset(token)
+
+
+def _report_error(error):
+    """Pass an error a backend handled itself on to collect_backend_errors, if active."""
+    errors = _call_errors.get()
+    if errors is not None:
+        errors.append(error)
+    trace_event('backend error', error=f"{type(error).__name__}: {error}")
+
+
+def _add_usage(first, second):
+    """Token counts of two calls added together."""
+    if not first or not second:
+        return first or second
+    return {key: first.get(key, 0) + second.get(key, 0) for key in set(first) | set(second)}
+
+
+def _decision(answer, response):
+    """`answer` as a ModelResponse carrying the usage and reasoning of the response it came from."""
+    if not answer or not isinstance(response, ModelResponse):
+        return answer
+    return ModelResponse(answer, usage=response.usage, timings=response.timings, reasoning=response.reasoning)
+
+
+def _team_answer(parser, response):
+    if parser.answer:
+        return _decision(parser.answer, response)
+    return response
+
+
+class _ReasoningTagger:
+    """
+    Put reasoning that a server streams in a separate field back inline as a
+    <think>...</think> block, so every stream carries it the same way.
+    """
+
+    def __init__(self):
+        self.open = False
+
+    def __call__(self, reasoning, text):
+        out = ''
+        if reasoning:
+            if not self.open:
+                out, self.open = '<think>', True
+            out += reasoning
+        if text and self.open:
+            out, self.open = out + '</think>', False
+        return out + text
+
+
+async def _iterate_in_thread(make_stream):
+    """
+    Consume a blocking generator in a worker thread, yielding its pieces on the
+    event loop. Closing this generator stops and closes the blocking one.
+    """
+    loop = asyncio.get_running_loop()
+    pieces = asyncio.Queue()
+    stop = threading.Event()
+    finished = object()
+
+    def pump():
+        stream = make_stream()
+        try:
+            for piece in stream:
+                if stop.is_set():
+                    break
+                loop.call_soon_threadsafe(pieces.put_nowait, piece)
+        except Exception as e:
+            loop.call_soon_threadsafe(pieces.put_nowait, e)
+        finally:
+            stream.close()
+            loop.call_soon_threadsafe(pieces.put_nowait, finished)
+
+    worker = asyncio.ensure_future(asyncio.to_thread(pump))
+    try:
+        while True:
+            piece = await pieces.get()
+            if piece is finished:
+                break
+            if isinstance(piece, Exception):
+                raise piece
+            yield piece
+    finally:
+        stop.set()
+        await worker
+
+
+def unwrap_ai(ai):
+    """Return the concrete backend behind wrapper layers (caches, limiters, ...)."""
+    while getattr(ai, 'inner', None) is not None:
+        ai = ai.inner
+    return ai
+
+
+def has_native_decisions(ai):
+    """True if the concrete backend behind `ai` overrides choose/select_team instead of parsing text."""
+    backend = type(unwrap_ai(ai))
+    return backend.choose is not BaseAI.choose or backend.select_team is not BaseAI.select_team
+
+
 class HumanPlayer(BaseAI):
     """Interface for a human player via Web UI."""
 
@@ -134,46 +482,453 @@ class HumanPlayer(BaseAI):
         """Should not be called directly for human players."""
         raise NotImplementedError("Human player input should be handled via input_handler")
 
+    async def acall_model(self, prompt, max_retries=3):
+        """Should not be called directly for human players."""
+        raise NotImplementedError("Human player input should be handled via input_handler")
+
 
 class OllamaAI(BaseAI):
-    """Interface to call models via Ollama."""
+    """
+    Interface to call models via Ollama.
+
+    `ollama run` takes no sampling options, so the generation policy's stop
+    sequences and token budget are applied client-side while streaming. Only
+    thinking (--think) and JSON output (--format json) can be switched.
+    """
 
-    def __init__(self, model_name='deepseek-r1'):
+    def __init__(self, model_name='deepseek-r1', generation_policy=None):
         self.model_name = model_name
+        self.generation_policy = generation_policy or DEFAULT_POLICY
+
+    def get_model_name(self):
+        return self.model_name
+
+    def get_generation_params(self):
+        params = self.phase_settings()
+        if current_response_schema():
+            params['format'] = 'json'
+        return params
+
+    def check_health(self):
+        """True if the local Ollama server answers `ollama list`."""
+        try:
+            return subprocess.run(['ollama', 'list'], capture_output=True, timeout=5).returncode == 0
+        except Exception:
+            return False
+
+    def _command(self, prompt):
+        command = ['ollama', 'run', self.model_name]
+        think = self.phase_settings().get('think')
+        if think is not None:
+            command.append(f"--think={'true' if think else 'false'}")
+        if current_response_schema():
+            command += ['--format', 'json']
+        return command + [prompt]
 
     def call_model(self, prompt, max_retries=3):
         """Call Ollama model."""
         for attempt in range(max_retries):
             try:
                 result = subprocess.run(
-                    ['ollama', 'run', self.model_name, prompt],
+                    self._command(prompt),
                     capture_output=True,
                     text=True,
                     timeout=60
                 )
 
-                response = result.stdout.strip()
+                # `ollama run` prints no token counts
+                response = ModelResponse.from_output(result.stdout, usage=estimated_usage(prompt, result.stdout))
+
+                if not response and not response.reasoning:
+                    print(f"  [Attempt {attempt + 1}] Empty response, retrying...")
+                    continue
+
+                return response
+
+            except subprocess.TimeoutExpired as e:
+                print(f"  [Attempt {attempt + 1}] Timeout, retrying...")
+                _report_error(e)
+                continue
+            except Exception as e:
+                print(f"  [Attempt {attempt + 1}] Error: {e}")
+                _report_error(e)
+                continue
+
+        return None
+
+    async def acall_model(self, prompt, max_retries=3):
+        """Call Ollama model without blocking the event loop."""
+        for attempt in range(max_retries):
+            process = None
+            try:
+                process = await asyncio.create_subprocess_exec(
+                    *self._command(prompt),
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE
+                )
+                stdout, _ = await asyncio.wait_for(process.communicate(), timeout=60)
+
+                output = stdout.decode('utf-8', errors='replace')
+                response = ModelResponse.from_output(output, usage=estimated_usage(prompt, output))
 
-                if not response:
+                if not response and not response.reasoning:
                     print(f"  [Attempt {attempt + 1}] Empty response, retrying...")
                     continue
 
                 return response
 
-            except subprocess.TimeoutExpired:
+            except asyncio.TimeoutError as e:
+                process.kill()
+                await process.wait()
                 print(f"  [Attempt {attempt + 1}] Timeout, retrying...")
+                _report_error(e)
                 continue
             except Exception as e:
                 print(f"  [Attempt {attempt + 1}] Error: {e}")
+                _report_error(e)
                 continue
 
         return None
 
+    def stream_model(self, prompt, max_retries=3):
+        """Stream `ollama run` output as it is printed; closing the generator kills the process."""
+        for attempt in range(max_retries):
+            try:
+                process = subprocess.Popen(
+                    self._command(prompt),
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.DEVNULL
+                )
+            except Exception as e:
+                print(f"  [Attempt {attempt + 1}] Error: {e}")
+                _report_error(e)
+                continue
+
+            timed_out = threading.Event()
+
+            def expire():
+                timed_out.set()
+                process.kill()
+
+            timer = threading.Timer(60, expire)
+            timer.start()
+            decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+            limit = StopScanner(self.phase_settings())
+            received = False
+            try:
+                while True:
+                    data = process.stdout.read1(4096)
+                    if not data:
+                        text = limit.flush()
+                        if text:
+                            received = True
+                            yield text
+                        break
+                    text, done = limit.feed(decoder.decode(data))
+                    if text:
+                        received = True
+                        yield text
+                    if done:
+                        break
+            finally:
+                timer.cancel()
+                if process.poll() is None:
+                    process.kill()
+                process.wait()
+
+            if received:
+                return
+            print(f"  [Attempt {attempt + 1}] {'Timeout' if timed_out.is_set() else 'Empty response'}, retrying...")
+            if timed_out.is_set():
+                _report_error(TimeoutError("no output within 60s"))
+
+    async def astream_model(self, prompt, max_retries=3):
+        """Stream `ollama run` output without blocking the event loop."""
+        loop = asyncio.get_running_loop()
+        for attempt in range(max_retries):
+            try:
+                process = await asyncio.create_subprocess_exec(
+                    *self._command(prompt),
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.DEVNULL
+                )
+            except Exception as e:
+                print(f"  [Attempt {attempt + 1}] Error: {e}")
+                _report_error(e)
+                continue
+
+            deadline = loop.time() + 60
+            decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+            limit = StopScanner(self.phase_settings())
+            received = timed_out = False
+            try:
+                while True:
+                    try:
+                        data = await asyncio.wait_for(process.stdout.read(4096), max(deadline - loop.time(), 0))
+                    except asyncio.TimeoutError:
+                        timed_out = True
+                        break
+                    if not data:
+                        text = limit.flush()
+                        if text:
+                            received = True
+                            yield text
+                        break
+                    text, done = limit.feed(decoder.decode(data))
+                    if text:
+                        received = True
+                        yield text
+                    if done:
+                        break
+            finally:
+                if process.returncode is None:
+                    process.kill()
+                await process.wait()
+
+            if received:
+                return
+            print(f"  [Attempt {attempt + 1}] {'Timeout' if timed_out else 'Empty response'}, retrying...")
+            if timed_out:
+                _report_error(TimeoutError("no output within 60s"))
+
+
+class OllamaHTTPAI(OllamaAI):
+    """
+    Interface to Ollama through its HTTP API.
+
+    Avoids forking `ollama run` per decision: requests go over pooled
+    keep-alive connections, the model can be kept loaded with `keep_alive`,
+    and the server's token counts and timings are attached to each response.
+    """
+
+    # Ollama reports durations in nanoseconds
+    TIMING_FIELDS = ['total_duration', 'load_duration', 'prompt_eval_duration', 'eval_duration']
+
+    def __init__(self, model_name='deepseek-r1', host=None, keep_alive='5m', options=None,
+                 endpoint='generate', pool_size=8, timeout=120, generation_policy=None):
+        """
+        Args:
+            model_name: Ollama model tag
+            host: Server URL (default: $OLLAMA_HOST or http://localhost:11434)
+            keep_alive: How long the server keeps the model loaded after a call
+            options: Ollama generation options, e.g. {'temperature': 0.7, 'num_predict': 256};
+                these take precedence over the generation policy
+            endpoint: 'generate' (raw prompt) or 'chat' (single user message)
+            pool_size: Idle keep-alive connections kept per host, by both the
+                sync pool and the async client; the first backend for a host decides
+            timeout: Per-request timeout in seconds
+            generation_policy: Per-phase GenerationPolicy (default: DEFAULT_POLICY)
+        """
+        super().__init__(model_name=model_name, generation_policy=generation_policy)
+        host = host or os.getenv('OLLAMA_HOST') or 'http://localhost:11434'
+        if '://' not in host:
+            host = 'http://' + host
+        if endpoint not in ('generate', 'chat'):
+            raise ValueError(f"Unknown Ollama endpoint: {endpoint}")
+
+        self.host = host.rstrip('/')
+        self.keep_alive = keep_alive
+        self.options = options or {}
+        self.endpoint = endpoint
+        self.timeout = timeout
+        self.url = f"{self.host}/api/{endpoint}"
+        self._pool = get_connection_pool(self.host, maxsize=pool_size)
+        get_async_client().set_pool_size(self.host, pool_size)
+
+    def get_generation_params(self):
+        params = {'endpoint': self.endpoint, 'options': self._options()}
+        settings = self.phase_settings()
+        if 'think' in settings:
+            params['think'] = settings['think']
+        if current_response_schema():
+            params['format'] = current_response_schema()
+        return params
+
+    def check_health(self):
+        """True if the server answers its model list."""
+        try:
+            self._pool.request('GET', f"{self.host}/api/tags", timeout=5)
+            return True
+        except Exception:
+            return False
+
+    def _options(self):
+        """Policy settings for the current phase as Ollama options, overridden by explicit options."""
+        settings = self.request_settings()
+        options = {}
+        if 'max_tokens' in settings:
+            options['num_predict'] = settings['max_tokens']
+        if settings.get('stop'):
+            options['stop'] = list(settings['stop'])
+        if 'temperature' in settings:
+            options['temperature'] = settings['temperature']
+        options.update(self.options)
+        return options
+
+    def _build_payload(self, prompt):
+        payload = {'model': self.model_name, 'stream': False, 'keep_alive': self.keep_alive}
+        if self.endpoint == 'chat':
+            payload['messages'] = [{'role': 'user', 'content': prompt}]
+        else:
+            payload['prompt'] = prompt
+        options = self._options()
+        if options:
+            payload['options'] = options
+        settings = self.phase_settings()
+        if 'think' in settings:
+            # With think set, the server returns the reasoning in a separate field
+            payload['think'] = settings['think']
+        if current_response_schema():
+            # Ollama constrains decoding to a JSON schema passed as the format
+            payload['format'] = current_response_schema()
+        return payload
+
+    def _result_text(self, result):
+        """(thinking, text) of a result or streamed chunk."""
+        message = result.get('message', {}) if self.endpoint == 'chat' else result
+        return message.get('thinking') or '', message.get('content' if self.endpoint == 'chat' else 'response', '')
+
+    def _parse_result(self, result):
+        thinking, text = self._result_text(result)
+
+        usage = {
+            'prompt_tokens': result.get('prompt_eval_count', 0),
+            'completion_tokens': result.get('eval_count', 0)
+        }
+        timings = {
+            field.replace('_duration', '_ms'): result[field] / 1e6
+            for field in self.TIMING_FIELDS if field in result
+        }
+        return ModelResponse.from_output(text, usage=usage, timings=timings, reasoning=thinking)
+
+    def call_model(self, prompt, max_retries=3):
+        """Call Ollama over HTTP."""
+        payload = self._build_payload(prompt)
+
+        for attempt in range(max_retries):
+            try:
+                response = self._parse_result(self._pool.post_json(self.url, payload, timeout=self.timeout))
+
+                if not response and not response.reasoning:
+                    print(f"  [Attempt {attempt + 1}] Empty response, retrying...")
+                    continue
+
+                return response
+
+            except Exception as e:
+                print(f"  [Attempt {attempt + 1}] Ollama HTTP Error: {e}")
+                _report_error(e)
+                continue
+
+        return None
+
+    async def acall_model(self, prompt, max_retries=3):
+        """Call Ollama over HTTP on the running event loop."""
+        payload = self._build_payload(prompt)
+
+        for attempt in range(max_retries):
+            try:
+                result = await get_async_client().post_json(self.url, payload, timeout=self.timeout)
+                response = self._parse_result(result)
+
+                if not response and not response.reasoning:
+                    print(f"  [Attempt {attempt + 1}] Empty response, retrying...")
+                    continue
+
+                return response
+
+            except Exception as e:
+                print(f"  [Attempt {attempt + 1}] Ollama HTTP Error: {e}")
+                _report_error(e)
+                continue
+
+        return None
+
+    def _stream_piece(self, line, tagger):
+        """
+        Text of one streamed NDJSON line, with thinking put inline by `tagger`;
+        the final line becomes a response carrying usage.
+        """
+        result = json.loads(line)
+        if result.get('error'):
+            raise RuntimeError(result['error'])
+        text = tagger(*self._result_text(result))
+        if result.get('done'):
+            final = self._parse_result(result)
+            return ModelResponse(text, usage=final.usage, timings=final.timings)
+        return text
+
+    def stream_model(self, prompt, max_retries=3):
+        """Stream from Ollama over HTTP; closing the generator drops the connection, which stops generation."""
+        payload = dict(self._build_payload(prompt), stream=True)
+
+        for attempt in range(max_retries):
+            received = False
+            tagger = _ReasoningTagger()
+            try:
+                with contextlib.closing(self._pool.post_json_stream(self.url, payload, timeout=self.timeout)) as lines:
+                    for line in lines:
+                        piece = self._stream_piece(line, tagger)
+                        received = received or bool(piece)
+                        yield piece
+                if received:
+                    return
+                print(f"  [Attempt {attempt + 1}] Empty response, retrying...")
+
+            except Exception as e:
+                print(f"  [Attempt {attempt + 1}] Ollama HTTP Error: {e}")
+                _report_error(e)
+                if received:
+                    return
+
+    async def astream_model(self, prompt, max_retries=3):
+        """Stream from Ollama over HTTP on the running event loop."""
+        payload = dict(self._build_payload(prompt), stream=True)
+
+        for attempt in range(max_retries):
+            received = False
+            tagger = _ReasoningTagger()
+            lines = get_async_client().post_json_stream(self.url, payload, timeout=self.timeout)
+            try:
+                async for line in lines:
+                    piece = self._stream_piece(line, tagger)
+                    received = received or bool(piece)
+                    yield piece
+                if received:
+                    return
+                print(f"  [Attempt {attempt + 1}] Empty response, retrying...")
+
+            except Exception as e:
+                print(f"  [Attempt {attempt + 1}] Ollama HTTP Error: {e}")
+                _report_error(e)
+                if received:
+                    return
+            finally:
+                await lines.aclose()
+
 
 class DeepSeekAPI(BaseAI):
     """Interface to call DeepSeek via API."""
 
-    def __init__(self, api_key=None, model='deepseek-chat'):
+    DEFAULT_BASE_URL = 'https://api.deepseek.com/v1'
+
+    # Non-thinking model -> the same model with thinking on, for the policy's `think` setting
+    THINKING_VARIANTS = {'deepseek-chat': 'deepseek-reasoner'}
+
+    def __init__(self, api_key=None, model='deepseek-chat', base_url=None, pool_size=8, timeout=30,
+                 generation_policy=None):
+        """
+        Args:
+            api_key: API key; falls back to .env.local, then $DEEPSEEK_API_KEY
+            model: Model name sent with each request
+            base_url: API root (e.g. https://api.deepseek.com/v1) or the full
+                chat completions URL (default: $DEEPSEEK_BASE_URL or the DeepSeek API)
+            pool_size: Idle keep-alive connections kept per host, by both the
+                sync pool and the async client; shared by every backend
+                instance talking to that host, and the first one decides
+            timeout: Per-request timeout in seconds
+            generation_policy: Per-phase GenerationPolicy (default: DEFAULT_POLICY)
+        """
         # Try to load API key from: 1) parameter, 2) .env.local file, 3) environment variable
         if api_key:
             self.api_key = api_key
@@ -181,7 +936,20 @@ class DeepSeekAPI(BaseAI):
             self.api_key = self._load_api_key_from_env_file() or os.getenv('DEEPSEEK_API_KEY')
 
         self.model = model
-        self.base_url = 'https://api.deepseek.com/v1/chat/completions'
+        self.temperature = 0.7
+        self.timeout = timeout
+        self.generation_policy = generation_policy or DEFAULT_POLICY
+        self.base_url = self._completions_url(base_url or os.getenv('DEEPSEEK_BASE_URL') or self.DEFAULT_BASE_URL)
+        self._pool = get_connection_pool(self.base_url, maxsize=pool_size)
+        get_async_client().set_pool_size(self.base_url, pool_size)
+
+    @staticmethod
+    def _completions_url(base_url):
+        """Accept either an API root or the full chat completions endpoint."""
+        base_url = base_url.rstrip('/')
+        if base_url.endswith('/chat/completions'):
+            return base_url
+        return base_url + '/chat/completions'
 
     def _load_api_key_from_env_file(self):
         """Load API key from .env.local file."""
@@ -203,62 +971,365 @@ class DeepSeekAPI(BaseAI):
                 print(f"  [Warning] Could not read .env.local: {e}")
         return None
 
-    def call_model(self, prompt, max_retries=3):
-        """Call DeepSeek API."""
+    def get_model_name(self):
+        return self.model
+
+    def get_generation_params(self):
+        return self._request_params()
+
+    def _request_params(self):
+        """Everything sent with a request besides the messages."""
+        return dict(self._sampling_params(), **self._thinking_params(), **self._response_format())
+
+    def _response_format(self):
+        # DeepSeek supports JSON mode but not schemas; the prompt spells out the shape
+        return {'response_format': {'type': 'json_object'}} if current_response_schema() else {}
+
+    def _thinking_params(self):
+        """Request fields that switch thinking on or off for the current phase."""
+        think = self.phase_settings().get('think')
+        if think is None:
+            return {}
+        if think:
+            return {'model': self.THINKING_VARIANTS.get(self.model, self.model)}
+        non_thinking = {thinking: plain for plain, thinking in self.THINKING_VARIANTS.items()}
+        return {'model': non_thinking.get(self.model, self.model)}
+
+    def is_thinking(self):
+        # The think setting picks the model; the model decides
+        return is_reasoning_model(self._thinking_params().get('model', self.model))
+
+    def _sampling_params(self):
+        """temperature / max_tokens / stop for the current phase (the policy overrides self.temperature)."""
+        settings = self.request_settings()
+        params = {'temperature': settings.get('temperature', self.temperature)}
+        if 'max_tokens' in settings:
+            params['max_tokens'] = settings['max_tokens']
+        if settings.get('stop'):
+            # The OpenAI API accepts at most four stop sequences
+            params['stop'] = list(settings['stop'])[:4]
+        return params
+
+    def check_health(self):
+        """True if the API accepts our key (its model list answers)."""
+        models_url = self.base_url[:-len('/chat/completions')] + '/models'
+        try:
+            self._pool.request('GET', models_url, headers=self._build_headers(), timeout=5)
+            return True
+        except Exception:
+            return False
+
+    def _check_api_key(self):
         if not self.api_key:
             print("  [Error] DeepSeek API key not found")
-            return None
+            return False
+        return True
 
-        headers = {
-            'Content-Type': 'application/json',
-            'Authorization': f'Bearer {self.api_key}'
-        }
+    def _build_headers(self):
+        return {'Authorization': f'Bearer {self.api_key}'} if self.api_key else {}
 
-        data = {
+    def _build_payload(self, prompt):
+        return dict({
             'model': self.model,
             'messages': [
                 {'role': 'user', 'content': prompt}
-            ],
-            'temperature': 0.7
-        }
+            ]
+        }, **self._request_params())
+
+    def _parse_result(self, result):
+        usage = result.get('usage') or {}
+        message = result['choices'][0]['message']
+        return ModelResponse.from_output(
+            message.get('content') or '',
+            usage={
+                'prompt_tokens': usage.get('prompt_tokens', 0),
+                'completion_tokens': usage.get('completion_tokens', 0)
+            },
+            # deepseek-reasoner (and vLLM's reasoning parsers) return the thinking separately
+            reasoning=message.get('reasoning_content') or ''
+        )
+
+    def call_model(self, prompt, max_retries=3):
+        """Call DeepSeek API."""
+        if not self._check_api_key():
+            return None
+
+        headers = self._build_headers()
+        data = self._build_payload(prompt)
 
         for attempt in range(max_retries):
             try:
-                import urllib.request
-                req = urllib.request.Request(
-                    self.base_url,
-                    data=json.dumps(data).encode('utf-8'),
-                    headers=headers
-                )
+                result = self._pool.post_json(self.base_url, data, headers, timeout=self.timeout)
+                return self._parse_result(result)
 
-                with urllib.request.urlopen(req, timeout=30) as response:
-                    result = json.loads(response.read().decode('utf-8'))
-                    return result['choices'][0]['message']['content'].strip()
+            except Exception as e:
+                print(f"  [Attempt {attempt + 1}] API Error: {e}")
+                _report_error(e)
+                continue
+
+        return None
+
+    async def acall_model(self, prompt, max_retries=3):
+        """Call DeepSeek API on the running event loop."""
+        if not self._check_api_key():
+            return None
+
+        headers = self._build_headers()
+        data = self._build_payload(prompt)
+
+        for attempt in range(max_retries):
+            try:
+                result = await get_async_client().post_json(self.base_url, data, headers, timeout=self.timeout)
+                return self._parse_result(result)
 
             except Exception as e:
                 print(f"  [Attempt {attempt + 1}] API Error: {e}")
+                _report_error(e)
                 continue
 
         return None
 
+    def _build_stream_payload(self, prompt):
+        return dict(self._build_payload(prompt), stream=True, stream_options={'include_usage': True})
 
-class LocalModelAI(BaseAI):
-    """Interface for local models (placeholder for transformers/vllm)."""
+    @staticmethod
+    def _stream_piece(line, tagger):
+        """
+        Text of one server-sent event, or None for events without any.
+
+        reasoning_content deltas are put inline by `tagger`. The usage event
+        sent before [DONE] becomes a response carrying usage.
+        """
+        if not line.startswith(b'data:'):
+            return None
+        data = line[5:].strip()
+        if data == b'[DONE]':
+            return None
+
+        event = json.loads(data)
+        choices = event.get('choices') or []
+        delta = (choices[0].get('delta') or {}) if choices else {}
+        text = tagger(delta.get('reasoning_content') or '', delta.get('content') or '')
+        usage = event.get('usage')
+        if usage:
+            return ModelResponse(text, usage={
+                'prompt_tokens': usage.get('prompt_tokens', 0),
+                'completion_tokens': usage.get('completion_tokens', 0)
+            })
+        return text
+
+    def stream_model(self, prompt, max_retries=3):
+        """Stream from the API; closing the generator drops the connection, which stops generation."""
+        if not self._check_api_key():
+            return
+
+        headers = self._build_headers()
+        data = self._build_stream_payload(prompt)
+
+        for attempt in range(max_retries):
+            received = False
+            tagger = _ReasoningTagger()
+            try:
+                with contextlib.closing(self._pool.post_json_stream(self.base_url, data, headers, timeout=self.timeout)) as lines:
+                    for line in lines:
+                        piece = self._stream_piece(line, tagger)
+                        if piece is not None:
+                            received = True
+                            yield piece
+                return
 
-    def __init__(self, model_path, backend='transformers'):
+            except Exception as e:
+                print(f"  [Attempt {attempt + 1}] API Error: {e}")
+                _report_error(e)
+                if received:
+                    return
+
+    async def astream_model(self, prompt, max_retries=3):
+        """Stream from the API on the running event loop."""
+        if not self._check_api_key():
+            return
+
+        headers = self._build_headers()
+        data = self._build_stream_payload(prompt)
+
+        for attempt in range(max_retries):
+            received = False
+            tagger = _ReasoningTagger()
+            lines = get_async_client().post_json_stream(self.base_url, data, headers, timeout=self.timeout)
+            try:
+                async for line in lines:
+                    piece = self._stream_piece(line, tagger)
+                    if piece is not None:
+                        received = True
+                        yield piece
+                return
+
+            except Exception as e:
+                print(f"  [Attempt {attempt + 1}] API Error: {e}")
+                _report_error(e)
+                if received:
+                    return
+            finally:
+                await lines.aclose()
+
+
+class OpenAICompatibleAI(DeepSeekAPI):
+    """
+    Interface to any OpenAI-compatible chat completions server.
+
+    Works with self-hosted servers (vLLM, llama.cpp, LM Studio, Ollama's /v1)
+    as well as hosted APIs. Shares DeepSeekAPI's pooled keep-alive transport.
+    """
+
+    def __init__(self, base_url, model, api_key=None, api_key_env='OPENAI_API_KEY',
+                 temperature=0.7, pool_size=8, timeout=60, generation_policy=None, think_field=None):
+        """
+        Args:
+            base_url: API root such as http://localhost:8000/v1
+            model: Model name the server expects
+            api_key: Bearer token; local servers usually need none
+            api_key_env: Environment variable consulted when api_key is omitted
+            temperature: Sampling temperature for phases the policy leaves unset
+            pool_size: Idle keep-alive connections kept per host, by both the
+                sync pool and the async client; the first backend for a host decides
+            timeout: Per-request timeout in seconds
+            generation_policy: Per-phase GenerationPolicy (default: DEFAULT_POLICY)
+            think_field: Chat template flag that switches thinking, e.g.
+                'enable_thinking' for Qwen3 on vLLM/SGLang; the policy's
+                `think` setting is sent as chat_template_kwargs={think_field: ...}.
+                None leaves thinking to the server.
+        """
+        self.api_key = api_key or (os.getenv(api_key_env) if api_key_env else None)
+        self.model = model
+        self.temperature = temperature
+        self.timeout = timeout
+        self.generation_policy = generation_policy or DEFAULT_POLICY
+        self.think_field = think_field
+        self.base_url = self._completions_url(base_url)
+        self._pool = get_connection_pool(self.base_url, maxsize=pool_size)
+        get_async_client().set_pool_size(self.base_url, pool_size)
+
+    def get_generation_params(self):
+        # Different servers may serve different weights under the same name
+        return dict(self._request_params(), base_url=self.base_url)
+
+    def _response_format(self):
+        schema = current_response_schema()
+        if not schema:
+            return {}
+        return {'response_format': {'type': 'json_schema', 'json_schema': {'name': 'avalon_decision', 'schema': schema}}}
+
+    def _thinking_params(self):
+        think = self.phase_settings().get('think')
+        if think is None or not self.think_field:
+            return {}
+        return {'chat_template_kwargs': {self.think_field: bool(think)}}
+
+    def is_thinking(self):
+        if self.think_field:
+            return thinks(self.phase_settings(), self.model)
+        return is_reasoning_model(self.model)
+
+    def _check_api_key(self):
+        # Authentication is optional for self-hosted servers
+        return True
+
+
+class _GenerationRequest:
+    """A prompt waiting in LocalModelAI's batching queue, to generate from or to score choices for."""
+
+    def __init__(self, prompt, generate_kwargs, choices=None):
+        self.prompt = prompt
+        self.generate_kwargs = generate_kwargs
+        self.choices = choices
+        self.response = None
+        self.done = threading.Event()
+
+
+class LocalModelAI(BaseAI):
+    """
+    Interface for local models (placeholder for transformers/vllm).
+
+    Concurrent calls (e.g. the six simultaneous votes) are collected by a
+    background worker and run as one left-padded batch, through generate()
+    or, for choose(), through one scoring forward pass.
+    Single-prompt calls reuse the key/values of earlier prompts that share a
+    token prefix (the rules and public timeline), so only the new tail of
+    the prompt is encoded.
+    """
+
+    def __init__(self, model_path, backend='transformers', max_batch_size=8, batch_wait_ms=20,
+                 prefix_cache_mb=512, generation_policy=None):
+        """
+        Args:
+            model_path: Local path or Hugging Face model id
+            backend: Inference backend; only 'transformers' is supported
+            max_batch_size: Upper bound on prompts per generate() call;
+                1 disables batching
+            batch_wait_ms: How long the worker waits for more prompts after
+                the first one arrives
+            prefix_cache_mb: Memory cap for cached prompt key/values;
+                0 disables prefix reuse
+            generation_policy: Per-phase GenerationPolicy (default: DEFAULT_POLICY);
+                max_new_tokens and temperature apply where it is silent
+        """
         self.model_path = model_path
         self.backend = backend
         self.model = None
         self.tokenizer = None
+        self.max_new_tokens = 100
+        # Used instead while the model thinks, since the policy's budget then goes unsent
+        self.thinking_max_new_tokens = 2048
+        self.temperature = 0.7
+        self.generation_policy = generation_policy or DEFAULT_POLICY
+        self.max_batch_size = max(1, max_batch_size)
+        self.batch_wait_ms = batch_wait_ms
+        # Current batch limit; shrinks on out-of-memory and grows back on success
+        self._batch_limit = self.max_batch_size
+        self._batch_successes = 0
+        self._queue = queue.Queue()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+        # One instance may be shared by several players; generate() is not re-entrant
+        self._generate_lock = threading.Lock()
+        self.prefix_cache = PrefixKVCache(max_bytes=prefix_cache_mb * 1024 ** 2) if prefix_cache_mb else None
         self._load_model()
 
+    def get_model_name(self):
+        return self.model_path
+
+    def get_generation_params(self):
+        params = {k: v for k, v in self._generation_kwargs().items() if k != 'tokenizer'}
+        return dict(params, do_sample=True)
+
+    def is_thinking(self):
+        # Raw prompts have no thinking switch, so the model decides
+        return is_reasoning_model(self.model_path)
+
+    def _generation_kwargs(self):
+        """generate() arguments for the current phase of the generation policy."""
+        thinking = self.is_thinking()
+        settings = server_settings(self.phase_settings(), thinking)
+        kwargs = {
+            'max_new_tokens': settings.get('max_tokens', self.thinking_max_new_tokens if thinking else self.max_new_tokens),
+            'temperature': settings.get('temperature', self.temperature)
+        }
+        if settings.get('stop'):
+            # generate() needs the tokenizer to match stop strings across token boundaries
+            kwargs['stop_strings'] = list(settings['stop'])
+            kwargs['tokenizer'] = self.tokenizer
+        return kwargs
+
     def _load_model(self):
         """Load the local model."""
         if self.backend == 'transformers':
             try:
                 from transformers import AutoModelForCausalLM, AutoTokenizer
                 print(f"Loading model from {self.model_path}...")
-                self.tokenizer = AutoTokenizer.from_pretrained(self.model_path)
+                # Left padding keeps every prompt flush against its generated tokens
+                self.tokenizer = AutoTokenizer.from_pretrained(self.model_path, padding_side='left')
+                if self.tokenizer.pad_token is None:
+                    self.tokenizer.pad_token = self.tokenizer.eos_token
                 self.model = AutoModelForCausalLM.from_pretrained(
                     self.model_path,
                     device_map='auto',
@@ -273,46 +1344,434 @@ class LocalModelAI(BaseAI):
             print(f"  [Error] Backend '{self.backend}' not supported")
 
     def call_model(self, prompt, max_retries=3):
-        """Call local model."""
+        """Call local model, sharing a batch with any concurrent callers."""
         if not self.model or not self.tokenizer:
             return None
+        return self._submit(_GenerationRequest(prompt, self._generation_kwargs()))
+
+    def _submit(self, request):
+        """Answer a request through the batching worker (or directly, if batching is off)."""
+        if self.max_batch_size == 1:
+            return self._run_batch([request])[0]
+
+        self._ensure_worker()
+        self._queue.put(request)
+        request.done.wait()
+        return request.response
+
+    def _ensure_worker(self):
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._batch_worker, daemon=True)
+                self._worker.start()
+
+    def _collect_batch(self):
+        """Block for one request, then gather more until the batch is full or the wait expires."""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.batch_wait_ms / 1000
+        while len(batch) < self._batch_limit:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=max(remaining, 0)) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _batch_worker(self):
+        while True:
+            # Requests from different phases need different generate() settings;
+            # choice scoring is batched by number of choices
+            groups = {}
+            for request in self._collect_batch():
+                if request.choices is not None:
+                    key = ('choices', len(request.choices))
+                else:
+                    key = tuple(sorted((k, repr(v)) for k, v in request.generate_kwargs.items() if k != 'tokenizer'))
+                groups.setdefault(key, []).append(request)
+
+            for batch in groups.values():
+                responses = self._generate_adaptive(batch)
+                for request, response in zip(batch, responses):
+                    request.response = response
+                    request.done.set()
+
+    def _run_batch(self, requests, raise_oom=False):
+        """Answer requests that share their settings in one batch."""
+        prompts = [request.prompt for request in requests]
+        if requests[0].choices is not None:
+            return self._score_choices(prompts, [request.choices for request in requests], raise_oom=raise_oom)
+        return self._generate_batch(prompts, raise_oom=raise_oom, **requests[0].generate_kwargs)
+
+    def _generate_adaptive(self, requests):
+        """Run a batch, halving the batch limit and splitting on out-of-memory."""
+        try:
+            responses = self._run_batch(requests, raise_oom=True)
+        except MemoryError:
+            if len(requests) == 1:
+                print("  [Error] Generation failed: out of memory for a single prompt")
+                return [None]
+            self._batch_limit = max(1, len(requests) // 2)
+            self._batch_successes = 0
+            print(f"  [Batch] Out of memory at batch size {len(requests)}, reducing to {self._batch_limit}")
+            half = len(requests) // 2
+            return self._generate_adaptive(requests[:half]) + self._generate_adaptive(requests[half:])
+
+        # Probe larger batches again after a run of successful full batches
+        if len(requests) >= self._batch_limit:
+            self._batch_successes += 1
+            if self._batch_successes >= 10 and self._batch_limit < self.max_batch_size:
+                self._batch_limit += 1
+                self._batch_successes = 0
+        return responses
+
+    def _generate_batch(self, prompts, raise_oom=False, **generate_kwargs):
+        """
+        Run one generate() call over left-padded prompts; returns one response per prompt.
 
+        Extra keyword arguments are passed on to generate() and override the
+        instance's sampling settings.
+        """
+        # Padded rows would misalign a shared prefix, so only lone prompts use the prefix cache
+        use_prefix_cache = self.prefix_cache is not None and len(prompts) == 1
+        cached_tokens = 0
         try:
-            inputs = self.tokenizer(prompt, return_tensors='pt').to(self.model.device)
-            outputs = self.model.generate(
-                **inputs,
-                max_new_tokens=100,
-                temperature=0.7,
-                do_sample=True,
-                pad_token_id=self.tokenizer.eos_token_id
-            )
-            response = self.tokenizer.decode(outputs[0][inputs['input_ids'].shape[1]:], skip_special_tokens=True)
-            return response.strip()
+            with self._generate_lock:
+                inputs = self.tokenizer(prompts, return_tensors='pt', padding=True).to(self.model.device)
+                generate_kwargs = dict({
+                    'max_new_tokens': self.max_new_tokens,
+                    'temperature': self.temperature,
+                    'do_sample': True,
+                    'pad_token_id': self.tokenizer.pad_token_id
+                }, **generate_kwargs)
+                if use_prefix_cache:
+                    prompt_ids = inputs['input_ids'][0].tolist()
+                    past_key_values, cached_tokens = self.prefix_cache.lookup(prompt_ids)
+                    if past_key_values is not None:
+                        generate_kwargs['past_key_values'] = past_key_values
+
+                outputs = self.model.generate(**inputs, return_dict_in_generate=True, **generate_kwargs)
+
+                if use_prefix_cache and outputs.past_key_values is not None:
+                    crop_cache(outputs.past_key_values, len(prompt_ids))
+                    self.prefix_cache.store(prompt_ids, outputs.past_key_values)
         except Exception as e:
+            if raise_oom and 'out of memory' in str(e).lower():
+                raise MemoryError(str(e)) from e
             print(f"  [Error] Generation failed: {e}")
+            return [None] * len(prompts)
+
+        prompt_length = inputs['input_ids'].shape[1]
+        prompt_tokens = inputs['attention_mask'].sum(dim=1).tolist()
+        stop_strings = generate_kwargs.get('stop_strings') or []
+        responses = []
+        for row, generated in enumerate(outputs.sequences[:, prompt_length:]):
+            completion_tokens = int((generated != self.tokenizer.pad_token_id).sum())
+            text = self.tokenizer.decode(generated, skip_special_tokens=True)
+            # Like the API backends, leave the stop sequence itself out
+            for stop in stop_strings:
+                text = text.split(stop, 1)[0]
+            usage = {'prompt_tokens': int(prompt_tokens[row]), 'completion_tokens': completion_tokens}
+            if use_prefix_cache:
+                usage['cached_tokens'] = cached_tokens
+            responses.append(ModelResponse.from_output(text, usage=usage))
+        return responses
+
+    def stream_model(self, prompt, max_retries=3):
+        """
+        Stream generated text as it is decoded.
+
+        Generation runs in its own thread, outside the batching queue: the
+        engine streams only turns taken one at a time (discussion), while
+        simultaneous decisions go through choose() and select_team().
+        Closing the generator stops it at the next token.
+        """
+        if not self.model or not self.tokenizer:
+            return
+
+        from transformers import TextIteratorStreamer
+
+        streamer = TextIteratorStreamer(self.tokenizer, skip_prompt=True, skip_special_tokens=True)
+        stop = threading.Event()
+        result = {}
+        generate_kwargs = self._generation_kwargs()
+        # generate() stops after a stop string but the streamer has already emitted it,
+        # and while thinking the stop strings are only checked here, after </think>
+        stop_filter = StopScanner({'stop': self.phase_settings().get('stop', [])})
+
+        def generate():
+            try:
+                result['response'] = self._generate_batch(
+                    [prompt], streamer=streamer, stopping_criteria=self._stop_when_set(stop), **generate_kwargs
+                )[0]
+            finally:
+                # Unblocks the consumer even if generate() failed before streaming
+                streamer.end()
+
+        worker = threading.Thread(target=generate, daemon=True)
+        worker.start()
+        try:
+            for text in streamer:
+                text, done = stop_filter.feed(text)
+                if text:
+                    yield text
+                if done:
+                    break
+            else:
+                text = stop_filter.flush()
+                if text:
+                    yield text
+        finally:
+            stop.set()
+            worker.join()
+
+        response = result.get('response')
+        if response is not None:
+            yield ModelResponse('', usage=response.usage)
+
+    @staticmethod
+    def _stop_when_set(event):
+        """Stopping criteria that end generate() once `event` is set."""
+        import torch
+        from transformers import StoppingCriteria, StoppingCriteriaList
+
+        class StopOnEvent(StoppingCriteria):
+            def __call__(self, input_ids, scores, **kwargs):
+                return torch.full((input_ids.shape[0],), event.is_set(), dtype=torch.bool, device=input_ids.device)
+
+        return StoppingCriteriaList([StopOnEvent()])
+
+    def choose(self, prompt, choices, max_retries=3):
+        """
+        Pick the choice the model finds most likely as the prompt's continuation.
+
+        Nothing is sampled: each choice is scored by its summed token
+        log-probability (see _score_choices). Concurrent calls, such as the
+        simultaneous votes, are scored together by the batching worker.
+        """
+        if not self.model or not self.tokenizer or not choices:
             return None
+        return self._submit(_GenerationRequest(prompt, None, choices=list(choices)))
 
+    async def achoose(self, prompt, choices, max_retries=3):
+        return await asyncio.to_thread(self.choose, prompt, choices, max_retries)
 
-class GameController:
-    """Controls the game flow with AI players."""
+    def _score_choices(self, prompts, choice_lists, raise_oom=False):
+        """
+        Best choice for each prompt, with the same number of choices per prompt,
+        as a ModelResponse carrying the prompt's token usage (nothing is generated).
+
+        A lone prompt is encoded on top of the prefix cache; several prompts
+        are left-padded and encoded in one forward pass (padding would
+        misalign a shared prefix). First tokens are scored from the logits
+        after each prompt; the rest of multi-token choices in one more pass
+        over the prompts' key/values, repeated once per choice.
+        """
+        import torch
+
+        count = len(choice_lists[0])
+        choice_ids = [[self.tokenizer.encode(' ' + choice, add_special_tokens=False) for choice in choices]
+                      for choices in choice_lists]
+        try:
+            with self._generate_lock, torch.no_grad():
+                device = self.model.device
+                if len(prompts) == 1:
+                    prompt_ids = self.tokenizer(prompts[0], return_tensors='pt')['input_ids'][0].tolist()
+                    last_logits, past_key_values, cached_tokens = self._encode_prompt(prompt_ids)
+                    last_logits = last_logits.unsqueeze(0)
+                    prompt_mask = torch.ones(1, len(prompt_ids), dtype=torch.long, device=device)
+                    usages = [{'prompt_tokens': len(prompt_ids), 'completion_tokens': 0}]
+                    if self.prefix_cache is not None:
+                        usages[0]['cached_tokens'] = cached_tokens
+                else:
+                    inputs = self.tokenizer(prompts, return_tensors='pt', padding=True).to(device)
+                    prompt_mask = inputs['attention_mask']
+                    outputs = self.model(
+                        input_ids=inputs['input_ids'], attention_mask=prompt_mask,
+                        position_ids=(prompt_mask.cumsum(dim=1) - 1).clamp(min=0), use_cache=True
+                    )
+                    last_logits, past_key_values = outputs.logits[:, -1], outputs.past_key_values
+                    usages = [{'prompt_tokens': int(length), 'completion_tokens': 0}
+                              for length in prompt_mask.sum(dim=1).tolist()]
+
+                first_logprobs = torch.log_softmax(last_logits.float(), dim=-1)
+                scores = [[float(first_logprobs[row, ids[0]]) for ids in row_ids]
+                          for row, row_ids in enumerate(choice_ids)]
+
+                # Choices longer than one token need their remaining tokens scored too
+                flat_ids = [ids for row_ids in choice_ids for ids in row_ids]
+                longest = max(len(ids) for ids in flat_ids)
+                if longest > 1:
+                    pad_id = self.tokenizer.pad_token_id
+                    input_ids = torch.tensor([ids + [pad_id] * (longest - len(ids)) for ids in flat_ids], device=device)
+                    attention_mask = torch.cat([
+                        prompt_mask.repeat_interleave(count, dim=0),
+                        torch.tensor([[1] * len(ids) + [0] * (longest - len(ids)) for ids in flat_ids], device=device)
+                    ], dim=1)
+                    prompt_lengths = prompt_mask.sum(dim=1).repeat_interleave(count)
+                    past_key_values.batch_repeat_interleave(count)
+                    logprobs = torch.log_softmax(
+                        self.model(input_ids=input_ids, attention_mask=attention_mask,
+                                   position_ids=prompt_lengths.unsqueeze(1) + torch.arange(longest, device=device),
+                                   past_key_values=past_key_values).logits.float(),
+                        dim=-1
+                    )
+                    for row, row_ids in enumerate(choice_ids):
+                        for col, ids in enumerate(row_ids):
+                            flat_row = row * count + col
+                            scores[row][col] += sum(float(logprobs[flat_row, pos - 1, ids[pos]])
+                                                    for pos in range(1, len(ids)))
+        except Exception as e:
+            if raise_oom and 'out of memory' in str(e).lower():
+                raise MemoryError(str(e)) from e
+            print(f"  [Error] Choice scoring failed: {e}")
+            return [None] * len(prompts)
+
+        return [ModelResponse(max(zip(row_scores, choices), key=lambda item: item[0])[1], usage=usage)
+                for row_scores, choices, usage in zip(scores, choice_lists, usages)]
+
+    def _encode_prompt(self, prompt_ids):
+        """
+        Run the prompt through the model, reusing any cached prefix.
+
+        Returns the logits for the token after the prompt, a private
+        key/value cache covering the whole prompt and the number of prompt
+        tokens taken from the prefix cache.
+        """
+        import torch
 
-    def __init__(self, game, player_ai_configs):
+        past_key_values, cached_tokens = (None, 0)
+        if self.prefix_cache is not None:
+            past_key_values, cached_tokens = self.prefix_cache.lookup(prompt_ids)
+
+        input_ids = torch.tensor([prompt_ids[cached_tokens:]], device=self.model.device)
+        outputs = self.model(input_ids=input_ids, past_key_values=past_key_values, use_cache=True)
+        if self.prefix_cache is not None:
+            self.prefix_cache.store(prompt_ids, copy.deepcopy(outputs.past_key_values))
+        return outputs.logits[0, -1], outputs.past_key_values, cached_tokens
+
+    def select_team(self, prompt, player_names, team_size, max_retries=3):
+        """
+        Generate a team list with decoding masked to valid player names.
+
+        Each step may only emit a token that continues a not-yet-chosen name,
+        the separator after a complete name, or end-of-sequence once the team
+        is full, so the result always parses into exactly team_size names.
+        """
+        if not self.model or not self.tokenizer:
+            return None
+
+        name_ids = {name: self.tokenizer.encode(' ' + name, add_special_tokens=False) for name in player_names}
+        separator = self.tokenizer.encode(',', add_special_tokens=False)
+        eos_id = self.tokenizer.eos_token_id
+        prompt_length = self.tokenizer(prompt, return_tensors='pt')['input_ids'].shape[1]
+
+        def allowed_tokens(batch_id, input_ids):
+            generated = input_ids[prompt_length:].tolist()
+            return self._team_allowed_tokens(generated, name_ids, separator, team_size, eos_id)
+
+        max_new_tokens = team_size * (max(len(ids) for ids in name_ids.values()) + len(separator)) + 1
+        # The mask already ends decoding, so only the phase's temperature applies
+        return self._generate_batch(
+            [prompt],
+            prefix_allowed_tokens_fn=allowed_tokens,
+            max_new_tokens=max_new_tokens,
+            eos_token_id=eos_id,
+            temperature=self._generation_kwargs()['temperature']
+        )[0]
+
+    async def aselect_team(self, prompt, player_names, team_size, max_retries=3):
+        return await asyncio.to_thread(self.select_team, prompt, player_names, team_size, max_retries)
+
+    @staticmethod
+    def _team_allowed_tokens(generated, name_ids, separator, team_size, eos_id):
+        """Tokens that may follow `generated` in a separator-joined list of distinct names."""
+        allowed = set()
+        # Walk every parse of the tokens so far: (position, chosen names, just finished a name)
+        states = [(0, (), False)]
+        while states:
+            pos, chosen, after_name = states.pop()
+            if after_name and len(chosen) == team_size:
+                if pos == len(generated):
+                    allowed.add(eos_id)
+                continue
+
+            if after_name:
+                options = [(separator, None)]
+            else:
+                options = [(ids, name) for name, ids in name_ids.items() if name not in chosen]
+
+            rest = generated[pos:]
+            for ids, name in options:
+                if len(rest) < len(ids):
+                    if ids[:len(rest)] == rest:
+                        allowed.add(ids[len(rest)])
+                elif rest[:len(ids)] == ids:
+                    states.append((pos + len(ids), chosen + (name,) if name else chosen, name is not None))
+
+        return sorted(allowed) or [eos_id]
+
+
+class AsyncGameController:
+    """
+    Controls the game flow with AI players on an asyncio event loop.
+
+    Backend calls go through BaseAI.acall_model, so a single loop can drive
+    many games at once without a thread per blocking request.
+    """
+
+    def __init__(self, game, player_ai_configs, max_parallel_calls=6, logger=None,
+                 history_token_budget=None, token_counter=None, call_forced_decisions=False,
+                 structured_output=False, trace=False):
         """
         Initialize game controller with per-player AI configurations.
 
         Args:
             game: AvalonGame instance
             player_ai_configs: List of 6 AI instances, one for each player
+            max_parallel_calls: Upper bound on concurrent backend calls for
+                simultaneous decisions (votes, mission cards). 1 restores
+                fully sequential play.
+            logger: Optional GameLogger; a default one is created if omitted
+            history_token_budget: If set, the public timeline in each prompt
+                is compressed to at most this many tokens
+            token_counter: TokenCounter (or tokenizer name) used to measure
+                the timeline; defaults to a character-based estimate
+            call_forced_decisions: Still query the model for decisions the
+                rules already settle (e.g. Good mission cards), for collecting
+                training data; the rules' outcome is applied either way
+            structured_output: Ask for team decisions as JSON
+                ({"reasoning": ..., "team": [...]}) using backend JSON modes,
+                with one repair re-prompt before falling back. Backends with
+                native (constrained) decisions keep using them.
+            trace: Record a timeline of the game (see tracing.Tracer); run_game
+                saves it next to the logs as game_<id>_trace.json
         """
         self.game = game
         self.player_ais = player_ai_configs
+        self.max_parallel_calls = max(1, max_parallel_calls)
+
+        self.history_compressor = None
+        if history_token_budget:
+            if not isinstance(token_counter, TokenCounter):
+                token_counter = TokenCounter(token_counter)
+            self.history_compressor = HistoryCompressor(history_token_budget, token_counter)
         self.input_handler = None  # Callback for human input
         self.log_handler = None    # Callback for status updates
+        self.call_handler = None   # Callback for backend call records
+        self.fallback_handler = None  # Callback for decisions the game made itself
+
+        # Backend calls skipped because the rules left no choice, per action type
+        self.call_forced_decisions = call_forced_decisions
+        self.elided_calls = {}
+        self.structured_output = structured_output
 
         # Initialize game logger
-        self.logger = GameLogger()
+        self.logger = logger or GameLogger()
         self.logger.log_players(self.game.players, self.player_ais)
 
+        # Timeline of nested spans, exported as a Chrome trace
+        self.tracer = Tracer(f"Avalon game {self.logger.game_log['game_id']}") if trace else None
+
     def set_input_handler(self, handler):
         """Set callback for handling human input."""
         self.input_handler = handler
@@ -321,28 +1780,198 @@ class GameController:
         """Set callback for game status updates."""
         self.log_handler = handler
 
+    def set_call_handler(self, handler):
+        """Set callback receiving each backend call's record (see GameLogger.log_backend_call)."""
+        self.call_handler = handler
+
+    def set_fallback_handler(self, handler):
+        """Set callback(action_type, backend) for each decision that fell back to a random or default choice."""
+        self.fallback_handler = handler
+
     def log_action(self, message):
         """Send status update to handler."""
         if self.log_handler:
             self.log_handler(message)
 
-    def _get_human_input(self, player, action_type, **kwargs):
+    def _span(self, name, category, **args):
+        """A span in this game's trace, or a no-op if the game is not traced."""
+        if self.tracer is None:
+            return contextlib.nullcontext()
+        return self.tracer.span(name, category, **args)
+
+    def save_trace(self):
+        """Write the game's timeline as game_<id>_trace.json in the log directory, if traced."""
+        if self.tracer is None:
+            return None
+        return self.tracer.save(self.logger.log_dir / f"game_{self.logger.game_log['game_id']}_trace.json")
+
+    async def _get_human_input(self, player, action_type, **kwargs):
         """Request input from human player."""
-        if self.input_handler:
-            return self.input_handler(player.name, action_type, **kwargs)
+        if not self.input_handler:
+            return None
+        with self._span(action_type, 'human_input', lane=player.name):
+            if asyncio.iscoroutinefunction(self.input_handler):
+                return await self.input_handler(player.name, action_type, **kwargs)
+            # Blocking handlers (e.g. the web UI) wait on a thread, not on the loop
+            return await asyncio.to_thread(self.input_handler, player.name, action_type, **kwargs)
+
+    async def _decide(self, player, action_type, call):
+        """
+        Run a backend call under the generation settings for `action_type` and
+        the player's faction, logging its latency, token usage and failed
+        attempts, and any reasoning that came with the answer.
+        """
+        backend = self._backend_label(self.get_player_ai(player))
+        with game_context(self.logger.game_log.get('game_id')), \
+                action_context(action_type, 'evil' if player.is_evil else 'good'), \
+                collect_backend_errors() as errors, \
+                self._span(action_type, 'call', lane=player.name, backend=backend) as span:
+            started = time.perf_counter()
+            response = await call()
+            elapsed = time.perf_counter() - started
+            if span is not None:
+                span.args.update(ok=response is not None, errors=len(errors),
+                                 usage=getattr(response, 'usage', None))
+        record = self.logger.log_backend_call(player.name, action_type, backend, response, elapsed, len(errors))
+        if self.call_handler:
+            self.call_handler(record)
+        if getattr(response, 'reasoning', ''):
+            self.logger.log_reasoning(player.name, action_type, response.reasoning)
+        return response
+
+    @staticmethod
+    def _forced_outcome(player, action_type):
+        """
+        The option a decision must pick when the rules leave no choice, or None.
+
+        Only Good players' mission cards are forced (always SUCCESS). Teams
+        are never as large as the table (MISSION_SIZES) and there are always
+        several Good targets, so proposals and the assassination stay free.
+        """
+        if action_type == 'mission_action' and not player.is_evil:
+            return 'SUCCESS'
         return None
 
+    def _skip_forced(self, player, action_type, outcome):
+        """
+        Whether to skip the backend call for a decision with a forced `outcome`
+        (None if the decision is free). Skipped calls are counted per action.
+        """
+        if outcome is None or self.call_forced_decisions:
+            return False
+        if isinstance(self.get_player_ai(player), HumanPlayer):
+            return False
+        self.elided_calls[action_type] = self.elided_calls.get(action_type, 0) + 1
+        self.logger.log_elided_call(action_type)
+        return True
+
+    def _uses_structured_output(self, ai):
+        return self.structured_output and not isinstance(ai, HumanPlayer) and not has_native_decisions(ai)
+
+    @staticmethod
+    def _backend_label(ai):
+        """'Class:model' of the backend behind `ai`, for per-backend statistics."""
+        backend = unwrap_ai(ai)
+        label = type(backend).__name__
+        if backend.get_model_name():
+            label += f":{backend.get_model_name()}"
+        return label
+
+    def _record_fallback(self, ai, action_type):
+        """Count a decision the game made itself because `ai` gave no usable answer."""
+        if isinstance(ai, HumanPlayer):
+            return
+        backend = self._backend_label(ai)
+        self.logger.log_fallback(action_type, backend)
+        if self.fallback_handler:
+            self.fallback_handler(action_type, backend)
+
+    def _record_team_parse(self, ai, event):
+        """Count a team-decision parsing outcome against the backend behind `ai`."""
+        if isinstance(ai, HumanPlayer):
+            return
+        self.logger.log_output_parsing(self._backend_label(ai), event)
+
+    async def _structured_team(self, ai, prompt, player_names, team_size):
+        """
+        Ask for a JSON team decision and validate it, re-prompting once with
+        the validation error. Returns a ModelResponse "Name1, Name2" carrying
+        the stated reasoning, or None if both replies were invalid.
+        """
+        with response_schema_context(team_schema(player_names, team_size)):
+            response = await ai.acall_model(prompt)
+            usage = getattr(response, 'usage', None)
+            team, reasoning, error = validate_team(response, player_names, team_size)
+            if error:
+                self._record_team_parse(ai, 'parse_failures')
+                print(f"  [JSON] Invalid team answer ({error}), asking for a correction...")
+                response = await ai.acall_model(AvalonPrompts.json_repair(prompt, response or '', error))
+                usage = _add_usage(usage, getattr(response, 'usage', None))
+                team, reasoning, error = validate_team(response, player_names, team_size)
+                if not error:
+                    self._record_team_parse(ai, 'repairs')
+
+        if error:
+            return None
+        reasoning = '\n\n'.join(part for part in (getattr(response, 'reasoning', ''), reasoning) if part)
+        return ModelResponse(', '.join(team), usage=usage, reasoning=reasoning)
+
     def get_player_ai(self, player):
         """Get the AI instance for a specific player."""
         player_index = self.game.players.index(player)
         return self.player_ais[player_index]
 
-    def ai_discuss_proposal(self, player, leader, proposed_team, discussion_history):
+    def _game_history(self, action_type):
+        """Public timeline for a prompt, compressed to the token budget if one is set."""
+        if not self.history_compressor:
+            return self.logger.get_game_history_summary()
+
+        history, report = self.history_compressor.compress(self.logger)
+        self.logger.log_history_compression(action_type, report)
+        return history
+
+    async def _run_simultaneous(self, decide, players):
+        """
+        Collect secret decisions that players make at the same time.
+
+        AI backends are queried concurrently, bounded by max_parallel_calls;
+        human players are asked one at a time, since the input handler serves
+        a single pending request. Results are returned in the same order as
+        `players`.
+        """
+        if self.max_parallel_calls == 1 or len(players) < 2:
+            return [await decide(player) for player in players]
+
+        semaphore = asyncio.Semaphore(self.max_parallel_calls)
+
+        async def bounded(player):
+            async with semaphore:
+                return await decide(player)
+
+        tasks = {}
+        for idx, player in enumerate(players):
+            if not isinstance(self.get_player_ai(player), HumanPlayer):
+                tasks[idx] = asyncio.create_task(bounded(player))
+
+        results = [None] * len(players)
+        try:
+            for idx, player in enumerate(players):
+                if idx not in tasks:
+                    results[idx] = await decide(player)
+            for idx, task in tasks.items():
+                results[idx] = await task
+        finally:
+            for task in tasks.values():
+                task.cancel()
+
+        return results
+
+    async def ai_discuss_proposal(self, player, leader, proposed_team, discussion_history):
         """AI player discusses the proposed team."""
         role_info = self.game.get_role_visibility(player)
         game_state = self.game.get_game_state()
         team_names = [p.name for p in proposed_team]
-        game_history = self.logger.get_game_history_summary()
+        game_history = self._game_history('discussion')
 
         prompt = AvalonPrompts.discussion(
             role_info=role_info,
@@ -356,7 +1985,7 @@ class GameController:
         ai = self.get_player_ai(player)
 
         if isinstance(ai, HumanPlayer):
-            response = self._get_human_input(
+            response = await self._get_human_input(
                 player, 
                 'discussion',
                 role_info=role_info,
@@ -367,9 +1996,13 @@ class GameController:
                 game_history=game_history
             )
         else:
-            response = ai.call_model(prompt)
+            # Only the first two sentences are kept, so stop generating after them
+            response = await self._decide(
+                player, 'discussion', lambda: ai.astream_until(prompt, SentenceParser(max_sentences=2))
+            )
 
         if not response:
+            self._record_fallback(ai, 'discussion')
             return "I'll go with the majority decision."
 
         # Clean up response - take first 2 sentences max
@@ -378,15 +2011,20 @@ class GameController:
         if comment and not comment.endswith('.'):
             comment += '.'
 
-        return comment if comment else "I'll trust the leader's judgment."
+        if not comment:
+            self._record_fallback(ai, 'discussion')
+            return "I'll trust the leader's judgment."
+        return comment
 
-    def ai_leader_final_proposal(self, leader, initial_team, team_size, discussion_history):
+    async def ai_leader_final_proposal(self, leader, initial_team, team_size, discussion_history):
         """AI leader makes final proposal after hearing discussion. Returns (team, reasoning)."""
         player_names = [p.name for p in self.game.players]
         role_info = self.game.get_role_visibility(leader)
         game_state = self.game.get_game_state()
         initial_team_names = [p.name for p in initial_team]
-        game_history = self.logger.get_game_history_summary()
+        game_history = self._game_history('leader_final_proposal')
+        ai = self.get_player_ai(leader)
+        structured = self._uses_structured_output(ai)
 
         prompt = AvalonPrompts.leader_final_decision(
             role_info=role_info,
@@ -395,13 +2033,12 @@ class GameController:
             initial_team=initial_team_names,
             team_size=team_size,
             discussion_history=discussion_history,
-            game_history=game_history
+            game_history=game_history,
+            json_output=structured
         )
 
-        ai = self.get_player_ai(leader)
-
         if isinstance(ai, HumanPlayer):
-            response = self._get_human_input(
+            response = await self._get_human_input(
                 leader,
                 'leader_final_proposal',
                 role_info=role_info,
@@ -413,10 +2050,17 @@ class GameController:
                 game_history=game_history
             )
         else:
-            response = ai.call_model(prompt)
+            self._record_team_parse(ai, 'decisions')
+            if structured:
+                call = lambda: self._structured_team(ai, prompt, player_names, team_size)
+            else:
+                call = lambda: ai.aselect_team(prompt, player_names, team_size)
+            response = await self._decide(leader, 'leader_final_proposal', call)
 
         if not response:
             # Fallback: keep initial team
+            self._record_team_parse(ai, 'fallbacks')
+            self._record_fallback(ai, 'leader_final_proposal')
             return initial_team, "Keeping original team (no AI response)"
 
         # Parse the response
@@ -426,32 +2070,37 @@ class GameController:
         # Ensure we have exactly team_size players
         if len(selected_names) != team_size:
             # Fallback: keep initial team
+            self._record_team_parse(ai, 'parse_failures')
+            self._record_team_parse(ai, 'fallbacks')
+            self._record_fallback(ai, 'leader_final_proposal')
             return initial_team, "Keeping original team (invalid AI response)"
 
         team = [p for p in self.game.players if p.name in selected_names]
         return team, response
 
-    def ai_propose_team(self, leader, team_size):
+    async def ai_propose_team(self, leader, team_size):
         """AI leader proposes a team. Returns (team, reasoning)."""
         player_names = [p.name for p in self.game.players]
         role_info = self.game.get_role_visibility(leader)
         game_state = self.game.get_game_state()
-        game_history = self.logger.get_game_history_summary()
+        game_history = self._game_history('team_proposal')
+        ai = self.get_player_ai(leader)
+        structured = self._uses_structured_output(ai)
 
         prompt = AvalonPrompts.team_proposal(
             role_info=role_info,
             game_state=game_state,
             player_names=player_names,
             team_size=team_size,
-            game_history=game_history
+            game_history=game_history,
+            json_output=structured
         )
 
         self.log_action(f"{leader.name} is proposing a team...")
         print(f"\n[AI] {leader.name} is proposing a team...")
-        ai = self.get_player_ai(leader)
-        
+
         if isinstance(ai, HumanPlayer):
-            response = self._get_human_input(
+            response = await self._get_human_input(
                 leader,
                 'team_proposal',
                 role_info=role_info,
@@ -461,11 +2110,18 @@ class GameController:
                 game_history=game_history
             )
         else:
-            response = ai.call_model(prompt)
+            self._record_team_parse(ai, 'decisions')
+            if structured:
+                call = lambda: self._structured_team(ai, prompt, player_names, team_size)
+            else:
+                call = lambda: ai.aselect_team(prompt, player_names, team_size)
+            response = await self._decide(leader, 'team_proposal', call)
 
         if not response:
             # Fallback: random selection
             print(f"  [Fallback] No valid response, selecting randomly")
+            self._record_team_parse(ai, 'fallbacks')
+            self._record_fallback(ai, 'team_proposal')
             return random.sample(self.game.players, team_size), "No reasoning provided"
 
         # Parse the response
@@ -475,17 +2131,20 @@ class GameController:
         # Ensure we have exactly team_size players
         if len(selected_names) != team_size:
             print(f"  [Fallback] Invalid count ({len(selected_names)} != {team_size}), selecting randomly")
+            self._record_team_parse(ai, 'parse_failures')
+            self._record_team_parse(ai, 'fallbacks')
+            self._record_fallback(ai, 'team_proposal')
             return random.sample(self.game.players, team_size), "Random selection (AI response was invalid)"
 
         team = [p for p in self.game.players if p.name in selected_names]
         return team, response
 
-    def ai_vote(self, player, proposed_team):
+    async def ai_vote(self, player, proposed_team):
         """AI player votes on proposed team."""
         role_info = self.game.get_role_visibility(player)
         game_state = self.game.get_game_state()
         team_names = [p.name for p in proposed_team]
-        game_history = self.logger.get_game_history_summary()
+        game_history = self._game_history('vote')
 
         prompt = AvalonPrompts.vote(
             role_info=role_info,
@@ -497,7 +2156,7 @@ class GameController:
         ai = self.get_player_ai(player)
         
         if isinstance(ai, HumanPlayer):
-            response = self._get_human_input(
+            response = await self._get_human_input(
                 player,
                 'vote',
                 role_info=role_info,
@@ -505,22 +2164,26 @@ class GameController:
                 proposed_team=team_names,
                 game_history=game_history
             )
+            vote = ai.extract_choice(response, ['APPROVE', 'REJECT'])
         else:
-            response = ai.call_model(prompt)
-        
-        vote = ai.extract_choice(response, ['APPROVE', 'REJECT'])
+            vote = await self._decide(player, 'vote', lambda: ai.achoose(prompt, ['APPROVE', 'REJECT']))
 
         if not vote:
             # Fallback: random vote
+            self._record_fallback(ai, 'vote')
             vote = random.choice(['APPROVE', 'REJECT'])
 
         return vote == 'APPROVE'
 
-    def ai_mission_action(self, player):
+    async def ai_mission_action(self, player):
         """AI player chooses mission action (Success or Fail)."""
+        forced = self._forced_outcome(player, 'mission_action')
+        if self._skip_forced(player, 'mission_action', forced):
+            return forced == 'SUCCESS'
+
         role_info = self.game.get_role_visibility(player)
         game_state = self.game.get_game_state()
-        game_history = self.logger.get_game_history_summary()
+        game_history = self._game_history('mission_action')
 
         prompt = AvalonPrompts.mission_action(
             role_info=role_info,
@@ -531,20 +2194,20 @@ class GameController:
         ai = self.get_player_ai(player)
 
         if isinstance(ai, HumanPlayer):
-            response = self._get_human_input(
+            response = await self._get_human_input(
                 player,
                 'mission_action',
                 role_info=role_info,
                 game_state=game_state,
                 game_history=game_history
             )
+            action = ai.extract_choice(response, ['SUCCESS', 'FAIL'])
         else:
-            response = ai.call_model(prompt)
-
-        action = ai.extract_choice(response, ['SUCCESS', 'FAIL'])
+            action = await self._decide(player, 'mission_action', lambda: ai.achoose(prompt, ['SUCCESS', 'FAIL']))
 
         if not action:
             # Fallback based on role
+            self._record_fallback(ai, 'mission_action')
             if player.is_evil:
                 action = random.choice(['SUCCESS', 'FAIL'])
             else:
@@ -556,11 +2219,11 @@ class GameController:
 
         return action == 'SUCCESS'
 
-    def ai_assassinate(self, assassin):
+    async def ai_assassinate(self, assassin):
         """AI assassin chooses target to kill."""
         player_names = [p.name for p in self.game.players if not p.is_evil]
         role_info = self.game.get_role_visibility(assassin)
-        game_history = self.logger.get_game_history_summary()
+        game_history = self._game_history('assassination')
 
         prompt = AvalonPrompts.assassination(
             role_info=role_info,
@@ -571,31 +2234,35 @@ class GameController:
         ai = self.get_player_ai(assassin)
 
         if isinstance(ai, HumanPlayer):
-            response = self._get_human_input(
+            response = await self._get_human_input(
                 assassin,
                 'assassination',
                 role_info=role_info,
                 good_players=player_names,
                 game_history=game_history
             )
+            # Extract target name
+            target_name = None
+            for name in player_names:
+                if name in response:
+                    target_name = name
+                    break
         else:
-            response = ai.call_model(prompt)
-
-        # Extract target name
-        target_name = None
-        for name in player_names:
-            if name in response:
-                target_name = name
-                break
+            target_name = await self._decide(assassin, 'assassination', lambda: ai.achoose(prompt, player_names))
 
         if not target_name:
             # Fallback: random good player
+            self._record_fallback(ai, 'assassination')
             target_name = random.choice(player_names)
 
         return next(p for p in self.game.players if p.name == target_name)
 
-    def run_mission_round(self, round_num):
+    async def run_mission_round(self, round_num):
         """Run a complete mission round with discussion phase."""
+        with self._span(f"Round {round_num + 1}", 'round', team_size=AvalonGame.MISSION_SIZES[round_num]):
+            return await self._play_round(round_num)
+
+    async def _play_round(self, round_num):
         team_size = AvalonGame.MISSION_SIZES[round_num]
 
         print(f"\n{'='*60}")
@@ -610,156 +2277,164 @@ class GameController:
 
         while self.game.rejection_count < 5:
             leader = self.game.get_current_leader()
-            print(f"\nLeader: {leader.name}")
-            print(f"Vote attempt: {self.game.rejection_count + 1}/5")
-
-            # Check if this is the 5th vote (forced mission)
-            is_forced_mission = (self.game.rejection_count == 4)
-
-            # Leader proposes initial team
-            initial_team, leader_reasoning = self.ai_propose_team(leader, team_size)
-            initial_team_names = [p.name for p in initial_team]
-            print(f"Initial proposal: {initial_team_names}")
-
-            # Initialize proposal log
-            proposal_log = self.logger.log_proposal(leader.name, initial_team_names, is_forced_mission)
-            self.logger.log_leader_reasoning(proposal_log, leader_reasoning)
-
-            # Skip discussion phase on 5th vote
-            if is_forced_mission:
-                print(f"\n{'─'*60}")
-                print("⚠️  5TH VOTE - FORCED MISSION (No discussion)")
-                print(f"{'─'*60}")
-                print("\nAfter 4 rejections, this team must proceed without voting!")
-                final_team = initial_team
-                final_team_names = initial_team_names
-                self.logger.log_final_team(proposal_log, final_team_names)
-            else:
-                # Discussion phase - each player comments in order
-                print(f"\n{'─'*60}")
-                print("DISCUSSION PHASE")
-                print(f"{'─'*60}")
-                self.log_action(f"Discussion Phase: Leader {leader.name} opens the floor")
-
-                # Discussion happens clockwise, matching leader order
-                discussion_history = []
-
-                # Leader opens the discussion with initial reasoning
-                leader_opening = self.ai_discuss_proposal(leader, leader, initial_team, discussion_history)
-                discussion_history.append((leader.name, leader_opening))
-                self.logger.add_discussion_comment(proposal_log, leader.name, leader_opening, tag="Leader Opening")
-                print(f"\n{leader.name} (Leader opening): {leader_opening}")
-
-                leader_position = self.game.players.index(leader)
-                discussion_order = [
-                    self.game.players[(leader_position + offset) % len(self.game.players)]
-                    for offset in range(1, len(self.game.players))
-                ]
-
-                for player in discussion_order:
-                    self.log_action(f"Discussion: {player.name} is speaking...")
-                    comment = self.ai_discuss_proposal(player, leader, initial_team, discussion_history)
-                    discussion_history.append((player.name, comment))
-                    self.logger.add_discussion_comment(proposal_log, player.name, comment)
-                    print(f"\n{player.name}: {comment}")
-
-                # Leader gives a final summary after hearing everyone
-                leader_summary = self.ai_discuss_proposal(leader, leader, initial_team, discussion_history)
-                discussion_history.append((leader.name, leader_summary))
-                self.logger.add_discussion_comment(proposal_log, leader.name, leader_summary, tag="Leader Summary")
-                print(f"\n{leader.name} (Leader summary): {leader_summary}")
-
-                # Leader's final summary and decision
-                print(f"\n{'─'*60}")
-                print(f"Leader {leader.name} makes final decision after hearing discussion...")
-                print(f"{'─'*60}")
-
-                final_team, final_reasoning = self.ai_leader_final_proposal(leader, initial_team, team_size, discussion_history)
-
-                # Check if team changed
-                initial_names = set(p.name for p in initial_team)
-                final_names = set(p.name for p in final_team)
-                final_team_names = [p.name for p in final_team]
-
-                # Log final team
-                self.logger.log_final_team(proposal_log, final_team_names, final_reasoning)
-
-                if initial_names != final_names:
-                    print(f"\n{leader.name}: After considering your input, I'm changing my proposal.")
-                    print(f"Final team: {final_team_names}")
+            with self._span(f"Proposal {self.game.rejection_count + 1}", 'proposal', leader=leader.name):
+                print(f"\nLeader: {leader.name}")
+                print(f"Vote attempt: {self.game.rejection_count + 1}/5")
+
+                # Check if this is the 5th vote (forced mission)
+                is_forced_mission = (self.game.rejection_count == 4)
+
+                # Leader proposes initial team
+                with self._span('Team proposal', 'phase'):
+                    initial_team, leader_reasoning = await self.ai_propose_team(leader, team_size)
+                initial_team_names = [p.name for p in initial_team]
+                print(f"Initial proposal: {initial_team_names}")
+
+                # Initialize proposal log
+                proposal_log = self.logger.log_proposal(leader.name, initial_team_names, is_forced_mission)
+                self.logger.log_leader_reasoning(proposal_log, leader_reasoning)
+
+                # Skip discussion phase on 5th vote
+                if is_forced_mission:
+                    print(f"\n{'─'*60}")
+                    print("⚠️  5TH VOTE - FORCED MISSION (No discussion)")
+                    print(f"{'─'*60}")
+                    print("\nAfter 4 rejections, this team must proceed without voting!")
+                    final_team = initial_team
+                    final_team_names = initial_team_names
+                    self.logger.log_final_team(proposal_log, final_team_names)
                 else:
-                    print(f"\n{leader.name}: I'm keeping my original proposal.")
-                    print(f"Final team: {final_team_names}")
-
-            # Voting phase (skip on 5th vote)
-            if is_forced_mission:
-                print(f"\n{'─'*60}")
-                print("FORCED MISSION - NO VOTE")
-                print(f"{'─'*60}")
-                print("\nThe team automatically proceeds to mission!")
-                approved = True
-            else:
-                print(f"\n{'─'*60}")
-                print("VOTING PHASE")
-                print(f"{'─'*60}")
-                self.log_action(f"Voting Phase: Players are voting on {leader.name}'s team")
-
-                votes = []
-                votes_dict = {}
-                for player in self.game.players:
-                    vote = self.ai_vote(player, final_team)
-                    votes.append(vote)
-                    votes_dict[player.name] = vote
-                    print(f"  {player.name}: {'APPROVE' if vote else 'REJECT'}")
-
-                # Log votes
-                self.logger.log_votes(proposal_log, votes_dict)
-
-                approve_count = sum(votes)
-                approved = approve_count > len(votes) / 2
-
-                print(f"\nResult: {approve_count} approve, {len(votes) - approve_count} reject → {'APPROVED' if approved else 'REJECTED'}")
-                self.log_action(f"Vote Result: {'APPROVED' if approved else 'REJECTED'} ({approve_count} vs {len(votes) - approve_count})")
-
-            # Record proposal outcome for the shared timeline memory
-            round_log['proposals'].append(proposal_log)
-
-            if approved:
-                # Run mission
-                print(f"\n{'─'*60}")
-                print("MISSION PHASE")
-                print(f"{'─'*60}")
-                self.log_action("Mission Phase: Team is executing the mission...")
-
-                mission_actions = []
-                mission_actions_dict = {}
-                for player in final_team:
-                    action = self.ai_mission_action(player)
-                    mission_actions.append(action)
-                    mission_actions_dict[player.name] = action
-                    print(f"  {player.name}: {'SUCCESS' if action else 'FAIL'}")
-
-                success_count = sum(mission_actions)
-                mission_success = success_count == len(final_team)
-
-                print(f"\nMission Result: {'SUCCESS' if mission_success else 'FAIL'}")
-                self.log_action(f"Mission Result: {'SUCCESS' if mission_success else 'FAIL'} ({success_count} success, {len(final_team) - success_count} fail)")
-
-                # Log mission result
-                self.logger.log_mission(round_log, final_team_names, mission_actions_dict, mission_success)
-
-                self.game.mission_results.append(mission_success)
-                return mission_success
-            else:
-                # Team rejected, rotate to next leader
-                self.game.rejection_count += 1
-                self.game.rotate_leader()
-                print(f"\nLeadership passes to next player...")
+                    # Discussion phase - each player comments in order
+                    print(f"\n{'─'*60}")
+                    print("DISCUSSION PHASE")
+                    print(f"{'─'*60}")
+                    self.log_action(f"Discussion Phase: Leader {leader.name} opens the floor")
+
+                    with self._span('Discussion', 'phase'):
+                        # Discussion happens clockwise, matching leader order
+                        discussion_history = []
+
+                        # Leader opens the discussion with initial reasoning
+                        leader_opening = await self.ai_discuss_proposal(leader, leader, initial_team, discussion_history)
+                        discussion_history.append((leader.name, leader_opening))
+                        self.logger.add_discussion_comment(proposal_log, leader.name, leader_opening, tag="Leader Opening")
+                        print(f"\n{leader.name} (Leader opening): {leader_opening}")
+
+                        leader_position = self.game.players.index(leader)
+                        discussion_order = [
+                            self.game.players[(leader_position + offset) % len(self.game.players)]
+                            for offset in range(1, len(self.game.players))
+                        ]
+
+                        for player in discussion_order:
+                            self.log_action(f"Discussion: {player.name} is speaking...")
+                            comment = await self.ai_discuss_proposal(player, leader, initial_team, discussion_history)
+                            discussion_history.append((player.name, comment))
+                            self.logger.add_discussion_comment(proposal_log, player.name, comment)
+                            print(f"\n{player.name}: {comment}")
+
+                        # Leader gives a final summary after hearing everyone
+                        leader_summary = await self.ai_discuss_proposal(leader, leader, initial_team, discussion_history)
+                        discussion_history.append((leader.name, leader_summary))
+                        self.logger.add_discussion_comment(proposal_log, leader.name, leader_summary, tag="Leader Summary")
+                        print(f"\n{leader.name} (Leader summary): {leader_summary}")
+
+                    # Leader's final summary and decision
+                    print(f"\n{'─'*60}")
+                    print(f"Leader {leader.name} makes final decision after hearing discussion...")
+                    print(f"{'─'*60}")
+
+                    with self._span('Final proposal', 'phase'):
+                        final_team, final_reasoning = await self.ai_leader_final_proposal(
+                            leader, initial_team, team_size, discussion_history)
+
+                    # Check if team changed
+                    initial_names = set(p.name for p in initial_team)
+                    final_names = set(p.name for p in final_team)
+                    final_team_names = [p.name for p in final_team]
+
+                    # Log final team
+                    self.logger.log_final_team(proposal_log, final_team_names, final_reasoning)
+
+                    if initial_names != final_names:
+                        print(f"\n{leader.name}: After considering your input, I'm changing my proposal.")
+                        print(f"Final team: {final_team_names}")
+                    else:
+                        print(f"\n{leader.name}: I'm keeping my original proposal.")
+                        print(f"Final team: {final_team_names}")
+
+                # Voting phase (skip on 5th vote)
+                if is_forced_mission:
+                    print(f"\n{'─'*60}")
+                    print("FORCED MISSION - NO VOTE")
+                    print(f"{'─'*60}")
+                    print("\nThe team automatically proceeds to mission!")
+                    approved = True
+                else:
+                    print(f"\n{'─'*60}")
+                    print("VOTING PHASE")
+                    print(f"{'─'*60}")
+                    self.log_action(f"Voting Phase: Players are voting on {leader.name}'s team")
+
+                    # Votes are secret and simultaneous, so collect them in parallel
+                    with self._span('Vote', 'phase'):
+                        votes = await self._run_simultaneous(
+                            lambda player: self.ai_vote(player, final_team),
+                            self.game.players
+                        )
+                    votes_dict = {}
+                    for player, vote in zip(self.game.players, votes):
+                        votes_dict[player.name] = vote
+                        print(f"  {player.name}: {'APPROVE' if vote else 'REJECT'}")
+
+                    # Log votes
+                    self.logger.log_votes(proposal_log, votes_dict)
+
+                    approve_count = sum(votes)
+                    approved = approve_count > len(votes) / 2
+
+                    print(f"\nResult: {approve_count} approve, {len(votes) - approve_count} reject → {'APPROVED' if approved else 'REJECTED'}")
+                    self.log_action(f"Vote Result: {'APPROVED' if approved else 'REJECTED'} ({approve_count} vs {len(votes) - approve_count})")
+
+                # Record proposal outcome for the shared timeline memory
+                self.logger.add_proposal(round_log, proposal_log)
+
+                if approved:
+                    # Run mission
+                    print(f"\n{'─'*60}")
+                    print("MISSION PHASE")
+                    print(f"{'─'*60}")
+                    self.log_action("Mission Phase: Team is executing the mission...")
+
+                    # Mission cards are played secretly and at the same time
+                    with self._span('Mission', 'phase'):
+                        mission_actions = await self._run_simultaneous(self.ai_mission_action, final_team)
+                    mission_actions_dict = {}
+                    for player, action in zip(final_team, mission_actions):
+                        mission_actions_dict[player.name] = action
+                        print(f"  {player.name}: {'SUCCESS' if action else 'FAIL'}")
+
+                    success_count = sum(mission_actions)
+                    mission_success = success_count == len(final_team)
+
+                    print(f"\nMission Result: {'SUCCESS' if mission_success else 'FAIL'}")
+                    self.log_action(f"Mission Result: {'SUCCESS' if mission_success else 'FAIL'} ({success_count} success, {len(final_team) - success_count} fail)")
+
+                    # Log mission result
+                    self.logger.log_mission(round_log, final_team_names, mission_actions_dict, mission_success)
+
+                    self.game.mission_results.append(mission_success)
+                    return mission_success
+                else:
+                    # Team rejected, rotate to next leader
+                    self.game.rejection_count += 1
+                    self.game.rotate_leader()
+                    print(f"\nLeadership passes to next player...")
 
         # Should never reach here (5th vote is forced)
         return False
 
-    def run_assassination_phase(self):
+    async def run_assassination_phase(self):
         """Run assassination phase after Good wins 3 missions."""
         print(f"\n{'='*60}")
         print("ASSASSINATION PHASE")
@@ -769,7 +2444,8 @@ class GameController:
         assassin = next(p for p in self.game.players if p.role == 'Assassin')
         print(f"\n{assassin.name} (Assassin) must identify and kill Merlin...")
 
-        target = self.ai_assassinate(assassin)
+        with self._span('Assassination', 'phase'):
+            target = await self.ai_assassinate(assassin)
         print(f"\nAssassin targets: {target.name}")
 
         target_was_merlin = (target.role == 'Merlin')
@@ -786,11 +2462,17 @@ class GameController:
             self.log_action(f"Assassination Failed! {target.name} was {target.role}. GOOD WINS!")
             return True
 
-    def run_game(self):
-        """Run the complete game."""
+    async def run_game(self):
+        """Run the complete game, then save its trace if it is traced."""
+        with self._span('Game', 'game', game_id=self.logger.game_log['game_id'],
+                        max_parallel_calls=self.max_parallel_calls):
+            await self._play_game()
+        self.save_trace()
+
+    async def _play_game(self):
         # Run 5 rounds or until win condition
         for round_num in range(5):
-            self.run_mission_round(round_num)
+            await self.run_mission_round(round_num)
 
             good_wins = sum(1 for r in self.game.mission_results if r)
             evil_wins = sum(1 for r in self.game.mission_results if not r)
@@ -798,7 +2480,7 @@ class GameController:
             # Check win conditions
             if good_wins >= 3:
                 # Good wins 3 missions, assassin phase
-                good_victory = self.run_assassination_phase()
+                good_victory = await self.run_assassination_phase()
                 self.print_final_result(good_victory)
                 return
             elif evil_wins >= 3:
@@ -834,6 +2516,86 @@ class GameController:
         print(f"\n{'='*60}")
 
 
+class GameController:
+    """
+    Synchronous facade over AsyncGameController.
+
+    Takes the same arguments as AsyncGameController. Each public coroutine
+    of the engine is exposed as a blocking method that runs it on the
+    facade's own event loop, so keep-alive connections opened by one call
+    are reused by the next; everything else (game, logger, handlers) is
+    read from and assigned on the engine directly. run_game closes the loop
+    and its connections when the game ends; call close() after using the
+    other methods.
+    """
+
+    # Attributes of the facade itself; all others belong to the engine
+    FACADE_ATTRIBUTES = ('engine', '_loop')
+
+    def __init__(self, *args, **kwargs):
+        self.engine = AsyncGameController(*args, **kwargs)
+        self._loop = None
+
+    def __getattr__(self, name):
+        return getattr(self.engine, name)
+
+    def __setattr__(self, name, value):
+        # Handlers and settings assigned on the facade must reach the engine that uses them
+        if name in self.FACADE_ATTRIBUTES:
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self.engine, name, value)
+
+    def _run(self, coro):
+        """Run an engine coroutine to completion on the facade's event loop."""
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+        return self._loop.run_until_complete(coro)
+
+    def close(self):
+        """Close the facade's event loop and the idle connections pooled on it."""
+        loop, self._loop = self._loop, None
+        if loop is None:
+            return
+        try:
+            loop.run_until_complete(get_async_client().aclose())
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            loop.run_until_complete(loop.shutdown_default_executor())
+        finally:
+            loop.close()
+
+    def ai_discuss_proposal(self, player, leader, proposed_team, discussion_history):
+        return self._run(self.engine.ai_discuss_proposal(player, leader, proposed_team, discussion_history))
+
+    def ai_leader_final_proposal(self, leader, initial_team, team_size, discussion_history):
+        return self._run(self.engine.ai_leader_final_proposal(leader, initial_team, team_size, discussion_history))
+
+    def ai_propose_team(self, leader, team_size):
+        return self._run(self.engine.ai_propose_team(leader, team_size))
+
+    def ai_vote(self, player, proposed_team):
+        return self._run(self.engine.ai_vote(player, proposed_team))
+
+    def ai_mission_action(self, player):
+        return self._run(self.engine.ai_mission_action(player))
+
+    def ai_assassinate(self, assassin):
+        return self._run(self.engine.ai_assassinate(assassin))
+
+    def run_mission_round(self, round_num):
+        return self._run(self.engine.run_mission_round(round_num))
+
+    def run_assassination_phase(self):
+        return self._run(self.engine.run_assassination_phase())
+
+    def run_game(self):
+        """Run the complete game, blocking until it finishes."""
+        try:
+            return self._run(self.engine.run_game())
+        finally:
+            self.close()
+
+
 def main():
     """Main entry point."""
     print("Starting Avalon 6-Player AI Game...")
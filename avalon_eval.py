@@ -3,44 +3,56 @@ AvalonRL evaluation script
 Runs multiple games and computes win statistics.
 """
 
-from start import quick_start_mode
-from avalon_ai_game import AvalonGame, GameController
+from functools import partial
 from avalon_ai_game import OllamaAI
-
-def evaluation(num_runs=10):
-    """Run evaluation of the AvalonRL game with logging support."""
-    
-    player_names = ['Alice', 'Bob', 'Charlie', 'Diana', 'Eve', 'Frank']
+from batch_start import DEFAULT_PLAYER_NAMES, run_parallel_batch
+
+def evaluation(num_runs=10, concurrency=1, mode='async', backend_factory=None, backend_limits=None):
+    """
+    Run evaluation of the AvalonRL game with logging support.
+
+    Args:
+        num_runs: Number of games to play
+        concurrency: Number of games played at once (1 = sequential)
+        mode: 'async' or 'process', see batch_start.run_parallel_batch
+        backend_factory: Callable returning a fresh BaseAI for each player
+            (default: OllamaAI with Llama-3.2-1B-Instruct-Q6_K)
+        backend_limits: Optional {backend class name: max in-flight calls}
+    """
+    if backend_factory is None:
+        backend_factory = partial(OllamaAI, model_name="Llama-3.2-1B-Instruct-Q6_K")
+
+    player_names = DEFAULT_PLAYER_NAMES
     num_wins_per_player = {name: 0 for name in player_names}
 
-    for run in range(num_runs):
-        print(f"\n=== Starting Game {run + 1} ===")
-
-        # Create new AI config and game each run (to reset state)
-        player_ais = player_ais = [OllamaAI(model_name="Llama-3.2-1B-Instruct-Q6_K") for _ in range(6)]
-        game = AvalonGame(player_names)
-        controller = GameController(game, player_ais)
-
-        # Run game
-        controller.run_game()
-
-        # Extract winner from logger
-        result = controller.logger.game_log['final_result']['winner']  # "GOOD" or "EVIL"
-
-        # Update per-player stats
-        for player in controller.game.players:
-            if result == "GOOD" and not player.is_evil:
-                num_wins_per_player[player.name] += 1
-            elif result == "EVIL" and player.is_evil:
-                num_wins_per_player[player.name] += 1
+    results = run_parallel_batch(
+        num_runs,
+        concurrency=concurrency,
+        mode=mode,
+        player_names=player_names,
+        backend_factory=backend_factory,
+        backend_limits=backend_limits
+    )
+
+    # Update per-player stats
+    for game_result in results['games']:
+        good_won = game_result['winner'] == "GOOD"
+        for name in player_names:
+            is_evil = name in game_result['evil_players']
+            if good_won != is_evil:
+                num_wins_per_player[name] += 1
 
     # --- Results summary ---
+    num_games = len(results['games'])
+    if not num_games:
+        print("\nNo games completed.")
+        return results
+
     print("\n=== Evaluation Summary ===")
     for name, wins in num_wins_per_player.items():
-        rate = (wins / num_runs) * 100
-        print(f"{name}: {wins}/{num_runs} wins ({rate:.2f}%)")
+        rate = (wins / num_games) * 100
+        print(f"{name}: {wins}/{num_games} wins ({rate:.2f}%)")
 
-    good_wins = sum(1 for _ in range(num_runs) if controller.logger.game_log['final_result']['winner'] == "GOOD")
-    evil_wins = num_runs - good_wins
-    print(f"\nGood team win rate: {good_wins/num_runs:.2%}")
-    print(f"Evil team win rate: {evil_wins/num_runs:.2%}")
+    print(f"\nGood team win rate: {results['good_wins']/num_games:.2%}")
+    print(f"Evil team win rate: {results['evil_wins']/num_games:.2%}")
+    return results
@@ -3,22 +3,42 @@
 Batch Game Launcher for Avalon
 Runs multiple games automatically with default configuration.
 Default: 10 games, all 6 players using DeepSeek API
+Use --parallel N to run N games at once (async tasks or worker processes).
 """
 
+import argparse
+import asyncio
+import contextlib
+import multiprocessing
+import os
 import sys
-from avalon_ai_game import AvalonGame, GameController, DeepSeekAPI
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from avalon_ai_game import AvalonGame, GameController, AsyncGameController, BaseAI, DeepSeekAPI, unwrap_ai
+from game_logger import GameLogger
+from response_cache import CachedBackendFactory, get_response_cache
+from resilience import ResilientAI, ResilientBackendFactory, resilience_state
+from hedging import HedgedBackendFactory, hedging_state
+from call_metrics import format_call_summary, summarize_calls
+from http_client import get_async_client
 
+DEFAULT_PLAYER_NAMES = ['Alice', 'Bob', 'Charlie', 'Diana', 'Eve', 'Frank']
 
-def run_batch_games(num_games=10, player_names=None):
+
+def run_batch_games(num_games=10, player_names=None, prices=None, trace=False):
     """
     Run multiple Avalon games in batch.
 
     Args:
         num_games: Number of games to run (default: 10)
         player_names: List of player names (default: Alice, Bob, Charlie, Diana, Eve, Frank)
+        prices: Optional {model: (dollars per million prompt tokens,
+            dollars per million completion tokens)} for the cost estimate
+        trace: Save a Chrome trace of each game next to its logs
     """
     if player_names is None:
-        player_names = ['Alice', 'Bob', 'Charlie', 'Diana', 'Eve', 'Frank']
+        player_names = DEFAULT_PLAYER_NAMES
 
     print("="*80)
     print(" "*25 + "AVALON BATCH GAME RUNNER")
@@ -49,10 +69,10 @@ def run_batch_games(num_games=10, player_names=None):
 
             # Create AI configurations - all using DeepSeek API
             # API key will be loaded from .env.local automatically
-            player_ais = [DeepSeekAPI(model='deepseek-chat') for _ in range(6)]
+            player_ais = [ResilientAI(DeepSeekAPI(model='deepseek-chat')) for _ in range(6)]
 
             # Run game
-            controller = GameController(game, player_ais)
+            controller = GameController(game, player_ais, trace=trace)
             controller.run_game()
 
             # Extract result from logger
@@ -63,7 +83,8 @@ def run_batch_games(num_games=10, player_names=None):
             game_result = {
                 'game_number': game_num,
                 'winner': winner,
-                'game_id': controller.logger.game_log.get('game_id', 'unknown')
+                'game_id': controller.logger.game_log.get('game_id', 'unknown'),
+                'backend_calls': controller.logger.game_log.get('backend_calls', [])
             }
             results['games'].append(game_result)
 
@@ -83,50 +104,405 @@ def run_batch_games(num_games=10, player_names=None):
             traceback.print_exc()
             continue
 
-    # Print summary
+    print_batch_summary(results, num_games, prices)
+
+    return results
+
+
+def print_batch_summary(results, num_games, prices=None):
+    """Print the aggregated outcome of a batch run, and store its backend call summary in `results`."""
+    completed = len(results['games'])
+
     print("\n" + "="*80)
     print(" "*30 + "BATCH SUMMARY")
     print("="*80)
-    print(f"\nTotal games completed: {len(results['games'])}/{num_games}")
-    print(f"Good wins: {results['good_wins']} ({results['good_wins']/len(results['games'])*100:.1f}%)")
-    print(f"Evil wins: {results['evil_wins']} ({results['evil_wins']/len(results['games'])*100:.1f}%)")
+    print(f"\nTotal games completed: {completed}/{num_games}")
+    if completed:
+        print(f"Good wins: {results['good_wins']} ({results['good_wins']/completed*100:.1f}%)")
+        print(f"Evil wins: {results['evil_wins']} ({results['evil_wins']/completed*100:.1f}%)")
 
     print("\nGame-by-game results:")
-    for game_result in results['games']:
+    for game_result in sorted(results['games'], key=lambda r: r['game_number']):
         print(f"  Game {game_result['game_number']}: {game_result['winner']} (ID: {game_result['game_id']})")
 
+    calls = [call for game_result in results['games'] for call in game_result.get('backend_calls', [])]
+    if calls:
+        results['call_summary'] = summarize_calls(calls, prices)
+        print("\nBackend calls (latency per decision, tokens as reported by the backend):")
+        for line in format_call_summary(results['call_summary']):
+            print(line)
+
     print("\n" + "="*80)
     print("All game logs saved to ./logs/ directory")
     print("="*80 + "\n")
 
+
+# ---------------------------------------------------------------------------
+# Parallel batch mode
+# ---------------------------------------------------------------------------
+
+def default_backend_factory():
+    """Backend used for every player in batch runs (module-level so it pickles)."""
+    return DeepSeekAPI(model='deepseek-chat')
+
+
+class LimitedAI(BaseAI):
+    """
+    Caps in-flight calls to one backend type across every game in a batch.
+
+    The semaphore is an asyncio.Semaphore in async mode and a
+    multiprocessing semaphore shared by all workers in process mode. An
+    asyncio.Semaphore can only be waited on from the event loop, so in async
+    mode only the async methods are limited and the sync ones raise TypeError.
+    """
+
+    def __init__(self, inner, semaphore):
+        self.inner = inner
+        self.semaphore = semaphore
+
+    def _sync_slot(self):
+        """The semaphore for a blocking call; TypeError in async mode."""
+        if isinstance(self.semaphore, asyncio.Semaphore):
+            raise TypeError("LimitedAI with an asyncio.Semaphore limits only the async methods "
+                            "(acall_model, achoose, aselect_team, astream_model)")
+        return self.semaphore
+
+    def call_model(self, prompt, max_retries=3):
+        with self._sync_slot():
+            return self.inner.call_model(prompt, max_retries)
+
+    def choose(self, prompt, choices, max_retries=3):
+        with self._sync_slot():
+            return self.inner.choose(prompt, choices, max_retries)
+
+    def select_team(self, prompt, player_names, team_size, max_retries=3):
+        with self._sync_slot():
+            return self.inner.select_team(prompt, player_names, team_size, max_retries)
+
+    def stream_model(self, prompt, max_retries=3):
+        with self._sync_slot():
+            yield from self.inner.stream_model(prompt, max_retries)
+
+    @contextlib.asynccontextmanager
+    async def _slot(self):
+        """Hold one of the backend's slots."""
+        if isinstance(self.semaphore, asyncio.Semaphore):
+            async with self.semaphore:
+                yield
+            return
+
+        # Process-shared semaphore: wait for a slot without blocking the loop
+        await asyncio.to_thread(self.semaphore.acquire)
+        try:
+            yield
+        finally:
+            self.semaphore.release()
+
+    async def acall_model(self, prompt, max_retries=3):
+        async with self._slot():
+            return await self.inner.acall_model(prompt, max_retries)
+
+    async def achoose(self, prompt, choices, max_retries=3):
+        async with self._slot():
+            return await self.inner.achoose(prompt, choices, max_retries)
+
+    async def aselect_team(self, prompt, player_names, team_size, max_retries=3):
+        async with self._slot():
+            return await self.inner.aselect_team(prompt, player_names, team_size, max_retries)
+
+    async def astream_model(self, prompt, max_retries=3):
+        async with self._slot():
+            stream = self.inner.astream_model(prompt, max_retries)
+            try:
+                async for piece in stream:
+                    yield piece
+            finally:
+                await stream.aclose()
+
+    def get_model_name(self):
+        return self.inner.get_model_name()
+
+    def get_generation_params(self):
+        return self.inner.get_generation_params()
+
+    def extract_choice(self, response, valid_choices):
+        return self.inner.extract_choice(response, valid_choices)
+
+
+def _limit_backend(ai, backend_semaphores):
+    """
+    Apply the per-backend concurrency cap directly around the concrete backend,
+    below wrappers such as CachedAI so cache hits never wait for a slot.
+    """
+    backend = unwrap_ai(ai)
+    semaphore = backend_semaphores.get(type(backend).__name__)
+    if not semaphore:
+        return ai
+    if backend is ai:
+        return LimitedAI(ai, semaphore)
+
+    holder = ai
+    while holder.inner is not backend:
+        holder = holder.inner
+    holder.inner = LimitedAI(backend, semaphore)
+    return ai
+
+
+def _build_player_ais(backend_factory, backend_semaphores):
+    """Create six backends, wrapping those with a per-backend concurrency cap."""
+    return [_limit_backend(backend_factory(), backend_semaphores) for _ in range(6)]
+
+
+def _game_result(game_num, controller):
+    """Extract the per-game record kept by the batch aggregator."""
+    final_result = controller.logger.game_log.get('final_result') or {}
+    return {
+        'game_number': game_num,
+        'winner': final_result.get('winner', 'UNKNOWN'),
+        'game_id': controller.logger.game_log.get('game_id', 'unknown'),
+        'evil_players': [p.name for p in controller.game.players if p.is_evil],
+        'elided_calls': sum(controller.elided_calls.values()),
+        'backend_calls': controller.logger.game_log.get('backend_calls', [])
+    }
+
+
+# Per-process state for process mode, set by _init_process_worker
+_worker_semaphores = {}
+
+
+def _init_process_worker(backend_semaphores, quiet):
+    global _worker_semaphores
+    _worker_semaphores = backend_semaphores
+    if quiet:
+        sys.stdout = open(os.devnull, 'w')
+
+
+def _play_game_in_process(game_num, batch_id, player_names, backend_factory, log_dir, trace):
+    """Play one game inside a worker process."""
+    game = AvalonGame(player_names)
+    player_ais = _build_player_ais(backend_factory, _worker_semaphores)
+    logger = GameLogger(log_dir, game_id=f"{batch_id}_g{game_num:04d}")
+    controller = GameController(game, player_ais, logger=logger, trace=trace)
+    controller.run_game()
+    return _game_result(game_num, controller)
+
+
+async def _play_game_async(game_num, batch_id, player_names, backend_factory, log_dir,
+                           backend_semaphores, game_slots, trace):
+    """Play one game as a task on the shared event loop."""
+    async with game_slots:
+        game = AvalonGame(player_names)
+        player_ais = _build_player_ais(backend_factory, backend_semaphores)
+        logger = GameLogger(log_dir, game_id=f"{batch_id}_g{game_num:04d}")
+        controller = AsyncGameController(game, player_ais, logger=logger, trace=trace)
+        await controller.run_game()
+        return _game_result(game_num, controller)
+
+
+def _record_result(results, game_result):
+    results['games'].append(game_result)
+    if game_result['winner'] == 'GOOD':
+        results['good_wins'] += 1
+    elif game_result['winner'] == 'EVIL':
+        results['evil_wins'] += 1
+
+
+def _print_progress(results, num_games, started_at, out):
+    done = len(results['games']) + results['failed']
+    elapsed = time.time() - started_at
+    rate = len(results['games']) / elapsed * 60 if elapsed > 0 else 0.0
+    limits = ''.join(
+        f" | limit {state['concurrency']['limit']} (queued {state['concurrency']['queue_depth']})"
+        for state in resilience_state().values() if 'concurrency' in state
+    )
+    print(f"[BATCH] {done}/{num_games} finished | GOOD {results['good_wins']} "
+          f"EVIL {results['evil_wins']} | failed {results['failed']} | "
+          f"{rate:.1f} games/min | {elapsed:.0f}s elapsed{limits}", file=out, flush=True)
+
+
+async def _run_async_batch(num_games, concurrency, batch_id, player_names, backend_factory,
+                           log_dir, backend_limits, results, started_at, out, trace):
+    backend_semaphores = {name: asyncio.Semaphore(limit) for name, limit in backend_limits.items()}
+    game_slots = asyncio.Semaphore(concurrency)
+
+    tasks = {
+        asyncio.create_task(_play_game_async(
+            game_num, batch_id, player_names, backend_factory, log_dir,
+            backend_semaphores, game_slots, trace
+        )): game_num
+        for game_num in range(1, num_games + 1)
+    }
+
+    pending = set(tasks)
+    while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            if task.exception():
+                results['failed'] += 1
+                print(f"[BATCH ERROR] Game {tasks[task]} failed: {task.exception()}", file=out)
+            else:
+                _record_result(results, task.result())
+            _print_progress(results, num_games, started_at, out)
+
+    # Keep-alive connections belong to this loop, which ends with the batch
+    await get_async_client().aclose()
+
+
+def _run_process_batch(num_games, concurrency, batch_id, player_names, backend_factory,
+                       log_dir, backend_limits, results, started_at, out, quiet, trace):
+    backend_semaphores = {name: multiprocessing.BoundedSemaphore(limit) for name, limit in backend_limits.items()}
+
+    with ProcessPoolExecutor(
+        max_workers=concurrency,
+        initializer=_init_process_worker,
+        initargs=(backend_semaphores, quiet)
+    ) as pool:
+        futures = {
+            pool.submit(_play_game_in_process, game_num, batch_id, player_names, backend_factory,
+                        log_dir, trace): game_num
+            for game_num in range(1, num_games + 1)
+        }
+        try:
+            for future in as_completed(futures):
+                if future.exception():
+                    results['failed'] += 1
+                    print(f"[BATCH ERROR] Game {futures[future]} failed: {future.exception()}", file=out)
+                else:
+                    _record_result(results, future.result())
+                _print_progress(results, num_games, started_at, out)
+        except KeyboardInterrupt:
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+
+
+def run_parallel_batch(num_games=10, concurrency=4, mode='async', player_names=None,
+                       backend_factory=default_backend_factory, backend_limits=None,
+                       log_dir='logs', quiet=None, prices=None, trace=False):
+    """
+    Run many Avalon games concurrently and aggregate results as they finish.
+
+    Args:
+        num_games: Number of games to run
+        concurrency: Maximum number of games in flight at once
+        mode: 'async' runs games as tasks on one event loop; 'process' runs
+            them in a pool of worker processes
+        player_names: List of player names (default: Alice ... Frank)
+        backend_factory: Zero-argument callable returning a BaseAI; called six
+            times per game. Must be picklable in process mode.
+        backend_limits: Optional {backend class name: max in-flight calls},
+            shared by every game in the batch, e.g. {'DeepSeekAPI': 16}
+        log_dir: Directory for game logs; each game gets a unique id
+        quiet: Silence per-game console output (default: when concurrency > 1)
+        prices: Optional {model: (dollars per million prompt tokens,
+            dollars per million completion tokens)} for the cost estimate
+        trace: Save a Chrome trace of each game next to its logs
+
+    Returns:
+        Results dict in the same shape as run_batch_games, plus 'failed'.
+    """
+    if mode not in ('async', 'process'):
+        raise ValueError(f"Unknown batch mode: {mode}")
+    if player_names is None:
+        player_names = DEFAULT_PLAYER_NAMES
+    if quiet is None:
+        quiet = concurrency > 1
+    backend_limits = backend_limits or {}
+
+    batch_id = 'batch_' + datetime.now().strftime('%Y%m%d_%H%M%S')
+    results = {
+        'total_games': num_games,
+        'good_wins': 0,
+        'evil_wins': 0,
+        'failed': 0,
+        'games': []
+    }
+    out = sys.stdout
+
+    print(f"[BATCH] {batch_id}: {num_games} games, {concurrency} concurrent ({mode} mode)", file=out)
+    if backend_limits:
+        print(f"[BATCH] Backend limits: {backend_limits}", file=out)
+
+    started_at = time.time()
+    try:
+        if mode == 'async':
+            with open(os.devnull, 'w') as devnull, \
+                    contextlib.redirect_stdout(devnull if quiet else sys.stdout):
+                asyncio.run(_run_async_batch(
+                    num_games, concurrency, batch_id, player_names, backend_factory,
+                    log_dir, backend_limits, results, started_at, out, trace
+                ))
+        else:
+            _run_process_batch(
+                num_games, concurrency, batch_id, player_names, backend_factory,
+                log_dir, backend_limits, results, started_at, out, quiet, trace
+            )
+    except KeyboardInterrupt:
+        print(f"\n\n[BATCH] Interrupted by user after {len(results['games'])} games", file=out)
+
+    print_batch_summary(results, num_games, prices)
     return results
 
 
 def main():
     """Main entry point for batch runner."""
-    # Parse command line arguments
-    num_games = 10  # Default
+    parser = argparse.ArgumentParser(
+        description="Run multiple Avalon games with DeepSeek API players.",
+        epilog="Example: python batch_start.py 100 --parallel 8 --backend-limit 16"
+    )
+    parser.add_argument('num_games', nargs='?', type=int, default=10,
+                        help="Number of games to run (default: 10)")
+    parser.add_argument('--parallel', type=int, default=1, metavar='N',
+                        help="Number of games to run concurrently (default: 1, sequential)")
+    parser.add_argument('--mode', choices=['async', 'process'], default='async',
+                        help="How parallel games are run (default: async)")
+    parser.add_argument('--backend-limit', type=int, default=None, metavar='N',
+                        help="Max in-flight DeepSeek API calls across all games")
+    parser.add_argument('--adaptive-limit', type=int, default=None, metavar='N',
+                        help="Adapt in-flight DeepSeek API calls to throttling and latency, up to N")
+    parser.add_argument('--hedge', type=float, default=None, metavar='PCT',
+                        help="Duplicate DeepSeek API calls slower than this latency percentile (e.g. 95)")
+    parser.add_argument('--cache', metavar='PATH', nargs='?', const='cache/responses.sqlite',
+                        help="Reuse responses from a persistent cache (default path: cache/responses.sqlite)")
+    parser.add_argument('--replay', action='store_true',
+                        help="With --cache: fail on a cache miss instead of calling the API")
+    parser.add_argument('--rpm', type=int, default=None, metavar='N',
+                        help="Max DeepSeek API requests per minute (per worker process in process mode)")
+    parser.add_argument('--tpm', type=int, default=None, metavar='N',
+                        help="Max DeepSeek API tokens per minute (per worker process in process mode)")
+    parser.add_argument('--price', action='append', default=[], metavar='MODEL=IN,OUT',
+                        help="Dollars per million prompt and completion tokens for MODEL, "
+                             "for the cost estimate (repeatable)")
+    parser.add_argument('--trace', action='store_true',
+                        help="Save a Chrome trace of each game (logs/game_<id>_trace.json)")
+    args = parser.parse_args()
 
-    if len(sys.argv) > 1:
+    prices = {}
+    for price in args.price:
         try:
-            num_games = int(sys.argv[1])
-            if num_games <= 0:
-                print("Error: Number of games must be positive")
-                sys.exit(1)
+            model, rates = price.split('=', 1)
+            prompt_rate, completion_rate = (float(rate) for rate in rates.split(','))
         except ValueError:
-            print(f"Error: Invalid number of games: {sys.argv[1]}")
-            print("Usage: python batch_start.py [num_games]")
-            print("Example: python batch_start.py 20")
+            print(f"Error: --price expects MODEL=IN,OUT, got {price}")
             sys.exit(1)
+        prices[model] = (prompt_rate, completion_rate)
+
+    if args.replay and not args.cache:
+        args.cache = 'cache/responses.sqlite'
+
+    if args.num_games <= 0:
+        print("Error: Number of games must be positive")
+        sys.exit(1)
+    if args.parallel <= 0:
+        print("Error: --parallel must be positive")
+        sys.exit(1)
 
     # Check if .env.local exists or DEEPSEEK_API_KEY is set
-    import os
     from pathlib import Path
 
     env_file = Path(__file__).parent / '.env.local'
     api_key_env = os.getenv('DEEPSEEK_API_KEY')
 
-    if not env_file.exists() and not api_key_env:
+    if not env_file.exists() and not api_key_env and not args.replay:
         print("\n" + "="*80)
         print("WARNING: DeepSeek API Key Not Found!")
         print("="*80)
@@ -143,7 +519,31 @@ def main():
 
     # Run batch games
     try:
-        run_batch_games(num_games)
+        if args.parallel > 1 or args.cache or args.rpm or args.tpm or args.adaptive_limit or args.hedge:
+            # Process workers each get their own bucket and limiter, so split the budget between them
+            workers = args.parallel if args.mode == 'process' else 1
+            backend_factory = ResilientBackendFactory(
+                default_backend_factory,
+                requests_per_minute=args.rpm and max(1, args.rpm // workers),
+                tokens_per_minute=args.tpm and max(1, args.tpm // workers),
+                max_concurrency=args.adaptive_limit and max(1, args.adaptive_limit // workers)
+            )
+            if args.hedge:
+                backend_factory = HedgedBackendFactory(backend_factory, percentile=args.hedge)
+            if args.cache:
+                backend_factory = CachedBackendFactory(backend_factory, args.cache, replay=args.replay)
+            backend_limits = {'DeepSeekAPI': args.backend_limit} if args.backend_limit else None
+            run_parallel_batch(args.num_games, concurrency=args.parallel, mode=args.mode,
+                               backend_factory=backend_factory, backend_limits=backend_limits,
+                               prices=prices, trace=args.trace)
+            if args.cache:
+                print(f"[CACHE] {args.cache}: {get_response_cache(args.cache).stats()} (this process)")
+            for endpoint, state in resilience_state().items():
+                print(f"[BACKEND] {endpoint}: {state} (this process)")
+            for endpoint, state in hedging_state().items():
+                print(f"[HEDGE] {endpoint}: {state} (this process)")
+        else:
+            run_batch_games(args.num_games, prices=prices, trace=args.trace)
     except KeyboardInterrupt:
         print("\n\nBatch run interrupted by user")
     except Exception as e:
@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+Engine microbenchmarks for Avalon.
+Plays games against zero-latency scripted players and measures the engine
+itself: games per second, time spent building the history timeline and
+prompts and saving logs, and peak memory. Results are written as JSON and
+compared with a stored baseline to catch regressions.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import copy
+import functools
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+from avalon_ai_game import AvalonGame, AsyncGameController, BaseAI, GameController
+from game_logger import GameLogger
+from mock_llm_server import DISCUSSION_COMMENTS, good_players, prompt_action, team_request
+from prompts import AvalonPrompts
+
+PLAYER_NAMES = ['Alice', 'Bob', 'Charlie', 'Diana', 'Eve', 'Frank']
+
+# Prompt builders the controller calls directly (team_json_format is called by them)
+PROMPT_BUILDERS = [
+    'team_proposal', 'discussion', 'leader_final_decision', 'vote',
+    'mission_action', 'assassination', 'json_repair'
+]
+
+# Metric -> (unit, which direction is better; None for counts that are only reported)
+METRICS = {
+    'games_per_s': ('games/s', 'higher'),
+    'game_ms_p50': ('ms', 'lower'),
+    'game_ms_p95': ('ms', 'lower'),
+    'concurrent_games_per_s': ('games/s', 'higher'),
+    'history_ms_per_game': ('ms', 'lower'),
+    'history_us_per_call': ('us', 'lower'),
+    'history_cold_render_us': ('us', 'lower'),
+    'prompt_ms_per_game': ('ms', 'lower'),
+    'prompt_us_per_call': ('us', 'lower'),
+    'save_ms_per_game': ('ms', 'lower'),
+    'peak_memory_mib': ('MiB', 'lower'),
+    'backend_calls_per_game': ('calls', None),
+}
+
+
+class ScriptedAI(BaseAI):
+    """Zero-latency player that answers every prompt with a legal random decision."""
+
+    def __init__(self, seed=None):
+        self.rng = random.Random(seed)
+        self.calls = 0
+
+    def get_model_name(self):
+        return 'scripted'
+
+    def call_model(self, prompt, max_retries=3):
+        self.calls += 1
+        action = prompt_action(prompt)
+        if action in ('team_proposal', 'leader_final_proposal', 'team_json'):
+            names, size = team_request(prompt)
+            team = self.rng.sample(names, size)
+            if action == 'team_json':
+                return json.dumps({'reasoning': 'Cleanest record so far.', 'team': team})
+            return ', '.join(team)
+        if action == 'vote':
+            return self.rng.choice(['APPROVE', 'APPROVE', 'REJECT'])
+        if action == 'mission_action':
+            return self.rng.choice(['SUCCESS', 'FAIL'])
+        if action == 'assassination':
+            return self.rng.choice(good_players(prompt) or PLAYER_NAMES)
+        return self.rng.choice(DISCUSSION_COMMENTS)
+
+    async def acall_model(self, prompt, max_retries=3):
+        # No worker thread: only the engine's own cost is measured
+        return self.call_model(prompt, max_retries)
+
+
+class _Timings:
+    """Call counts and total seconds for functions patched by `profile`."""
+
+    def __init__(self):
+        self.calls = {}
+        self.seconds = {}
+
+    def wrap(self, name, func):
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.seconds[name] = self.seconds.get(name, 0.0) + time.perf_counter() - start
+                self.calls[name] = self.calls.get(name, 0) + 1
+        return timed
+
+    def total(self, prefix):
+        names = [name for name in self.calls if name.startswith(prefix)]
+        return sum(self.calls[n] for n in names), sum(self.seconds[n] for n in names)
+
+
+@contextlib.contextmanager
+def profile():
+    """Time the history timeline, prompt builders and log saving while the block runs."""
+    timings = _Timings()
+    patched = [(GameLogger, 'get_game_history_summary', GameLogger.__dict__['get_game_history_summary']),
+               (GameLogger, 'save', GameLogger.__dict__['save'])]
+    patched += [(AvalonPrompts, name, AvalonPrompts.__dict__[name]) for name in PROMPT_BUILDERS]
+
+    for owner, name, original in patched:
+        if isinstance(original, staticmethod):
+            setattr(owner, name, staticmethod(timings.wrap(f"prompt.{name}", original.__func__)))
+        else:
+            setattr(owner, name, timings.wrap(f"logger.{name}", original))
+    try:
+        yield timings
+    finally:
+        for owner, name, original in patched:
+            setattr(owner, name, original)
+
+
+def _new_game(index, log_dir, seed):
+    """A seeded game and its scripted players, so every run plays the same games."""
+    random.seed(seed * 100003 + index)
+    game = AvalonGame(PLAYER_NAMES)
+    players = [ScriptedAI(seed=seed * 100003 + index * 10 + i) for i in range(len(PLAYER_NAMES))]
+    logger = GameLogger(log_dir=log_dir, game_id=f"bench_{seed}_{index}")
+    return game, players, logger
+
+
+def run_games(num_games, log_dir, seed=0):
+    """Play games one after another with GameController; returns (per-game seconds, backend calls, last logger)."""
+    durations, calls, logger = [], 0, None
+    for index in range(num_games):
+        game, players, logger = _new_game(index, log_dir, seed)
+        start = time.perf_counter()
+        GameController(game, players, logger=logger).run_game()
+        durations.append(time.perf_counter() - start)
+        calls += sum(player.calls for player in players)
+    return durations, calls, logger
+
+
+async def _run_concurrent(num_games, log_dir, seed):
+    async def one(index):
+        game, players, logger = _new_game(index, log_dir, seed)
+        await AsyncGameController(game, players, logger=logger).run_game()
+    await asyncio.gather(*(one(index) for index in range(num_games)))
+
+
+def run_concurrent_games(num_games, log_dir, seed=0):
+    """Seconds to play `num_games` games at once on one event loop."""
+    start = time.perf_counter()
+    asyncio.run(_run_concurrent(num_games, log_dir, seed))
+    return time.perf_counter() - start
+
+
+def cold_history_render(logger, repeats=200):
+    """Fastest time, in seconds, to render a finished game's whole timeline with nothing cached."""
+    samples = []
+    for _ in range(repeats):
+        fresh = GameLogger(log_dir=logger.log_dir, game_id='bench_history')
+        fresh.game_log = copy.deepcopy(logger.game_log)
+        start = time.perf_counter()
+        fresh.get_game_history_summary()
+        samples.append(time.perf_counter() - start)
+    return min(samples)
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def _best(name, values):
+    return max(values) if METRICS[name][1] == 'higher' else min(values)
+
+
+def _sequential_metrics(num_games, log_dir, seed):
+    """Throughput and profile metrics of one set of sequential games, plus the last game's logger."""
+    with profile() as timings:
+        durations, calls, logger = run_games(num_games, log_dir, seed)
+    history_calls, history_seconds = timings.total('logger.get_game_history_summary')
+    prompt_calls, prompt_seconds = timings.total('prompt.')
+    _, save_seconds = timings.total('logger.save')
+    return {
+        'games_per_s': num_games / sum(durations),
+        'game_ms_p50': statistics.median(durations) * 1000,
+        'game_ms_p95': _percentile(durations, 95) * 1000,
+        'history_ms_per_game': history_seconds / num_games * 1000,
+        'history_us_per_call': history_seconds / max(1, history_calls) * 1e6,
+        'prompt_ms_per_game': prompt_seconds / num_games * 1000,
+        'prompt_us_per_call': prompt_seconds / max(1, prompt_calls) * 1e6,
+        'save_ms_per_game': save_seconds / num_games * 1000,
+        'backend_calls_per_game': calls / num_games,
+    }, logger
+
+
+def run_benchmarks(num_games=50, concurrent_games=8, memory_games=3, repeats=5, seed=0):
+    """
+    Run every benchmark and return {metric: value}.
+
+    Timing metrics are the best of `repeats` runs of the same seeded games,
+    which keeps run-to-run noise well below the regression tolerance.
+
+    Args:
+        num_games: Games played one after another per repeat
+        concurrent_games: Games played at once on one event loop per repeat
+        memory_games: Games played under tracemalloc for peak memory
+        repeats: Times each timed set of games is played
+        seed: Seed for roles, leaders and scripted answers
+    """
+    runs = []
+    with tempfile.TemporaryDirectory(prefix='avalon_bench_') as log_dir, \
+            contextlib.redirect_stdout(io.StringIO()) as output:
+        # Warm-up: imports, regex compilation, first-call caches
+        run_games(2, log_dir, seed=seed + 1)
+
+        for _ in range(repeats):
+            metrics, logger = _sequential_metrics(num_games, log_dir, seed)
+            metrics['concurrent_games_per_s'] = concurrent_games / run_concurrent_games(concurrent_games, log_dir, seed)
+            runs.append(metrics)
+            # Drop the engine's console output
+            output.seek(0)
+            output.truncate(0)
+
+        # Best run per metric: noise from other processes only ever makes a run slower
+        metrics = {name: _best(name, [run[name] for run in runs]) for name in runs[0]}
+        metrics['history_cold_render_us'] = cold_history_render(logger) * 1e6
+
+        tracemalloc.start()
+        try:
+            run_games(memory_games, log_dir, seed)
+            metrics['peak_memory_mib'] = tracemalloc.get_traced_memory()[1] / 2**20
+        finally:
+            tracemalloc.stop()
+    return metrics
+
+
+def build_report(metrics, args):
+    """Results file contents: settings, environment and metrics with their units."""
+    return {
+        'timestamp': datetime.now().isoformat(),
+        'settings': {'games': args.games, 'concurrent_games': args.concurrent, 'memory_games': args.memory_games,
+                     'repeats': args.repeats, 'seed': args.seed},
+        'environment': {'python': platform.python_version(), 'platform': platform.platform(),
+                        'cpus': os.cpu_count()},
+        'metrics': {name: {'value': round(value, 3), 'unit': METRICS[name][0]} for name, value in metrics.items()}
+    }
+
+
+def compare(report, baseline, tolerance):
+    """
+    Print current results next to the baseline; returns the regressed metrics.
+
+    A metric regresses when it is worse than the baseline by more than
+    `tolerance` (a fraction). Runs with different settings play different
+    games, so they are shown side by side but never count as regressions.
+    """
+    comparable = baseline.get('settings') == report['settings']
+    regressions = []
+    print(f"\n{'Metric':<26}{'Baseline':>12}{'Current':>12}{'Change':>10}")
+    print("-" * 60)
+    for name, current in report['metrics'].items():
+        old = baseline.get('metrics', {}).get(name)
+        if old is None:
+            print(f"{name:<26}{'-':>12}{current['value']:>12.3f}{'new':>10}")
+            continue
+        change = (current['value'] - old['value']) / old['value'] if old['value'] else 0.0
+        better = METRICS.get(name, (None, None))[1]
+        worse = comparable and ((better == 'lower' and change > tolerance) or
+                                (better == 'higher' and change < -tolerance))
+        flag = "  REGRESSION" if worse else ""
+        if better is None and change:
+            # Same seeds, different number of calls: the game flow itself changed
+            flag = "  changed"
+        print(f"{name:<26}{old['value']:>12.3f}{current['value']:>12.3f}{change:>+10.1%}{flag}")
+        if worse:
+            regressions.append(name)
+
+    if baseline.get('environment') != report['environment']:
+        print("\n[BENCH] Note: the baseline was recorded on a different machine or Python version")
+    if not comparable:
+        print("[BENCH] Note: the baseline was recorded with different settings; not checking for regressions")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the Avalon engine with zero-latency scripted players.",
+        epilog="Example: python benchmark.py --games 50 --save-baseline"
+    )
+    parser.add_argument('--games', type=int, default=50, metavar='N',
+                        help="Games played one after another per repeat (default: 50)")
+    parser.add_argument('--concurrent', type=int, default=8, metavar='N',
+                        help="Games played at once on one event loop per repeat (default: 8)")
+    parser.add_argument('--memory-games', type=int, default=3, metavar='N',
+                        help="Games played under tracemalloc for peak memory (default: 3)")
+    parser.add_argument('--repeats', type=int, default=5, metavar='N',
+                        help="Timed runs whose best result is reported (default: 5)")
+    parser.add_argument('--seed', type=int, default=0, help="Seed for roles and answers (default: 0)")
+    parser.add_argument('--output', default='benchmarks/results.json', metavar='PATH',
+                        help="Results file (default: benchmarks/results.json)")
+    parser.add_argument('--baseline', default='benchmarks/baseline.json', metavar='PATH',
+                        help="Baseline to compare with, if it exists (default: benchmarks/baseline.json)")
+    parser.add_argument('--save-baseline', action='store_true',
+                        help="Store these results as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=15.0, metavar='PCT',
+                        help="Allowed slowdown against the baseline in percent (default: 15)")
+    args = parser.parse_args()
+
+    if min(args.games, args.concurrent, args.memory_games, args.repeats) <= 0:
+        print("Error: game counts must be positive")
+        sys.exit(1)
+
+    print(f"[BENCH] Playing {args.games} sequential and {args.concurrent} concurrent games, "
+          f"{args.repeats} times, then {args.memory_games} traced games...")
+    report = build_report(
+        run_benchmarks(args.games, args.concurrent, args.memory_games, args.repeats, args.seed), args)
+
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"[BENCH] Results saved to: {output}")
+
+    baseline_path = Path(args.baseline)
+    regressions = []
+    if baseline_path.exists() and not args.save_baseline:
+        with open(baseline_path, 'r', encoding='utf-8') as f:
+            regressions = compare(report, json.load(f), args.tolerance / 100)
+    else:
+        print(f"\n{'Metric':<26}{'Value':>12}  Unit")
+        print("-" * 48)
+        for name, metric in report['metrics'].items():
+            print(f"{name:<26}{metric['value']:>12.3f}  {metric['unit']}")
+
+    if args.save_baseline:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(baseline_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n[BENCH] Baseline saved to: {baseline_path}")
+
+    if regressions:
+        print(f"\n[BENCH] {len(regressions)} regression(s) beyond {args.tolerance:g}%: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
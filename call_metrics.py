@@ -0,0 +1,115 @@
+"""
+Summaries of backend call records.
+Turns the per-call latency and token records kept in game logs into p50/p95
+latency and token totals per phase and per backend, for one game or a batch.
+"""
+
+import math
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of `values` (None if empty)."""
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def _model(backend):
+    """Model name from a 'Class:model' backend label."""
+    return backend.split(':', 1)[1] if ':' in backend else None
+
+
+def call_cost(call, prices):
+    """
+    Dollar cost of one call, or None if its model has no price.
+
+    Args:
+        call: Call record with prompt_tokens / completion_tokens
+        prices: {model: (dollars per million prompt tokens, dollars per million completion tokens)}
+    """
+    price = prices.get(_model(call.get('backend', '')))
+    if price is None or call.get('prompt_tokens') is None:
+        return None
+    return (call['prompt_tokens'] * price[0] + (call.get('completion_tokens') or 0) * price[1]) / 1e6
+
+
+def _stats(calls, prices):
+    latencies = [call['latency_ms'] for call in calls]
+    with_usage = [call for call in calls if call.get('prompt_tokens') is not None]
+    stats = {
+        'calls': len(calls),
+        'failed': sum(1 for call in calls if not call['ok']),
+        'errors': sum(call.get('errors', 0) for call in calls),
+        'latency_ms': {
+            'p50': percentile(latencies, 50),
+            'p95': percentile(latencies, 95),
+            'max': max(latencies),
+            'total': round(sum(latencies), 1)
+        },
+        'prompt_tokens': sum(call['prompt_tokens'] for call in with_usage),
+        'completion_tokens': sum(call.get('completion_tokens') or 0 for call in with_usage),
+        # Counted from the text where the server sent no usage (ollama run, early-stopped streams)
+        'calls_with_estimated_usage': sum(1 for call in with_usage if call.get('usage_estimated')),
+        # Calls without an answer, or custom backends that report no usage
+        'calls_without_usage': len(calls) - len(with_usage)
+    }
+    cached = sum(call.get('cached_tokens', 0) for call in calls)
+    if cached:
+        stats['cached_tokens'] = cached
+    if prices:
+        costs = [cost for cost in (call_cost(call, prices) for call in calls) if cost is not None]
+        stats['cost_usd'] = round(sum(costs), 6)
+    return stats
+
+
+def _grouped(calls, key, prices):
+    groups = {}
+    for call in calls:
+        groups.setdefault(call.get(key) or 'other', []).append(call)
+    return {name: _stats(group, prices) for name, group in groups.items()}
+
+
+def summarize_calls(calls, prices=None):
+    """
+    Latency percentiles, token totals and failures for a list of call records,
+    overall and broken down by action type and by backend.
+
+    Args:
+        calls: Call records as logged by GameLogger.log_backend_call
+        prices: Optional {model: (dollars per million prompt tokens,
+            dollars per million completion tokens)} to add a cost estimate
+    """
+    if not calls:
+        return {'overall': {'calls': 0}, 'by_action': {}, 'by_backend': {}}
+    return {
+        'overall': _stats(calls, prices),
+        'by_action': _grouped(calls, 'action', prices),
+        'by_backend': _grouped(calls, 'backend', prices)
+    }
+
+
+def format_call_summary(summary):
+    """Lines of a text table for a summarize_calls result."""
+    header = f"  {'':<28}{'Calls':>7}{'Failed':>8}{'Errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'Prompt tok':>12}{'Output tok':>12}"
+    with_cost = 'cost_usd' in summary['overall']
+    if with_cost:
+        header += f"{'Cost $':>10}"
+    lines = [header]
+
+    def row(name, stats):
+        line = (f"  {name:<28}{stats['calls']:>7}{stats['failed']:>8}{stats['errors']:>8}"
+                f"{stats['latency_ms']['p50']:>10.0f}{stats['latency_ms']['p95']:>10.0f}"
+                f"{stats['prompt_tokens']:>12}{stats['completion_tokens']:>12}")
+        if with_cost:
+            line += f"{stats['cost_usd']:>10.4f}"
+        return line
+
+    if not summary['overall']['calls']:
+        return lines + ["  (no backend calls)"]
+    for name, stats in summary['by_action'].items():
+        lines.append(row(name, stats))
+    for name, stats in summary['by_backend'].items():
+        lines.append(row(name[:28], stats))
+    lines.append(row('all calls', summary['overall']))
+    return lines
@@ -2,22 +2,39 @@
 Game logging functionality for Avalon games.
 """
 
+import gzip
 import json
 from datetime import datetime
 from pathlib import Path
 
+from call_metrics import format_call_summary, summarize_calls
+
 
 class GameLogger:
     """Handles logging of game events and saving game results."""
 
-    def __init__(self, log_dir="logs"):
-        """Initialize game logger."""
+    def __init__(self, log_dir="logs", game_id=None, reasoning_log='inline'):
+        """
+        Initialize game logger.
+
+        Args:
+            log_dir: Directory for the JSON and text logs
+            game_id: Explicit log id; defaults to the start timestamp. Callers
+                running games in parallel must pass unique ids.
+            reasoning_log: Where reasoning models' thinking goes: 'inline'
+                (a 'reasoning' list in the JSON log), 'gzip' (a separate
+                game_<id>_reasoning.jsonl.gz file) or 'off'
+        """
+        if reasoning_log not in ('inline', 'gzip', 'off'):
+            raise ValueError(f"Unknown reasoning_log mode: {reasoning_log}")
         self.log_dir = Path(log_dir)
-        self.log_dir.mkdir(exist_ok=True)
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        self.reasoning_log = reasoning_log
+        self.reasoning = []
 
         self.game_log = {
             'timestamp': datetime.now().isoformat(),
-            'game_id': datetime.now().strftime('%Y%m%d_%H%M%S'),
+            'game_id': game_id or datetime.now().strftime('%Y%m%d_%H%M%S'),
             'players': [],
             'rounds': [],
             'assassination': None,
@@ -26,20 +43,30 @@ class GameLogger:
         # Track the active round so in-progress proposals can appear in history
         self.current_round_log = None
 
+        # Incremental public timeline: completed rounds are rendered once and
+        # kept; the joined string is cached until the next logged event.
+        self._history_version = 0
+        self._history_cache = None  # (version, summary)
+        self._completed_round_segments = []
+
+    def _invalidate_history(self):
+        """Mark the cached public timeline stale after a new event."""
+        self._history_version += 1
+
+    def history_version(self):
+        """Counter that changes whenever the public timeline does, for caching derived views."""
+        return self._history_version
+
     def log_players(self, players, player_ais):
         """Log player information including roles and AI configurations."""
-        from avalon_ai_game import OllamaAI, DeepSeekAPI, LocalModelAI
+        from avalon_ai_game import unwrap_ai
 
         for player, ai in zip(players, player_ais):
-            ai_type = type(ai).__name__
-            ai_config = ''
+            # Report the real backend behind wrappers such as caches and limiters
+            ai = unwrap_ai(ai)
 
-            if isinstance(ai, OllamaAI):
-                ai_config = ai.model_name
-            elif isinstance(ai, DeepSeekAPI):
-                ai_config = ai.model
-            elif isinstance(ai, LocalModelAI):
-                ai_config = ai.model_path
+            ai_type = type(ai).__name__
+            ai_config = ai.get_model_name()
 
             self.game_log['players'].append({
                 'name': player.name,
@@ -56,6 +83,7 @@ class GameLogger:
             'team_size': team_size,
             'proposals': []
         }
+        self._invalidate_history()
         return self.current_round_log
 
     def log_proposal(self, leader, initial_team, is_forced=False):
@@ -72,6 +100,11 @@ class GameLogger:
             'forced_mission': is_forced
         }
 
+    def add_proposal(self, round_log, proposal_log):
+        """Record a finished proposal (voted or forced) in its round."""
+        round_log['proposals'].append(proposal_log)
+        self._invalidate_history()
+
     def add_discussion_comment(self, proposal_log, player_name, comment, tag=None):
         """Add a discussion comment to the proposal log."""
         proposal_log['discussion'].append({
@@ -79,11 +112,13 @@ class GameLogger:
             'comment': comment,
             'tag': tag
         })
+        self._invalidate_history()
 
     def log_final_team(self, proposal_log, final_team, reasoning=''):
         """Log the final team after discussion."""
         proposal_log['final_team'] = final_team
         proposal_log['leader_final_reasoning'] = reasoning
+        self._invalidate_history()
 
     def log_leader_reasoning(self, proposal_log, reasoning):
         """Log the leader's initial reasoning."""
@@ -93,6 +128,7 @@ class GameLogger:
         """Log voting results."""
         proposal_log['votes'] = votes_dict
         proposal_log['approved'] = sum(votes_dict.values()) > len(votes_dict) / 2
+        self._invalidate_history()
 
     def log_mission(self, round_log, team, actions, success):
         """Log mission execution and result."""
@@ -109,6 +145,78 @@ class GameLogger:
         if round_log not in self.game_log['rounds']:
             self.game_log['rounds'].append(round_log)
         self.current_round_log = None
+        self._invalidate_history()
+
+    def log_history_compression(self, action_type, report):
+        """Record how many timeline tokens compression saved for one prompt."""
+        self.game_log.setdefault('history_compression', []).append({
+            'action': action_type,
+            'round': self.current_round_log['round_number'] if self.current_round_log else None,
+            'full_tokens': report['full_tokens'],
+            'sent_tokens': report['sent_tokens'],
+            'tokens_saved': report['tokens_saved']
+        })
+
+    def log_output_parsing(self, backend, event):
+        """
+        Count a team-decision outcome for `backend`: 'decisions' made,
+        'parse_failures' (first answer unusable), 'repairs' (fixed by the
+        repair re-prompt) or 'fallbacks' (random / unchanged team used).
+        """
+        stats = self.game_log.setdefault('output_parsing', {}).setdefault(backend, {
+            'decisions': 0, 'parse_failures': 0, 'repairs': 0, 'fallbacks': 0
+        })
+        stats[event] += 1
+        decisions = stats['decisions'] or 1
+        stats['parse_failure_rate'] = stats['parse_failures'] / decisions
+        stats['repair_rate'] = stats['repairs'] / stats['parse_failures'] if stats['parse_failures'] else 0.0
+        stats['fallback_rate'] = stats['fallbacks'] / decisions
+
+    def log_fallback(self, action_type, backend):
+        """Count a decision made at random or by default because `backend` gave no usable answer."""
+        fallbacks = self.game_log.setdefault('fallbacks', {}).setdefault(backend, {})
+        fallbacks[action_type] = fallbacks.get(action_type, 0) + 1
+
+    def log_elided_call(self, action_type):
+        """Count a backend call skipped because the rules forced the outcome."""
+        elided = self.game_log.setdefault('elided_calls', {})
+        elided[action_type] = elided.get(action_type, 0) + 1
+
+    def log_backend_call(self, player_name, action_type, backend, response, seconds, errors=0):
+        """
+        Record one decision's backend call: latency, token usage (None when
+        the backend reported none), failed attempts along the way, and
+        whether it produced an answer. Returns the record.
+        """
+        usage = getattr(response, 'usage', None) or {}
+        entry = {
+            'round': self.current_round_log['round_number'] if self.current_round_log else None,
+            'player': player_name,
+            'action': action_type,
+            'backend': backend,
+            'latency_ms': round(seconds * 1000, 1),
+            'prompt_tokens': usage.get('prompt_tokens'),
+            'completion_tokens': usage.get('completion_tokens'),
+            'errors': errors,
+            'ok': response is not None
+        }
+        if usage.get('cached_tokens'):
+            entry['cached_tokens'] = usage['cached_tokens']
+        if usage.get('estimated'):
+            entry['usage_estimated'] = True
+        self.game_log.setdefault('backend_calls', []).append(entry)
+        return entry
+
+    def log_reasoning(self, player_name, action_type, reasoning):
+        """Record the thinking behind a decision, kept apart from the answer itself."""
+        if self.reasoning_log == 'off':
+            return
+        self.reasoning.append({
+            'round': self.current_round_log['round_number'] if self.current_round_log else None,
+            'player': player_name,
+            'action': action_type,
+            'reasoning': reasoning
+        })
 
     def log_assassination(self, assassin, target, success):
         """Log assassination attempt."""
@@ -127,18 +235,35 @@ class GameLogger:
             'good_wins': sum(1 for r in mission_results if r == 'SUCCESS'),
             'evil_wins': sum(1 for r in mission_results if r == 'FAIL')
         }
+        if self.game_log.get('backend_calls'):
+            self.game_log['call_summary'] = summarize_calls(self.game_log['backend_calls'])
 
     def save_json(self):
         """Save game log as JSON file."""
         game_id = self.game_log['game_id']
         json_path = self.log_dir / f"game_{game_id}.json"
 
+        game_log = self.game_log
+        if self.reasoning and self.reasoning_log == 'inline':
+            game_log = dict(game_log, reasoning=self.reasoning)
+        elif self.reasoning and self.reasoning_log == 'gzip':
+            reasoning_path = self.save_reasoning()
+            game_log = dict(game_log, reasoning_file=reasoning_path.name)
+
         with open(json_path, 'w', encoding='utf-8') as f:
-            json.dump(self.game_log, f, indent=2, ensure_ascii=False)
+            json.dump(game_log, f, indent=2, ensure_ascii=False)
 
         print(f"\n[LOG] Game saved to: {json_path}")
         return json_path
 
+    def save_reasoning(self):
+        """Write the reasoning log as gzip-compressed JSON lines, one decision per line."""
+        reasoning_path = self.log_dir / f"game_{self.game_log['game_id']}_reasoning.jsonl.gz"
+        with gzip.open(reasoning_path, 'wt', encoding='utf-8') as f:
+            for entry in self.reasoning:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        return reasoning_path
+
     def save_text(self):
         """Save game log as human-readable text file."""
         game_id = self.game_log['game_id']
@@ -214,6 +339,13 @@ class GameLogger:
             f.write(f"Mission Results: {result['mission_results']}\n")
             f.write(f"Good Wins: {result['good_wins']} | Evil Wins: {result['evil_wins']}\n")
 
+            if self.game_log.get('call_summary'):
+                f.write("\n" + "-"*80 + "\n")
+                f.write("BACKEND CALLS\n")
+                f.write("-"*80 + "\n")
+                for line in format_call_summary(self.game_log['call_summary']):
+                    f.write(line + "\n")
+
         print(f"[LOG] Game log saved to: {text_path}")
         return text_path
 
@@ -223,70 +355,93 @@ class GameLogger:
         self.save_text()
 
     def get_game_history_summary(self):
-        """Generate a public timeline that every player remembers."""
-        rounds_snapshot = list(self.game_log['rounds'])
+        """
+        Generate a public timeline that every player remembers.
 
-        # Include in-progress round so later proposals within same round have context
-        if self.current_round_log and self.current_round_log not in rounds_snapshot:
-            rounds_snapshot.append(self.current_round_log)
+        The result is cached until the next logged event, so every player
+        prompted in the same phase gets the same string without rebuilding
+        it. Completed rounds are rendered once; only the in-progress round is
+        re-rendered after a change.
+        """
+        if self._history_cache and self._history_cache[0] == self._history_version:
+            return self._history_cache[1]
 
-        if not rounds_snapshot:
-            return "No previous rounds or proposals."
+        completed_rounds = self.game_log['rounds']
+        for round_data in completed_rounds[len(self._completed_round_segments):]:
+            self._completed_round_segments.append(self.render_round(round_data))
 
-        summary_lines = ["PUBLIC MEMORY TIMELINE (statements, votes, and mission outcomes):"]
+        segments = list(self._completed_round_segments)
 
-        def fmt_team(team_list):
-            return "[" + ", ".join(team_list) + "]" if team_list else "[]"
+        # Include in-progress round so later proposals within same round have context
+        if self.current_round_log and self.current_round_log not in completed_rounds:
+            segments.append(self.render_round(self.current_round_log))
 
-        for round_data in rounds_snapshot:
-            round_num = round_data['round_number']
-            status = "IN PROGRESS" if 'mission' not in round_data else "COMPLETED"
-            summary_lines.append(f"\nROUND {round_num} [{status}] - Team size {round_data['team_size']}")
-
-            if not round_data['proposals']:
-                summary_lines.append("  No proposals have been made yet.")
-                continue
-
-            for idx, proposal in enumerate(round_data['proposals'], start=1):
-                leader = proposal['leader']
-                forced_flag = " (FORCED 5TH VOTE)" if proposal.get('forced_mission') else ""
-                final_team = proposal['final_team'] or proposal['initial_team']
-                summary_lines.append(f"  Proposal {idx} by {leader}{forced_flag}: team {fmt_team(final_team)}")
-
-                if proposal['discussion']:
-                    summary_lines.append("    Discussion recap:")
-                    for comment in proposal['discussion']:
-                        tag = comment.get('tag')
-                        tag_text = f"[{tag}] " if tag else ""
-                        summary_lines.append(f"      {comment['player']}: {tag_text}{comment['comment']}")
-                else:
-                    summary_lines.append("    Discussion recap: (No comments recorded)")
-
-                if proposal['votes']:
-                    vote_lines = []
-                    for player, vote in proposal['votes'].items():
-                        vote_lines.append(f"{player}={'APPROVE' if vote else 'REJECT'}")
-                    summary_lines.append(f"    Votes: {', '.join(vote_lines)}")
-                elif not proposal.get('forced_mission'):
-                    summary_lines.append("    Votes: (Not recorded)")
-                else:
-                    summary_lines.append("    Votes: Skipped (forced mission)")
-
-                summary_lines.append(f"    Outcome: {'APPROVED' if proposal['approved'] else 'REJECTED'}")
+        if not segments:
+            summary = "No previous rounds or proposals."
+        else:
+            header = "PUBLIC MEMORY TIMELINE (statements, votes, and mission outcomes):"
+            summary = "\n".join([header] + segments)
 
-            if 'mission' in round_data:
-                mission = round_data['mission']
-                mission_team = mission['team']
-                fails = len(mission_team) - sum(1 for action in mission['actions'].values() if action)
-                result = 'SUCCESS' if mission['success'] else 'FAIL'
-                summary_lines.append("  Mission execution:")
-                summary_lines.append(f"    Team sent: {fmt_team(mission_team)}")
-                summary_lines.append(f"    Result: {result} ({fails} fail cards revealed)")
-
-                if mission['success']:
-                    summary_lines.append(f"    Shared deduction: Everyone on {fmt_team(mission_team)} gains trust after the success.")
-                else:
-                    summary_lines.append(f"    Shared deduction: At least one of {fmt_team(mission_team)} must be Evil.")
+        self._history_cache = (self._history_version, summary)
+        return summary
+
+    @staticmethod
+    def _fmt_team(team_list):
+        return "[" + ", ".join(team_list) + "]" if team_list else "[]"
+
+    def render_round(self, round_data):
+        """Render one round of the public timeline, as get_game_history_summary shows it."""
+        fmt_team = self._fmt_team
+        summary_lines = []
+
+        round_num = round_data['round_number']
+        status = "IN PROGRESS" if 'mission' not in round_data else "COMPLETED"
+        summary_lines.append(f"\nROUND {round_num} [{status}] - Team size {round_data['team_size']}")
+
+        if not round_data['proposals']:
+            summary_lines.append("  No proposals have been made yet.")
+            return "\n".join(summary_lines)
+
+        for idx, proposal in enumerate(round_data['proposals'], start=1):
+            leader = proposal['leader']
+            forced_flag = " (FORCED 5TH VOTE)" if proposal.get('forced_mission') else ""
+            final_team = proposal['final_team'] or proposal['initial_team']
+            summary_lines.append(f"  Proposal {idx} by {leader}{forced_flag}: team {fmt_team(final_team)}")
+
+            if proposal['discussion']:
+                summary_lines.append("    Discussion recap:")
+                for comment in proposal['discussion']:
+                    tag = comment.get('tag')
+                    tag_text = f"[{tag}] " if tag else ""
+                    summary_lines.append(f"      {comment['player']}: {tag_text}{comment['comment']}")
+            else:
+                summary_lines.append("    Discussion recap: (No comments recorded)")
+
+            if proposal['votes']:
+                vote_lines = []
+                for player, vote in proposal['votes'].items():
+                    vote_lines.append(f"{player}={'APPROVE' if vote else 'REJECT'}")
+                summary_lines.append(f"    Votes: {', '.join(vote_lines)}")
+            elif not proposal.get('forced_mission'):
+                summary_lines.append("    Votes: (Not recorded)")
+            else:
+                summary_lines.append("    Votes: Skipped (forced mission)")
+
+            summary_lines.append(f"    Outcome: {'APPROVED' if proposal['approved'] else 'REJECTED'}")
+
+        if 'mission' in round_data:
+            mission = round_data['mission']
+            mission_team = mission['team']
+            fails = len(mission_team) - sum(1 for action in mission['actions'].values() if action)
+            result = 'SUCCESS' if mission['success'] else 'FAIL'
+            summary_lines.append("  Mission execution:")
+            summary_lines.append(f"    Team sent: {fmt_team(mission_team)}")
+            summary_lines.append(f"    Result: {result} ({fails} fail cards revealed)")
+
+            if mission['success']:
+                summary_lines.append(f"    Shared deduction: Everyone on {fmt_team(mission_team)} gains trust after the success.")
+            else:
+                summary_lines.append(f"    Shared deduction: At least one of {fmt_team(mission_team)} must be Evil.")
 
         return "\n".join(summary_lines)
 
@@ -0,0 +1,202 @@
+"""
+Per-phase generation settings.
+Maps each game action to a token budget, stop sequences and temperature, and
+tracks which action the current backend call belongs to.
+"""
+
+import contextvars
+from contextlib import contextmanager
+
+# Action types used by the game controller
+ACTION_TYPES = [
+    'team_proposal', 'discussion', 'leader_final_proposal',
+    'vote', 'mission_action', 'assassination'
+]
+
+# max_tokens: answer budget; stop: sequences that end the answer;
+# temperature: sampling temperature; think: whether reasoning models think
+# first. A missing key keeps the backend's default. "action:faction" entries
+# (faction 'good' or 'evil') refine the action's settings for that side.
+# While a model thinks, max_tokens and stop are not sent to the server (see
+# server_settings), since they would also cut the reasoning.
+DEFAULT_GENERATION_POLICY = {
+    # Comments are cut to two sentences, so longer text is paid for and discarded
+    'discussion': {'max_tokens': 120, 'stop': ['\n\n'], 'temperature': 0.8},
+    'team_proposal': {'max_tokens': 256, 'temperature': 0.7},
+    'leader_final_proposal': {'max_tokens': 256, 'temperature': 0.7},
+    # One-word answers after optional reasoning
+    'vote': {'max_tokens': 256, 'temperature': 0.5},
+    'mission_action': {'max_tokens': 256, 'temperature': 0.5},
+    # Good players can only play SUCCESS, so there is nothing to think about
+    'mission_action:good': {'think': False},
+    'assassination': {'max_tokens': 512, 'temperature': 0.5},
+}
+
+# Name fragments of models that think before answering unless told not to
+REASONING_MODELS = ('deepseek-r1', 'deepseek-reasoner', 'qwq')
+
+# Settings a server would also apply to the reasoning
+ANSWER_ONLY_SETTINGS = ('max_tokens', 'stop')
+
+_current_action = contextvars.ContextVar('avalon_action_type', default=None)
+
+
+def current_action():
+    """Action type of the decision being made in this context, or None."""
+    return (_current_action.get() or (None, None))[0]
+
+
+def current_faction():
+    """Faction ('good' / 'evil') of the player deciding in this context, or None."""
+    return (_current_action.get() or (None, None))[1]
+
+
+@contextmanager
+def action_context(action_type, faction=None):
+    """Mark backend calls made inside the block as belonging to `action_type` (by `faction`)."""
+    token = _current_action.set((action_type, faction))
+    try:
+        yield
+    finally:
+        _current_action.reset(token)
+
+
+def is_reasoning_model(model_name):
+    """True if `model_name` names a model that thinks by default."""
+    name = (model_name or '').lower()
+    return any(fragment in name for fragment in REASONING_MODELS)
+
+
+def thinks(settings, model_name):
+    """Whether a call with these policy settings to `model_name` thinks before answering."""
+    if settings.get('think') is not None:
+        return bool(settings['think'])
+    return is_reasoning_model(model_name)
+
+
+def server_settings(settings, thinking):
+    """
+    The part of `settings` a backend should send to its server.
+
+    Servers count thinking tokens against the completion budget and match
+    stop sequences inside the reasoning, so while thinking the budget and
+    stops are left out; StopScanner applies them to the answer instead.
+    """
+    if not thinking:
+        return settings
+    return {key: value for key, value in settings.items() if key not in ANSWER_ONLY_SETTINGS}
+
+
+class GenerationPolicy:
+    """
+    Table of generation settings keyed by action type.
+
+    Backends ask for the settings of the current action and translate them to
+    their native parameters (max_tokens / num_predict / max_new_tokens, stop /
+    stop_strings, temperature, think). For calls that think first, the
+    budget and stop sequences cover the answer only (see server_settings).
+    """
+
+    def __init__(self, overrides=None, base=None):
+        """
+        Args:
+            overrides: {action_type: {setting: value}} merged over `base`;
+                a value of None removes that setting
+            base: Starting table (default: DEFAULT_GENERATION_POLICY)
+        """
+        base = DEFAULT_GENERATION_POLICY if base is None else base
+        self.table = {action: dict(settings) for action, settings in base.items()}
+        for action, settings in (overrides or {}).items():
+            merged = self.table.setdefault(action, {})
+            merged.update(settings)
+            for key in [k for k, v in merged.items() if v is None]:
+                del merged[key]
+
+    @classmethod
+    def disabled(cls):
+        """A policy that leaves every backend on its own settings."""
+        return cls(base={})
+
+    def for_action(self, action_type=None, faction=None):
+        """Settings for `action_type` (default: the current action and faction); {} if none apply."""
+        if action_type is None:
+            action_type, faction = current_action(), current_faction()
+        settings = dict(self.table.get(action_type, {}))
+        if faction:
+            settings.update(self.table.get(f'{action_type}:{faction}', {}))
+        return settings
+
+
+DEFAULT_POLICY = GenerationPolicy()
+
+
+class StopScanner:
+    """
+    Client-side stop sequences and token budget for backends that cannot
+    enforce them natively. Feed streamed text in; it returns the part to keep
+    and whether generation should end. Text that may be the start of a stop
+    sequence is held back until it is not; flush() returns it at the end.
+
+    A leading <think>...</think> block passes through untouched: stops and
+    the budget apply to the answer, which starts at the first non-blank
+    character after the block.
+    """
+
+    CHARS_PER_TOKEN = 4
+    THINK_OPEN, THINK_CLOSE = '<think>', '</think>'
+
+    def __init__(self, settings):
+        self.stop = [s for s in settings.get('stop', []) if s]
+        self.max_chars = settings['max_tokens'] * self.CHARS_PER_TOKEN if settings.get('max_tokens') else None
+        self.text = ''
+        self.sent = 0
+        self.answer_start = None
+
+    def _find_answer(self):
+        """Index where the answer starts in the text so far, or None if it has not started."""
+        body = self.text.lstrip()
+        if body.startswith(self.THINK_OPEN):
+            end = self.text.find(self.THINK_CLOSE)
+            if end == -1:
+                return None
+            after = end + len(self.THINK_CLOSE)
+            body = self.text[after:].lstrip()
+        elif self.THINK_OPEN.startswith(body):
+            # Blank so far, or a think tag that has not fully arrived
+            return None
+        return len(self.text) - len(body) if body else None
+
+    def _held(self):
+        """Length of the text's tail that may be the start of a stop sequence."""
+        tail = self.text[self.answer_start:]
+        return max((k for sequence in self.stop for k in range(1, len(sequence))
+                    if tail.endswith(sequence[:k])), default=0)
+
+    def feed(self, piece):
+        """Return (text to pass on, done)."""
+        self.text += piece
+        if self.answer_start is None:
+            self.answer_start = self._find_answer()
+            if self.answer_start is None:
+                self.sent = len(self.text)
+                return piece, False
+        cut = None
+        for sequence in self.stop:
+            idx = self.text.find(sequence, self.answer_start)
+            if idx != -1 and (cut is None or idx < cut):
+                cut = idx
+        if self.max_chars is not None and len(self.text) - self.answer_start >= self.max_chars:
+            limit = self.answer_start + self.max_chars
+            cut = limit if cut is None else min(cut, limit)
+        if cut is not None:
+            text = self.text[self.sent:cut] if cut > self.sent else ''
+            self.sent = len(self.text)
+            return text, True
+        end = max(self.sent, len(self.text) - self._held())
+        text, self.sent = self.text[self.sent:end], end
+        return text, False
+
+    def flush(self):
+        """Text held back as a possible stop sequence, to pass on when the stream ends."""
+        text, self.sent = self.text[self.sent:], len(self.text)
+        return text
@@ -0,0 +1,299 @@
+"""
+Hedged requests for AI backends.
+When a call is slower than usual, a duplicate is sent to the same or an
+alternate endpoint and whichever answers first is used.
+"""
+
+import asyncio
+import collections
+import math
+import threading
+
+from avalon_ai_game import BaseAI, has_native_decisions
+from generation_policy import current_action
+from history_compressor import TokenCounter
+from resilience import endpoint_key
+
+_END = object()
+
+
+class LatencyTracker:
+    """
+    Recent call latencies per action type for one endpoint, plus hedging counters.
+
+    Streams are tracked by time to first piece, separately from whole calls.
+    """
+
+    def __init__(self, name, percentile=95, min_samples=20, window=200):
+        """
+        Args:
+            name: Endpoint name, for reports
+            percentile: Calls slower than this percentile of recent ones are hedged
+            min_samples: Calls of an action type to observe before hedging it
+            window: Recent calls per action type that the percentile covers
+        """
+        self.name = name
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.window = window
+        self.samples = {}  # (kind, action type) -> deque of seconds
+        self.counters = {
+            'calls': 0, 'hedged': 0, 'hedge_wins': 0,
+            'extra_requests': 0, 'extra_tokens': 0, 'latency_saved_s': 0.0
+        }
+        self._lock = threading.Lock()
+
+    def record(self, kind, action, seconds):
+        with self._lock:
+            samples = self.samples.setdefault((kind, action), collections.deque(maxlen=self.window))
+            samples.append(seconds)
+
+    def hedge_delay(self, kind, action):
+        """Seconds to wait before hedging, or None while there are too few samples."""
+        with self._lock:
+            samples = sorted(self.samples.get((kind, action), ()))
+        if len(samples) < self.min_samples:
+            return None
+        return samples[max(0, math.ceil(self.percentile / 100 * len(samples)) - 1)]
+
+    def expected_latency(self, kind, action, at_least):
+        """Average recent latency among calls that took longer than `at_least` seconds."""
+        with self._lock:
+            slower = [s for s in self.samples.get((kind, action), ()) if s > at_least]
+        return sum(slower) / len(slower) if slower else at_least
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def snapshot(self):
+        with self._lock:
+            counters = dict(self.counters, latency_saved_s=round(self.counters['latency_saved_s'], 2))
+        delays = {}
+        for kind, action in list(self.samples):
+            delay = self.hedge_delay(kind, action)
+            if delay is not None:
+                delays[f"{kind}:{action or 'other'}"] = round(delay, 3)
+        return dict(counters, hedge_after_s=delays)
+
+
+_trackers = {}
+_trackers_lock = threading.Lock()
+
+
+def get_latency_tracker(endpoint, **settings):
+    """
+    Return the process-wide LatencyTracker for `endpoint`.
+
+    The first caller decides its settings (see LatencyTracker for the keywords).
+    """
+    with _trackers_lock:
+        if endpoint not in _trackers:
+            _trackers[endpoint] = LatencyTracker(endpoint, **settings)
+        return _trackers[endpoint]
+
+
+def hedging_state():
+    """Hedging counters and current hedge delays per endpoint in this process, for monitoring."""
+    with _trackers_lock:
+        trackers = dict(_trackers)
+    return {endpoint: tracker.snapshot() for endpoint, tracker in trackers.items()}
+
+
+async def _first_piece(stream):
+    """First piece of an async stream, or _END if it finished without one."""
+    try:
+        return await stream.__anext__()
+    except StopAsyncIteration:
+        return _END
+
+
+async def _settle(task):
+    """Cancel a losing task and wait for it to finish."""
+    task.cancel()
+    try:
+        await task
+    except (asyncio.CancelledError, Exception):
+        pass
+
+
+class HedgedAI(BaseAI):
+    """
+    Wrapper that sends a duplicate request when a call runs long.
+
+    If a call has not answered within the tracked latency percentile for its
+    action type, the same prompt goes to `alternate` (default: the same
+    backend) and the first usable answer wins; the other request is
+    cancelled, which drops its connection on HTTP backends. Streams are
+    hedged on time to first piece, since a stream cannot switch backends
+    once text has been passed on. Only the async methods hedge, which covers
+    both controllers; backends that run in a worker thread cannot be
+    cancelled, so their losing call finishes in the background.
+    """
+
+    def __init__(self, inner, alternate=None, endpoint=None, **settings):
+        """
+        Args:
+            inner: Backend to call first
+            alternate: Backend for the duplicate request (default: inner)
+            endpoint: Name that wrappers sharing latency history have in common
+                (default: inner's URL, or backend class and model)
+            **settings: percentile, min_samples, window (see LatencyTracker);
+                the first wrapper for an endpoint decides them
+        """
+        self.inner = inner
+        self.alternate = alternate or inner
+        self.tracker = get_latency_tracker(endpoint or endpoint_key(inner), **settings)
+        self._counter = TokenCounter()
+
+    def get_model_name(self):
+        return self.inner.get_model_name()
+
+    def get_generation_params(self):
+        return self.inner.get_generation_params()
+
+    def extract_choice(self, response, valid_choices):
+        return self.inner.extract_choice(response, valid_choices)
+
+    def call_model(self, prompt, max_retries=3):
+        return self.inner.call_model(prompt, max_retries)
+
+    def stream_model(self, prompt, max_retries=3):
+        return self.inner.stream_model(prompt, max_retries)
+
+    def _hedge_started(self, prompt):
+        self.tracker.count('hedged')
+        self.tracker.count('extra_requests')
+        # The duplicate's prompt is paid for even when it is cancelled
+        self.tracker.count('extra_tokens', self._counter.count(prompt))
+
+    def _hedge_won(self, kind, action, elapsed):
+        self.tracker.count('hedge_wins')
+        saved = self.tracker.expected_latency(kind, action, elapsed) - elapsed
+        self.tracker.count('latency_saved_s', max(0.0, saved))
+
+    def _loser_cost(self, task):
+        """Tokens a losing call reported, if it finished before being cancelled."""
+        if task.done() and not task.cancelled() and task.exception() is None:
+            usage = getattr(task.result(), 'usage', None) or {}
+            self.tracker.count('extra_tokens', usage.get('completion_tokens', 0))
+
+    async def _race(self, kind, start_primary, start_hedge, usable, prompt):
+        """
+        Run the primary call, adding the hedge once it is overdue.
+
+        Returns (winning task, the other task or None, whether the hedge won).
+        """
+        loop = asyncio.get_running_loop()
+        action = current_action()
+        self.tracker.count('calls')
+        started = loop.time()
+        primary = asyncio.ensure_future(start_primary())
+        hedge = None
+        try:
+            delay = self.tracker.hedge_delay(kind, action)
+            await asyncio.wait({primary}, timeout=delay)
+            if primary.done():
+                if usable(primary):
+                    self.tracker.record(kind, action, loop.time() - started)
+                return primary, None, False
+
+            self._hedge_started(prompt)
+            hedge_started = loop.time()
+            hedge = asyncio.ensure_future(start_hedge())
+            pending = {primary, hedge}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                # Prefer the primary when both finished together
+                for task in sorted(done, key=lambda t: t is hedge):
+                    if usable(task):
+                        other = hedge if task is primary else primary
+                        if task is primary:
+                            self.tracker.record(kind, action, loop.time() - started)
+                        else:
+                            self.tracker.record(kind, action, loop.time() - hedge_started)
+                            self._hedge_won(kind, action, loop.time() - started)
+                        return task, other, task is hedge
+            return primary, hedge, False
+        except asyncio.CancelledError:
+            for task in (primary, hedge):
+                if task is not None:
+                    await _settle(task)
+            raise
+
+    async def acall_model(self, prompt, max_retries=3):
+        winner, loser, _ = await self._race(
+            'call',
+            lambda: self.inner.acall_model(prompt, max_retries),
+            lambda: self.alternate.acall_model(prompt, max_retries),
+            lambda task: not task.cancelled() and task.exception() is None and task.result() is not None,
+            prompt
+        )
+        if loser is not None:
+            self._loser_cost(loser)
+            await _settle(loser)
+        return winner.result()
+
+    async def astream_model(self, prompt, max_retries=3):
+        streams = {}
+
+        def opener(name, backend):
+            async def first():
+                streams[name] = backend.astream_model(prompt, max_retries)
+                return await _first_piece(streams[name])
+            return first
+
+        winner, loser, hedge_won = await self._race(
+            'stream',
+            opener('primary', self.inner),
+            opener('hedge', self.alternate),
+            lambda task: not task.cancelled() and task.exception() is None and task.result() is not _END,
+            prompt
+        )
+        if loser is not None:
+            await _settle(loser)
+            stream = streams.get('primary' if hedge_won else 'hedge')
+            if stream is not None:
+                await stream.aclose()
+
+        stream = streams['hedge' if hedge_won else 'primary']
+        try:
+            first = winner.result()
+            if first is _END:
+                return
+            yield first
+            async for piece in stream:
+                yield piece
+        finally:
+            await stream.aclose()
+
+    async def achoose(self, prompt, choices, max_retries=3):
+        if not has_native_decisions(self.inner):
+            return await super().achoose(prompt, choices, max_retries)
+        return await self.inner.achoose(prompt, choices, max_retries)
+
+    async def aselect_team(self, prompt, player_names, team_size, max_retries=3):
+        if not has_native_decisions(self.inner):
+            return await super().aselect_team(prompt, player_names, team_size, max_retries)
+        return await self.inner.aselect_team(prompt, player_names, team_size, max_retries)
+
+    def choose(self, prompt, choices, max_retries=3):
+        if not has_native_decisions(self.inner):
+            return super().choose(prompt, choices, max_retries)
+        return self.inner.choose(prompt, choices, max_retries)
+
+    def select_team(self, prompt, player_names, team_size, max_retries=3):
+        if not has_native_decisions(self.inner):
+            return super().select_team(prompt, player_names, team_size, max_retries)
+        return self.inner.select_team(prompt, player_names, team_size, max_retries)
+
+
+class HedgedBackendFactory:
+    """Picklable backend factory that wraps another factory's backends in HedgedAI."""
+
+    def __init__(self, backend_factory, **settings):
+        self.backend_factory = backend_factory
+        self.settings = settings
+
+    def __call__(self):
+        return HedgedAI(self.backend_factory(), **self.settings)
@@ -0,0 +1,183 @@
+"""
+Token-budgeted compression of the public game timeline for prompts.
+Keeps the current round verbatim and shrinks completed rounds to structured facts.
+"""
+
+import math
+
+
+class TokenCounter:
+    """Estimate text length in tokens, using a real tokenizer when one is available."""
+
+    # Rough English/code average for BPE tokenizers when no tokenizer is loaded
+    CHARS_PER_TOKEN = 4
+
+    def __init__(self, tokenizer=None):
+        """
+        Args:
+            tokenizer: A Hugging Face tokenizer instance, a model name/path to
+                load one from, or None for the character-based estimate
+        """
+        if isinstance(tokenizer, str):
+            tokenizer = self._load_tokenizer(tokenizer)
+        self.tokenizer = tokenizer
+
+    @staticmethod
+    def _load_tokenizer(name):
+        try:
+            from transformers import AutoTokenizer
+            return AutoTokenizer.from_pretrained(name)
+        except ImportError:
+            print("  [Warning] transformers not installed, using character-based token estimate")
+        except Exception as e:
+            print(f"  [Warning] Could not load tokenizer '{name}': {e}")
+        return None
+
+    def count(self, text):
+        """Return the number of tokens in `text`."""
+        if not text:
+            return 0
+        if self.tokenizer is not None:
+            return len(self.tokenizer.encode(text, add_special_tokens=False))
+        return math.ceil(len(text) / self.CHARS_PER_TOKEN)
+
+
+class HistoryCompressor:
+    """
+    Fit the public timeline into a token budget.
+
+    Compression is applied in stages until the timeline fits, always to the
+    oldest completed rounds first:
+      1. drop discussion quotes (teams, votes and outcomes stay)
+      2. reduce the round to one line of facts: mission result and each
+         player's approve/reject on every proposal
+      3. omit the round, keeping a count of omitted rounds
+    The in-progress round is never compressed.
+    """
+
+    def __init__(self, token_budget, counter=None):
+        """
+        Args:
+            token_budget: Maximum tokens for the timeline section of a prompt
+            counter: TokenCounter used to measure text (default: estimate)
+        """
+        self.token_budget = token_budget
+        self.counter = counter or TokenCounter()
+        self._cache = None  # ((logger id, history version), (text, report))
+
+    def compress(self, logger):
+        """
+        Return (timeline_text, report) for the logger's current history.
+
+        The report holds full_tokens, sent_tokens, tokens_saved and the
+        number of completed rounds at each compression stage. Results are
+        cached per logged event, like the full timeline itself.
+        """
+        key = (id(logger), logger.history_version())
+        if self._cache and self._cache[0] == key:
+            return self._cache[1]
+
+        full_text = logger.get_game_history_summary()
+        full_tokens = self.counter.count(full_text)
+        result = (full_text, self._report(full_tokens, full_tokens, [0] * len(logger.game_log['rounds'])))
+
+        if full_tokens > self.token_budget:
+            result = self._compress_rounds(logger, full_text, full_tokens)
+
+        self._cache = (key, result)
+        return result
+
+    def _compress_rounds(self, logger, full_text, full_tokens):
+        completed = logger.game_log['rounds']
+        current = logger.current_round_log if logger.current_round_log not in completed else None
+        current_text = logger.render_round(current) if current else ''
+
+        # Stage per completed round: 0 verbatim, 1 no quotes, 2 facts, 3 omitted
+        stages = [0] * len(completed)
+        text = full_text
+        for stage in (1, 2, 3):
+            for idx in range(len(completed)):
+                stages[idx] = stage
+                text = self._render(logger, completed, stages, current_text)
+                if self.counter.count(text) <= self.token_budget:
+                    return text, self._report(full_tokens, self.counter.count(text), stages)
+
+        return text, self._report(full_tokens, self.counter.count(text), stages)
+
+    def _render(self, logger, completed, stages, current_text):
+        header = "PUBLIC MEMORY TIMELINE (statements, votes, and mission outcomes):"
+        lines = [header]
+
+        omitted = [r['round_number'] for r, stage in zip(completed, stages) if stage == 3]
+        if omitted:
+            lines.append(f"\n(Rounds {omitted[0]}-{omitted[-1]} omitted for length; "
+                         f"see mission status for their results.)")
+
+        for round_data, stage in zip(completed, stages):
+            if stage == 0:
+                lines.append(logger.render_round(round_data))
+            elif stage == 1:
+                lines.append(self._render_without_quotes(round_data))
+            elif stage == 2:
+                lines.append(self._render_facts(round_data))
+
+        if current_text:
+            lines.append(current_text)
+        return "\n".join(lines)
+
+    @staticmethod
+    def _fmt_votes(votes):
+        approvers = [p for p, v in votes.items() if v]
+        rejecters = [p for p, v in votes.items() if not v]
+        return f"approve [{', '.join(approvers)}], reject [{', '.join(rejecters)}]"
+
+    @staticmethod
+    def _mission_fails(mission):
+        return sum(1 for action in mission['actions'].values() if not action)
+
+    def _render_without_quotes(self, round_data):
+        """Completed round with every proposal and vote, but no discussion quotes."""
+        lines = [f"\nROUND {round_data['round_number']} [COMPLETED] - Team size {round_data['team_size']}"]
+        for idx, proposal in enumerate(round_data['proposals'], start=1):
+            team = proposal['final_team'] or proposal['initial_team']
+            outcome = 'APPROVED' if proposal['approved'] else 'REJECTED'
+            if proposal.get('forced_mission'):
+                lines.append(f"  Proposal {idx} by {proposal['leader']} (FORCED 5TH VOTE): team [{', '.join(team)}] -> {outcome}")
+            else:
+                lines.append(f"  Proposal {idx} by {proposal['leader']}: team [{', '.join(team)}] -> {outcome}; "
+                             f"votes {self._fmt_votes(proposal['votes'])}")
+
+        if 'mission' in round_data:
+            mission = round_data['mission']
+            result = 'SUCCESS' if mission['success'] else 'FAIL'
+            lines.append(f"  Mission: team [{', '.join(mission['team'])}] -> {result} "
+                         f"({self._mission_fails(mission)} fail cards)")
+        return "\n".join(lines)
+
+    def _render_facts(self, round_data):
+        """Completed round as a single line of facts: the mission and every vote."""
+        parts = [f"\nROUND {round_data['round_number']} [COMPLETED]"]
+
+        if 'mission' in round_data:
+            mission = round_data['mission']
+            result = 'SUCCESS' if mission['success'] else 'FAIL'
+            parts.append(f"mission [{', '.join(mission['team'])}] {result} ({self._mission_fails(mission)} fails)")
+        for proposal in round_data['proposals']:
+            team = ', '.join(proposal['final_team'] or proposal['initial_team'])
+            if proposal.get('forced_mission'):
+                parts.append(f"{proposal['leader']}: [{team}] forced")
+            else:
+                outcome = 'approved' if proposal['approved'] else 'rejected'
+                parts.append(f"{proposal['leader']}: [{team}] {outcome}, {self._fmt_votes(proposal['votes'])}")
+        return " | ".join(parts)
+
+    @staticmethod
+    def _report(full_tokens, sent_tokens, stages):
+        return {
+            'full_tokens': full_tokens,
+            'sent_tokens': sent_tokens,
+            'tokens_saved': full_tokens - sent_tokens,
+            'rounds_without_quotes': stages.count(1),
+            'rounds_as_facts': stages.count(2),
+            'rounds_omitted': stages.count(3)
+        }
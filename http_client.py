@@ -0,0 +1,423 @@
+"""
+Minimal HTTP/1.1 client helpers for the AI backends.
+Standard library only, so the API backends keep working without extra dependencies.
+"""
+
+import asyncio
+import http.client
+import json
+import queue
+import ssl
+import threading
+import weakref
+from urllib.parse import urlsplit
+
+
+class HTTPError(Exception):
+    """Raised when a server answers with a non-2xx status code."""
+
+    def __init__(self, status, body=b'', headers=None):
+        self.status = status
+        self.body = body
+        self.headers = headers or {}
+        preview = body[:200].decode('utf-8', errors='replace') if body else ''
+        super().__init__(f"HTTP {status}: {preview}")
+
+
+class HTTPResponse:
+    """A fully read HTTP response."""
+
+    def __init__(self, status, headers, body):
+        self.status = status
+        self.headers = headers  # lower-cased header names
+        self.body = body
+
+    def json(self):
+        return json.loads(self.body.decode('utf-8'))
+
+
+def _split_url(url):
+    """Return (scheme, host, port, path) for an http(s) URL."""
+    parts = urlsplit(url)
+    scheme = parts.scheme or 'http'
+    port = parts.port or (443 if scheme == 'https' else 80)
+    path = parts.path or '/'
+    if parts.query:
+        path += '?' + parts.query
+    return scheme, parts.hostname, port, path
+
+
+class HTTPConnectionPool:
+    """
+    Thread-safe pool of keep-alive connections to a single host.
+
+    Up to `maxsize` idle connections are kept open between requests; extra
+    concurrent requests open temporary connections that are closed after use.
+    """
+
+    # Errors that mean a pooled connection was closed by the server while idle
+    STALE_CONNECTION_ERRORS = (
+        http.client.RemoteDisconnected,
+        http.client.CannotSendRequest,
+        ConnectionResetError,
+        BrokenPipeError,
+    )
+
+    def __init__(self, base_url, maxsize=8, timeout=30):
+        self.scheme, self.host, self.port, _ = _split_url(base_url)
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self._idle = queue.LifoQueue(maxsize)
+
+    def _new_connection(self, timeout):
+        if self.scheme == 'https':
+            return http.client.HTTPSConnection(
+                self.host, self.port, timeout=timeout, context=ssl.create_default_context()
+            )
+        return http.client.HTTPConnection(self.host, self.port, timeout=timeout)
+
+    def _release(self, conn):
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def _open(self, method, url, body, headers, timeout):
+        """Send a request and return (connection, http.client response) with the body unread."""
+        path = _split_url(url)[3] if '://' in url else url
+        timeout = timeout or self.timeout
+
+        while True:
+            try:
+                conn, reused = self._idle.get_nowait(), True
+            except queue.Empty:
+                conn, reused = self._new_connection(timeout), False
+
+            conn.timeout = timeout
+            if conn.sock is not None:
+                conn.sock.settimeout(timeout)
+
+            try:
+                conn.request(method, path, body=body, headers=headers or {})
+                return conn, conn.getresponse()
+            except self.STALE_CONNECTION_ERRORS:
+                conn.close()
+                if reused:
+                    continue
+                raise
+            except BaseException:
+                conn.close()
+                raise
+
+    def request(self, method, url, body=b'', headers=None, timeout=None):
+        """Send a request and return an HTTPResponse; raises HTTPError on non-2xx."""
+        conn, raw = self._open(method, url, body, headers, timeout)
+        try:
+            data = raw.read()
+        except BaseException:
+            conn.close()
+            raise
+
+        response = HTTPResponse(raw.status, {k.lower(): v for k, v in raw.getheaders()}, data)
+        if raw.will_close:
+            conn.close()
+        else:
+            self._release(conn)
+
+        if not 200 <= response.status < 300:
+            raise HTTPError(response.status, response.body, response.headers)
+        return response
+
+    def post_json(self, url, payload, headers=None, timeout=None):
+        """POST a JSON payload and return the decoded JSON response."""
+        all_headers = {'Content-Type': 'application/json'}
+        all_headers.update(headers or {})
+        response = self.request('POST', url, json.dumps(payload).encode('utf-8'), all_headers, timeout)
+        return response.json()
+
+    def stream_lines(self, method, url, body=b'', headers=None, timeout=None):
+        """
+        Send a request and yield the response body line by line as it arrives.
+
+        Closing the generator early closes the connection instead of returning
+        it to the pool, which also tells the server to stop generating.
+        """
+        conn, raw = self._open(method, url, body, headers, timeout)
+        if not 200 <= raw.status < 300:
+            try:
+                data = raw.read()
+            finally:
+                conn.close()
+            raise HTTPError(raw.status, data, {k.lower(): v for k, v in raw.getheaders()})
+
+        completed = False
+        try:
+            while True:
+                line = raw.readline()
+                if not line:
+                    break
+                yield line
+            completed = True
+        finally:
+            if completed and not raw.will_close:
+                self._release(conn)
+            else:
+                conn.close()
+
+    def post_json_stream(self, url, payload, headers=None, timeout=None):
+        """POST a JSON payload and yield the non-empty response lines (NDJSON or SSE)."""
+        all_headers = {'Content-Type': 'application/json'}
+        all_headers.update(headers or {})
+        for line in self.stream_lines('POST', url, json.dumps(payload).encode('utf-8'), all_headers, timeout):
+            line = line.strip()
+            if line:
+                yield line
+
+    def close(self):
+        """Close every idle connection."""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_connection_pool(base_url, maxsize=8):
+    """
+    Return the process-wide pool for the host of `base_url`.
+
+    Backends pointing at the same server share one pool; the first caller
+    decides its size.
+    """
+    scheme, host, port, _ = _split_url(base_url)
+    key = (scheme, host, port)
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = HTTPConnectionPool(base_url, maxsize=maxsize)
+        return _pools[key]
+
+
+class AsyncHTTPClient:
+    """
+    Keep-alive HTTP/1.1 client built on asyncio streams.
+
+    Idle connections are pooled per event loop and per (scheme, host, port),
+    so one instance can be shared by many games running on the same loop.
+    Close them with aclose() before the loop ends.
+    """
+
+    def __init__(self, max_idle_per_host=10):
+        self.max_idle_per_host = max_idle_per_host
+        # (scheme, host, port) -> idle connections kept for that host
+        self._host_limits = {}
+        # loop -> {(scheme, host, port): [(reader, writer), ...]}
+        self._idle = weakref.WeakKeyDictionary()
+
+    def set_pool_size(self, base_url, max_idle):
+        """Keep up to `max_idle` idle connections to the host of `base_url`; the first caller decides."""
+        scheme, host, port, _ = _split_url(base_url)
+        self._host_limits.setdefault((scheme, host, port), max_idle)
+
+    def _pool(self, key):
+        loop = asyncio.get_running_loop()
+        return self._idle.setdefault(loop, {}).setdefault(key, [])
+
+    async def aclose(self):
+        """Close the idle connections pooled for the running event loop."""
+        pools = self._idle.pop(asyncio.get_running_loop(), {})
+        writers = [writer for pool in pools.values() for _, writer in pool]
+        for writer in writers:
+            writer.close()
+        for writer in writers:
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+
+    async def _connect(self, scheme, host, port):
+        ssl_context = ssl.create_default_context() if scheme == 'https' else None
+        return await asyncio.open_connection(host, port, ssl=ssl_context)
+
+    def _release(self, key, conn):
+        pool = self._pool(key)
+        reader, writer = conn
+        if len(pool) < self._host_limits.get(key, self.max_idle_per_host) and not writer.is_closing():
+            pool.append(conn)
+        else:
+            writer.close()
+
+    async def _read_head(self, reader):
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionResetError("Connection closed before response")
+        status = int(status_line.split()[1])
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        return status, headers
+
+    async def _read_body(self, reader, headers):
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b';')[0], 16)
+                if size == 0:
+                    await reader.readline()
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readline()
+            return b''.join(chunks)
+        if 'content-length' in headers:
+            return await reader.readexactly(int(headers['content-length']))
+        return await reader.read()
+
+    async def _send_head(self, conn, method, host, path, body, headers):
+        """Write the request and read the response status line and headers."""
+        reader, writer = conn
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {host}", "Connection: keep-alive"]
+        for name, value in (headers or {}).items():
+            lines.append(f"{name}: {value}")
+        lines.append(f"Content-Length: {len(body)}")
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode('latin-1') + body)
+        await writer.drain()
+        return await self._read_head(reader)
+
+    async def _send(self, conn, method, host, path, body, headers):
+        status, resp_headers = await self._send_head(conn, method, host, path, body, headers)
+        resp_body = await self._read_body(conn[0], resp_headers)
+        return HTTPResponse(status, resp_headers, resp_body)
+
+    async def _with_connection(self, key, send, timeout):
+        """
+        Run `send(conn)` on a pooled or new connection; returns (conn, result).
+
+        A pooled connection may have been closed by the server; that is retried
+        once on a fresh one.
+        """
+        scheme, host, port = key
+        pool = self._pool(key)
+        for reused in ([True] if pool else []) + [False]:
+            conn = pool.pop() if reused else await asyncio.wait_for(self._connect(scheme, host, port), timeout)
+            try:
+                return conn, await asyncio.wait_for(send(conn), timeout)
+            except (ConnectionError, asyncio.IncompleteReadError, ValueError, IndexError):
+                conn[1].close()
+                if reused:
+                    continue
+                raise
+            except BaseException:
+                conn[1].close()
+                raise
+
+    async def request(self, method, url, body=b'', headers=None, timeout=30):
+        """Send a request and return an HTTPResponse; raises HTTPError on non-2xx."""
+        scheme, host, port, path = _split_url(url)
+        key = (scheme, host, port)
+        conn, response = await self._with_connection(
+            key, lambda conn: self._send(conn, method, host, path, body, headers), timeout
+        )
+
+        if response.headers.get('connection', '').lower() == 'close':
+            conn[1].close()
+        else:
+            self._release(key, conn)
+
+        if not 200 <= response.status < 300:
+            raise HTTPError(response.status, response.body, response.headers)
+        return response
+
+    async def post_json(self, url, payload, headers=None, timeout=30):
+        """POST a JSON payload and return the decoded JSON response."""
+        all_headers = {'Content-Type': 'application/json'}
+        all_headers.update(headers or {})
+        response = await self.request('POST', url, json.dumps(payload).encode('utf-8'), all_headers, timeout)
+        return response.json()
+
+    async def _iter_body(self, reader, headers, timeout):
+        """Yield the raw body in pieces as they arrive."""
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            while True:
+                size = int((await asyncio.wait_for(reader.readline(), timeout)).split(b';')[0], 16)
+                if size == 0:
+                    await reader.readline()
+                    return
+                yield await asyncio.wait_for(reader.readexactly(size), timeout)
+                await reader.readline()
+        elif 'content-length' in headers:
+            remaining = int(headers['content-length'])
+            while remaining > 0:
+                piece = await asyncio.wait_for(reader.read(min(remaining, 65536)), timeout)
+                if not piece:
+                    raise asyncio.IncompleteReadError(b'', remaining)
+                remaining -= len(piece)
+                yield piece
+        else:
+            while True:
+                piece = await asyncio.wait_for(reader.read(65536), timeout)
+                if not piece:
+                    return
+                yield piece
+
+    async def stream_lines(self, method, url, body=b'', headers=None, timeout=30):
+        """
+        Send a request and yield the response body line by line as it arrives.
+
+        `timeout` applies to connecting and to each read. Closing the generator
+        early closes the connection instead of returning it to the pool, which
+        also tells the server to stop generating.
+        """
+        scheme, host, port, path = _split_url(url)
+        key = (scheme, host, port)
+        conn, (status, resp_headers) = await self._with_connection(
+            key, lambda conn: self._send_head(conn, method, host, path, body, headers), timeout
+        )
+
+        if not 200 <= status < 300:
+            try:
+                data = await asyncio.wait_for(self._read_body(conn[0], resp_headers), timeout)
+            finally:
+                conn[1].close()
+            raise HTTPError(status, data, resp_headers)
+
+        completed = False
+        try:
+            buffer = b''
+            async for piece in self._iter_body(conn[0], resp_headers, timeout):
+                buffer += piece
+                *lines, buffer = buffer.split(b'\n')
+                for line in lines:
+                    yield line + b'\n'
+            if buffer:
+                yield buffer
+            completed = True
+        finally:
+            if completed and resp_headers.get('connection', '').lower() != 'close':
+                self._release(key, conn)
+            else:
+                conn[1].close()
+
+    async def post_json_stream(self, url, payload, headers=None, timeout=30):
+        """POST a JSON payload and yield the non-empty response lines (NDJSON or SSE)."""
+        all_headers = {'Content-Type': 'application/json'}
+        all_headers.update(headers or {})
+        async for line in self.stream_lines('POST', url, json.dumps(payload).encode('utf-8'), all_headers, timeout):
+            line = line.strip()
+            if line:
+                yield line
+
+
+_shared_async_client = AsyncHTTPClient()
+
+
+def get_async_client():
+    """Return the process-wide AsyncHTTPClient (its pools are per event loop)."""
+    return _shared_async_client
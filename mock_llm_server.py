@@ -0,0 +1,688 @@
+#!/usr/bin/env python3
+"""
+Mock LLM server for load testing.
+Speaks the OpenAI chat completions and Ollama APIs and answers every Avalon
+prompt with a legal decision, after a configurable delay and with injected
+errors and throttling, so games, batch runs and the web UI can be
+benchmarked offline.
+"""
+
+import argparse
+import ast
+import itertools
+import json
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from generation_policy import ACTION_TYPES
+
+# Closing line of each prompt in prompts.py -> action type it asks for
+PROMPT_MARKERS = [
+    ('Your selection:', 'team_proposal'),
+    ('Your final team:', 'leader_final_proposal'),
+    ('Your comment:', 'discussion'),
+    ('Your vote:', 'vote'),
+    ('Your action:', 'mission_action'),
+    ('Your assassination target:', 'assassination'),
+]
+
+TEAM_ACTIONS = ('team_proposal', 'leader_final_proposal')
+
+DISCUSSION_COMMENTS = [
+    "This team looks reasonable to me, but I will be watching the mission result closely.",
+    "I am not fully convinced yet. Let's compare this with the earlier votes before deciding.",
+    "I trust most of these players so far. A clean mission here would tell us a lot.",
+    "Something about the last vote bothers me, so I would like to hear the leader explain this pick.",
+]
+
+# Filler analysis placed before an answer; contains none of the answer words
+ANALYSIS_WORDS = "Looking back over the timeline , the proposals and the voting record suggest a careful choice here .".split()
+
+TOKEN_PATTERN = re.compile(r'\s*\S+')
+
+
+class LatencyDistribution:
+    """
+    Random delay before the first token, parsed from a spec string.
+
+    Specs:
+        fixed:S               always S seconds
+        uniform:LOW,HIGH      uniform between LOW and HIGH seconds
+        lognormal:MEDIAN,SIGMA  log-normal with the given median; SIGMA ~1 gives a long tail
+        exponential:MEAN      exponential with the given mean
+    """
+
+    KINDS = ('fixed', 'uniform', 'lognormal', 'exponential')
+
+    def __init__(self, spec='fixed:0'):
+        kind, _, args = spec.partition(':')
+        try:
+            self.params = [float(arg) for arg in args.split(',') if arg]
+        except ValueError:
+            raise ValueError(f"Invalid latency spec: {spec}")
+        expected = {'fixed': 1, 'uniform': 2, 'lognormal': 2, 'exponential': 1}.get(kind)
+        if expected is None or len(self.params) != expected:
+            raise ValueError(f"Invalid latency spec: {spec} (expected one of {', '.join(self.KINDS)})")
+        self.kind = kind
+        self.spec = spec
+
+    def sample(self, rng):
+        if self.kind == 'fixed':
+            return self.params[0]
+        if self.kind == 'uniform':
+            return rng.uniform(*self.params)
+        if self.kind == 'lognormal':
+            median, sigma = self.params
+            return median * rng.lognormvariate(0, sigma) if median > 0 else 0.0
+        return rng.expovariate(1 / self.params[0]) if self.params[0] > 0 else 0.0
+
+
+def prompt_action(prompt):
+    """Action type a prompt asks for, 'team_json' for a JSON team answer, or None."""
+    tail = prompt.rstrip()
+    for marker, action in PROMPT_MARKERS:
+        if tail.endswith(marker):
+            return action
+    if tail.endswith('JSON:'):
+        return 'team_json'
+    return None
+
+
+def _names(text):
+    """Player names from a prompt line: a Python list repr or a comma-separated list."""
+    text = text.strip()
+    try:
+        names = ast.literal_eval(text)
+        if isinstance(names, (list, tuple)):
+            return [str(name) for name in names]
+    except (ValueError, SyntaxError):
+        pass
+    return [name.strip() for name in text.split(',') if name.strip()]
+
+
+def team_request(prompt, schema=None):
+    """(player names, team size) asked for by a team prompt, preferring the JSON schema's enum."""
+    names, size = [], None
+    team = ((schema or {}).get('properties') or {}).get('team') or {}
+    if team:
+        names = list((team.get('items') or {}).get('enum') or [])
+        size = team.get('minItems')
+
+    json_format = re.search(r'must list exactly (\d+) different players from: (.*)', prompt)
+    if json_format:
+        size = size or int(json_format.group(1))
+        names = names or _names(json_format.group(2))
+    if not names:
+        players = re.findall(r'^Players: (.*)$', prompt, re.MULTILINE)
+        if players:
+            names = _names(players[-1])
+    if size is None:
+        sizes = re.findall(r'select exactly (\d+)', prompt)
+        size = int(sizes[-1]) if sizes else 2
+    return names, min(size, len(names))
+
+
+def good_players(prompt):
+    match = re.search(r'^Good players: (.*)$', prompt, re.MULTILINE)
+    return _names(match.group(1)) if match else []
+
+
+class AnswerScript:
+    """
+    Answers per action type, loaded from a JSON file and used in turn:
+
+        {"vote": ["APPROVE", "APPROVE", "REJECT"],
+         "team_proposal": [["Alice", "Bob"], "Charlie, Diana"],
+         "discussion": ["I trust this team."]}
+
+    Team answers may be lists of names or comma-separated strings. Action
+    types missing from the script get generated answers.
+    """
+
+    def __init__(self, path):
+        with open(path, 'r') as f:
+            script = json.load(f)
+        unknown = set(script) - set(ACTION_TYPES)
+        if unknown:
+            raise ValueError(f"Unknown action types in {path}: {', '.join(sorted(unknown))}")
+        self._answers = {action: itertools.cycle(answers) for action, answers in script.items() if answers}
+        self._lock = threading.Lock()
+
+    def next(self, action):
+        """Next scripted answer for `action`, or None."""
+        with self._lock:
+            answers = self._answers.get(action)
+            return next(answers) if answers else None
+
+
+class MockLLM:
+    """Answers, delays, failure injection and counters shared by every request to the server."""
+
+    def __init__(self, latency='fixed:0', tokens_per_second=0, error_rate=0.0, rate_limit_rate=0.0,
+                 retry_after=1.0, max_concurrency=None, answers='random', script=None, seed=None,
+                 reasoning_tokens=0, analysis_tokens=0, models=('mock',)):
+        """
+        Args:
+            latency: Time-to-first-token distribution spec (see LatencyDistribution)
+            tokens_per_second: Output pacing after the first token (0: no pacing)
+            error_rate: Fraction of generation requests answered with HTTP 500
+            rate_limit_rate: Fraction of generation requests answered with HTTP 429
+            retry_after: Retry-After seconds sent with 429s
+            max_concurrency: Generation requests served at once; more get a 429
+            answers: 'random' (legal answers picked at random) or 'first'
+                (always the first legal answer)
+            script: Path of a JSON AnswerScript whose answers take precedence
+            seed: Random seed for answers, delays and injected failures
+            reasoning_tokens: Reasoning tokens produced before each answer
+                (reasoning_content / thinking, or an inline <think> block)
+            analysis_tokens: Analysis tokens written before one-word and team answers
+            models: Model names reported by /v1/models and /api/tags
+        """
+        if answers not in ('random', 'first'):
+            raise ValueError(f"Unknown answer mode: {answers}")
+        self.latency = LatencyDistribution(latency)
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.max_concurrency = max_concurrency
+        self.answers = answers
+        self.script = AnswerScript(script) if script else None
+        self.reasoning_tokens = reasoning_tokens
+        self.analysis_tokens = analysis_tokens
+        self.models = list(models)
+
+        self.in_flight = 0
+        self.counters = {
+            'requests': 0, 'completed': 0, 'disconnected': 0, 'errors_injected': 0,
+            'rate_limited': 0, 'over_capacity': 0, 'peak_in_flight': 0,
+            'prompt_tokens': 0, 'completion_tokens': 0
+        }
+        self.by_action = {}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.counters, in_flight=self.in_flight, by_action=dict(self.by_action))
+
+    def admit(self):
+        """
+        Start a generation request: (status, message) of an injected failure,
+        or None once the request counts as in flight.
+        """
+        with self._lock:
+            self.counters['requests'] += 1
+            roll = self._rng.random()
+            if roll < self.error_rate:
+                self.counters['errors_injected'] += 1
+                return 500, 'Injected server error'
+            if roll < self.error_rate + self.rate_limit_rate:
+                self.counters['rate_limited'] += 1
+                return 429, 'Injected rate limit'
+            if self.max_concurrency and self.in_flight >= self.max_concurrency:
+                self.counters['over_capacity'] += 1
+                return 429, f'Over capacity ({self.max_concurrency} requests in flight)'
+            self.in_flight += 1
+            self.counters['peak_in_flight'] = max(self.counters['peak_in_flight'], self.in_flight)
+            return None
+
+    def finish(self, disconnected=False):
+        with self._lock:
+            self.in_flight -= 1
+            self.counters['disconnected' if disconnected else 'completed'] += 1
+
+    def first_token_delay(self):
+        with self._lock:
+            return max(0.0, self.latency.sample(self._rng))
+
+    def token_delay(self):
+        return 1 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+
+    def _pick(self, options, count=None):
+        with self._lock:
+            if self.answers == 'first':
+                return options[0] if count is None else options[:count]
+            return self._rng.choice(options) if count is None else self._rng.sample(options, count)
+
+    def _analysis(self):
+        words = itertools.islice(itertools.cycle(ANALYSIS_WORDS), self.analysis_tokens)
+        return ' '.join(words) + '\n' if self.analysis_tokens else ''
+
+    def answer(self, prompt, schema=None, json_mode=False):
+        """(action type, answer text) for a prompt."""
+        action = prompt_action(prompt)
+        if action == 'team_json':
+            action, json_mode = 'team_proposal', True
+        if action in TEAM_ACTIONS and schema:
+            json_mode = True
+        with self._lock:
+            self.by_action[action or 'other'] = self.by_action.get(action or 'other', 0) + 1
+
+        scripted = self.script.next(action) if self.script and action else None
+
+        if action in TEAM_ACTIONS:
+            names, size = team_request(prompt, schema)
+            team = scripted if scripted is not None else self._pick(names, size)
+            if isinstance(team, str):
+                team = [name.strip() for name in team.split(',') if name.strip()]
+            if json_mode:
+                return action, json.dumps({'reasoning': 'These players have the cleanest record so far.', 'team': team})
+            return action, self._analysis() + ', '.join(team)
+        if scripted is not None:
+            return action, scripted
+        if action == 'discussion':
+            return action, self._pick(DISCUSSION_COMMENTS)
+        if action == 'vote':
+            return action, self._analysis() + self._pick(['APPROVE', 'REJECT'])
+        if action == 'mission_action':
+            return action, self._analysis() + self._pick(['SUCCESS', 'FAIL'])
+        if action == 'assassination':
+            targets = good_players(prompt)
+            return action, self._analysis() + (self._pick(targets) if targets else 'Alice')
+        return action, 'OK'
+
+    def reasoning(self):
+        words = itertools.islice(itertools.cycle(ANALYSIS_WORDS), self.reasoning_tokens)
+        return ' '.join(words)
+
+
+def tokens(text):
+    """Text split into whitespace-led word pieces, one per mock token."""
+    return TOKEN_PATTERN.findall(text)
+
+
+def apply_limits(text, stop=None, max_tokens=None):
+    """(pieces, finish reason) of an answer cut at the first stop sequence and at max_tokens."""
+    reason = 'stop'
+    for sequence in stop or ():
+        if sequence and sequence in text:
+            text = text[:text.index(sequence)]
+    pieces = tokens(text)
+    if max_tokens is not None and len(pieces) > max_tokens:
+        pieces, reason = pieces[:max_tokens], 'length'
+    return pieces, reason
+
+
+def _timestamp():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def estimate_prompt_tokens(prompt):
+    return max(1, len(prompt) // 4)
+
+
+class Generation:
+    """One request's output: reasoning pieces, answer pieces and token counts."""
+
+    def __init__(self, mock, prompt, schema=None, json_mode=False, stop=None, max_tokens=None, think=None):
+        self.action, text = mock.answer(prompt, schema, json_mode)
+        reasoning = mock.reasoning() if think is not False else ''
+        reasoning_pieces = tokens(reasoning)
+        if max_tokens is not None:
+            reasoning_pieces = reasoning_pieces[:max_tokens]
+            max_tokens -= len(reasoning_pieces)
+        self.reasoning = reasoning_pieces
+        self.pieces, self.finish_reason = apply_limits(text, stop, max_tokens)
+        self.prompt_tokens = estimate_prompt_tokens(prompt)
+        self.completion_tokens = len(self.reasoning) + len(self.pieces)
+
+    @property
+    def text(self):
+        return ''.join(self.pieces)
+
+    @property
+    def reasoning_text(self):
+        return ''.join(self.reasoning)
+
+
+class MockLLMHandler(BaseHTTPRequestHandler):
+    """Routes OpenAI- and Ollama-style requests to the server's MockLLM."""
+
+    protocol_version = 'HTTP/1.1'
+    server_version = 'MockLLM/1.0'
+
+    @property
+    def mock(self):
+        return self.server.mock
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    # --- Plumbing -------------------------------------------------------
+
+    def _read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        return json.loads(body or b'{}')
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _start_stream(self, content_type):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+    def _write_chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n")
+        self.wfile.flush()
+
+    def _end_stream(self):
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def _send_error(self, status, message, ollama):
+        headers = {'Retry-After': str(self.mock.retry_after)} if status == 429 else None
+        if ollama:
+            payload = {'error': message}
+        else:
+            payload = {'error': {'message': message, 'type': 'rate_limit_error' if status == 429 else 'server_error'}}
+        self._send_json(status, payload, headers)
+
+    def _generate(self, respond, ollama):
+        """Admit the request, run `respond()` and keep the in-flight count."""
+        rejected = self.mock.admit()
+        if rejected:
+            self._send_error(*rejected, ollama)
+            return
+        disconnected = False
+        try:
+            respond()
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up (early stop, hedging loser, timeout)
+            disconnected = True
+            self.close_connection = True
+        finally:
+            self.mock.finish(disconnected)
+
+    def _wait_first_token(self):
+        time.sleep(self.mock.first_token_delay())
+
+    def _wait_tokens(self, count):
+        if count:
+            time.sleep(count * self.mock.token_delay())
+
+    def _record(self, generation):
+        self.mock.count('prompt_tokens', generation.prompt_tokens)
+        self.mock.count('completion_tokens', generation.completion_tokens)
+
+    # --- Routes ---------------------------------------------------------
+
+    def do_GET(self):
+        path = self.path.split('?')[0].rstrip('/')
+        if path.endswith('/models'):
+            self._send_json(200, {'object': 'list', 'data': [
+                {'id': model, 'object': 'model', 'owned_by': 'mock'} for model in self.mock.models
+            ]})
+        elif path == '/api/tags':
+            self._send_json(200, {'models': [{'name': model, 'model': model} for model in self.mock.models]})
+        elif path in ('/stats', ''):
+            self._send_json(200, self.mock.snapshot())
+        else:
+            self._send_json(404, {'error': f'Unknown path: {self.path}'})
+
+    def do_POST(self):
+        path = self.path.split('?')[0].rstrip('/')
+        try:
+            payload = self._read_json()
+        except ValueError as e:
+            self._send_json(400, {'error': f'Invalid JSON: {e}'})
+            return
+
+        if path.endswith('/chat/completions'):
+            self._generate(lambda: self._openai_chat(payload), ollama=False)
+        elif path in ('/api/generate', '/api/chat'):
+            self._generate(lambda: self._ollama(payload, chat=path == '/api/chat'), ollama=True)
+        else:
+            self._send_json(404, {'error': f'Unknown path: {self.path}'})
+
+    # --- OpenAI chat completions ------------------------------------------
+
+    def _openai_chat(self, payload):
+        messages = payload.get('messages') or []
+        prompt = '\n'.join(str(message.get('content') or '') for message in messages)
+        response_format = payload.get('response_format') or {}
+        schema = (response_format.get('json_schema') or {}).get('schema')
+        stop = payload.get('stop')
+        template_flags = (payload.get('chat_template_kwargs') or {}).values()
+        generation = Generation(
+            self.mock, prompt, schema=schema,
+            json_mode=response_format.get('type') in ('json_object', 'json_schema'),
+            stop=[stop] if isinstance(stop, str) else stop,
+            max_tokens=payload.get('max_tokens') or payload.get('max_completion_tokens'),
+            think=False if False in template_flags else None
+        )
+        model = payload.get('model') or self.mock.models[0]
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        usage = {
+            'prompt_tokens': generation.prompt_tokens,
+            'completion_tokens': generation.completion_tokens,
+            'total_tokens': generation.prompt_tokens + generation.completion_tokens
+        }
+
+        self._wait_first_token()
+        if not payload.get('stream'):
+            self._wait_tokens(generation.completion_tokens)
+            message = {'role': 'assistant', 'content': generation.text}
+            if generation.reasoning:
+                message['reasoning_content'] = generation.reasoning_text
+            self._record(generation)
+            self._send_json(200, {
+                'id': completion_id, 'object': 'chat.completion', 'created': int(time.time()), 'model': model,
+                'choices': [{'index': 0, 'message': message, 'finish_reason': generation.finish_reason}],
+                'usage': usage
+            })
+            return
+
+        def event(delta, finish_reason=None):
+            data = {
+                'id': completion_id, 'object': 'chat.completion.chunk', 'created': int(time.time()), 'model': model,
+                'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}]
+            }
+            self._write_chunk(f"data: {json.dumps(data)}\n\n".encode('utf-8'))
+
+        self._start_stream('text/event-stream')
+        event({'role': 'assistant', 'content': ''})
+        for field, pieces in (('reasoning_content', generation.reasoning), ('content', generation.pieces)):
+            for i, piece in enumerate(pieces):
+                if i or field == 'content' and generation.reasoning:
+                    self._wait_tokens(1)
+                event({field: piece})
+        event({}, generation.finish_reason)
+        if (payload.get('stream_options') or {}).get('include_usage'):
+            data = {'id': completion_id, 'object': 'chat.completion.chunk', 'model': model,
+                    'choices': [], 'usage': usage}
+            self._write_chunk(f"data: {json.dumps(data)}\n\n".encode('utf-8'))
+        self._write_chunk(b"data: [DONE]\n\n")
+        self._end_stream()
+        self._record(generation)
+
+    # --- Ollama -----------------------------------------------------------
+
+    def _ollama(self, payload, chat):
+        if chat:
+            prompt = '\n'.join(str(message.get('content') or '') for message in payload.get('messages') or [])
+        else:
+            prompt = payload.get('prompt') or ''
+        options = payload.get('options') or {}
+        output_format = payload.get('format')
+        think = payload.get('think')
+        generation = Generation(
+            self.mock, prompt, schema=output_format if isinstance(output_format, dict) else None,
+            json_mode=bool(output_format), stop=options.get('stop'), max_tokens=options.get('num_predict'),
+            think=think
+        )
+        model = payload.get('model') or self.mock.models[0]
+        started = time.monotonic()
+        # Without `think`, reasoning models put their thinking inline in the text
+        inline_reasoning = think is None and bool(generation.reasoning)
+
+        def piece_fields(text, thinking=''):
+            fields = {'role': 'assistant', 'content': text} if chat else {'response': text}
+            if thinking:
+                fields['thinking'] = thinking
+            return {'message': fields} if chat else fields
+
+        def final_fields():
+            elapsed_ns = int((time.monotonic() - started) * 1e9)
+            return {
+                'model': model, 'created_at': _timestamp(), 'done': True,
+                'done_reason': generation.finish_reason,
+                'prompt_eval_count': generation.prompt_tokens, 'eval_count': generation.completion_tokens,
+                'total_duration': elapsed_ns, 'load_duration': 0,
+                'prompt_eval_duration': 0, 'eval_duration': elapsed_ns
+            }
+
+        self._wait_first_token()
+        if payload.get('stream', True) is False:
+            self._wait_tokens(generation.completion_tokens)
+            text = generation.text
+            thinking = generation.reasoning_text
+            if inline_reasoning:
+                text, thinking = f"<think>{thinking}</think>\n{text}", ''
+            self._record(generation)
+            self._send_json(200, dict(final_fields(), **piece_fields(text, thinking)))
+            return
+
+        def line(fields):
+            self._write_chunk(json.dumps(fields).encode('utf-8') + b"\n")
+
+        self._start_stream('application/x-ndjson')
+        pieces = [('thinking', piece) for piece in generation.reasoning] + [('text', piece) for piece in generation.pieces]
+        if inline_reasoning:
+            pieces = ([('text', '<think>')] + [('text', piece) for piece in generation.reasoning]
+                      + [('text', '</think>\n')] + [('text', piece) for piece in generation.pieces])
+        for i, (kind, piece) in enumerate(pieces):
+            if i:
+                self._wait_tokens(1)
+            fields = piece_fields('', piece) if kind == 'thinking' else piece_fields(piece)
+            line(dict(fields, model=model, created_at=_timestamp(), done=False))
+        line(dict(final_fields(), **piece_fields('')))
+        self._end_stream()
+        self._record(generation)
+
+
+class MockLLMServer(ThreadingHTTPServer):
+    """Threaded HTTP server around a MockLLM; every connection gets its own thread."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', port=8089, verbose=False, **settings):
+        """
+        Args:
+            host: Interface to listen on
+            port: Port to listen on (0: any free port)
+            verbose: Log every request
+            **settings: MockLLM settings
+        """
+        self.mock = MockLLM(**settings)
+        self.verbose = verbose
+        super().__init__((host, port), MockLLMHandler)
+
+    def handle_error(self, request, client_address):
+        # Clients drop pooled keep-alive connections at will; that is not an error
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def start_mock_server(host='127.0.0.1', port=0, **settings):
+    """
+    Start a MockLLMServer in a background thread and return it.
+
+    Point OpenAICompatibleAI at `server.url + '/v1'` or OllamaHTTPAI at
+    `server.url`; call server.shutdown() when done.
+    """
+    server = MockLLMServer(host, port, **settings)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Serve legal Avalon answers over the OpenAI and Ollama APIs for offline load testing.",
+        epilog="Example: python mock_llm_server.py --latency lognormal:0.5,0.6 --tokens-per-second 50 "
+               "--rate-limit-rate 0.05 --max-concurrency 16"
+    )
+    parser.add_argument('--host', default='127.0.0.1', help="Interface to listen on (default: 127.0.0.1)")
+    parser.add_argument('--port', type=int, default=8089, help="Port to listen on (default: 8089)")
+    parser.add_argument('--latency', default='fixed:0', metavar='SPEC',
+                        help="Time to first token: fixed:S, uniform:LOW,HIGH, lognormal:MEDIAN,SIGMA "
+                             "or exponential:MEAN (default: fixed:0)")
+    parser.add_argument('--tokens-per-second', type=float, default=0, metavar='N',
+                        help="Output pacing after the first token (default: 0, unpaced)")
+    parser.add_argument('--error-rate', type=float, default=0.0, metavar='P',
+                        help="Fraction of requests answered with HTTP 500")
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, metavar='P',
+                        help="Fraction of requests answered with HTTP 429")
+    parser.add_argument('--retry-after', type=float, default=1.0, metavar='S',
+                        help="Retry-After seconds sent with 429s (default: 1)")
+    parser.add_argument('--max-concurrency', type=int, default=None, metavar='N',
+                        help="Requests served at once; more are answered with HTTP 429")
+    parser.add_argument('--answers', choices=['random', 'first'], default='random',
+                        help="Pick legal answers at random or always the first one (default: random)")
+    parser.add_argument('--script', metavar='PATH',
+                        help="JSON file of answers per action type, used in turn")
+    parser.add_argument('--seed', type=int, default=None, help="Random seed")
+    parser.add_argument('--reasoning-tokens', type=int, default=0, metavar='N',
+                        help="Reasoning tokens produced before each answer (default: 0)")
+    parser.add_argument('--analysis-tokens', type=int, default=0, metavar='N',
+                        help="Analysis tokens written before one-word and team answers (default: 0)")
+    parser.add_argument('--model', action='append', dest='models', metavar='NAME',
+                        help="Model name to report (repeatable, default: mock)")
+    parser.add_argument('--verbose', action='store_true', help="Log every request")
+    args = parser.parse_args()
+
+    server = MockLLMServer(
+        args.host, args.port, verbose=args.verbose,
+        latency=args.latency, tokens_per_second=args.tokens_per_second,
+        error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate, retry_after=args.retry_after,
+        max_concurrency=args.max_concurrency, answers=args.answers, script=args.script, seed=args.seed,
+        reasoning_tokens=args.reasoning_tokens, analysis_tokens=args.analysis_tokens,
+        models=args.models or ['mock']
+    )
+
+    print("\n" + "="*60)
+    print("Mock LLM Server")
+    print("="*60)
+    print(f"\nOpenAI API: {server.url}/v1  (OpenAICompatibleAI base_url, DEEPSEEK_BASE_URL)")
+    print(f"Ollama API: {server.url}  (OllamaHTTPAI host, OLLAMA_HOST)")
+    print(f"Counters:   {server.url}/stats")
+    print("Press Ctrl+C to stop\n")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print("\n[Mock] " + json.dumps(server.mock.snapshot()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+"""
+Prefix key/value cache for local transformer models.
+Lets a later prompt skip re-encoding the tokens it shares with an earlier one.
+"""
+
+import copy
+import threading
+from collections import OrderedDict
+
+
+def _cache_tensors(past_key_values):
+    """Yield the key and value tensors held by a transformers cache object."""
+    layers = getattr(past_key_values, 'layers', None)
+    if layers is not None:
+        for layer in layers:
+            for tensor in (getattr(layer, 'keys', None), getattr(layer, 'values', None)):
+                if tensor is not None:
+                    yield tensor
+        return
+    # Older transformers releases keep parallel per-layer lists
+    for tensor in list(getattr(past_key_values, 'key_cache', [])) + list(getattr(past_key_values, 'value_cache', [])):
+        if tensor is not None:
+            yield tensor
+
+
+def cache_nbytes(past_key_values):
+    """Memory held by a cache's key/value tensors, in bytes."""
+    return sum(t.numel() * t.element_size() for t in _cache_tensors(past_key_values))
+
+
+def crop_cache(past_key_values, length):
+    """Truncate a cache in place to its first `length` tokens."""
+    excess = past_key_values.get_seq_length() - length
+    if excess > 0:
+        # A negative argument means "drop this many tokens" in every transformers release
+        past_key_values.crop(-excess)
+
+
+def _common_prefix_length(a, b):
+    limit = min(len(a), len(b))
+    idx = 0
+    while idx < limit and a[idx] == b[idx]:
+        idx += 1
+    return idx
+
+
+class PrefixKVCache:
+    """
+    LRU store of past key/values, keyed by the prompt token ids that produced them.
+
+    `lookup` finds the stored prompt sharing the longest token prefix with a
+    new prompt and returns a private copy of its cache cropped to that prefix,
+    so generation only has to encode the remaining tokens. Entries are evicted
+    least recently used first once their tensors exceed `max_bytes`.
+    """
+
+    def __init__(self, max_bytes=512 * 1024 ** 2, min_prefix_tokens=32):
+        """
+        Args:
+            max_bytes: Memory cap for all stored key/value tensors
+            min_prefix_tokens: Shorter shared prefixes are not worth reusing
+        """
+        self.max_bytes = max_bytes
+        self.min_prefix_tokens = min_prefix_tokens
+        self._entries = OrderedDict()  # token id tuple -> (past_key_values, nbytes)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.reused_tokens = 0
+        self.evictions = 0
+
+    def lookup(self, token_ids):
+        """
+        Return (past_key_values, prefix_length) for the best stored prefix of
+        `token_ids`, or (None, 0). At least one prompt token is always left
+        uncached so the model has something to encode.
+        """
+        token_ids = tuple(token_ids)
+        with self._lock:
+            best_key, best_length = None, 0
+            for key in self._entries:
+                length = _common_prefix_length(key, token_ids)
+                if length > best_length:
+                    best_key, best_length = key, length
+
+            best_length = min(best_length, len(token_ids) - 1)
+            if best_key is None or best_length < self.min_prefix_tokens:
+                self.misses += 1
+                return None, 0
+
+            self._entries.move_to_end(best_key)
+            past_key_values = copy.deepcopy(self._entries[best_key][0])
+            self.hits += 1
+            self.reused_tokens += best_length
+
+        crop_cache(past_key_values, best_length)
+        return past_key_values, best_length
+
+    def store(self, token_ids, past_key_values):
+        """
+        Keep `past_key_values` (covering exactly `token_ids`) for later prompts.
+
+        Stored prompts that are a prefix of this one are dropped, since this
+        entry serves every lookup they could.
+        """
+        token_ids = tuple(token_ids)
+        nbytes = cache_nbytes(past_key_values)
+        if nbytes > self.max_bytes:
+            return
+
+        with self._lock:
+            for key in [k for k in self._entries if len(k) <= len(token_ids) and token_ids[:len(k)] == k]:
+                self._bytes -= self._entries.pop(key)[1]
+
+            self._entries[token_ids] = (past_key_values, nbytes)
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_bytes) = self._entries.popitem(last=False)
+                self._bytes -= evicted_bytes
+                self.evictions += 1
+
+    def stats(self):
+        """Return counters and current size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'reused_tokens': self.reused_tokens,
+                'evictions': self.evictions
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
@@ -2,6 +2,11 @@
 AI Prompts for Avalon Game
 All prompts used for AI decision-making in the game.
 Enhanced with strategic reasoning, behavioral memory, and game history analysis.
+
+Every prompt opens with the content all players share (public timeline,
+rules, game state, phase instructions) and ends with the player's private
+role information, so backends that cache prompt prefixes can reuse them
+across players and calls.
 """
 
 
@@ -9,20 +14,20 @@ class AvalonPrompts:
     """Collection of prompts for different game phases."""
 
     @staticmethod
-    def team_proposal(role_info, game_state, player_names, team_size, game_history=""):
-        """Prompt for leader to propose initial team."""
+    def team_proposal(role_info, game_state, player_names, team_size, game_history="", json_output=False):
+        """Prompt for leader to propose initial team (answered in JSON if `json_output`)."""
         timeline_section = f"\nSHARED MEMORY TIMELINE (public record of statements, votes, and missions):\n{game_history}\n" if game_history else ""
 
-        return f"""You are playing Avalon. {role_info}
-
-{game_state}
-Players: {player_names}
+        return f"""You are playing Avalon.
 {timeline_section}
 TIMELINE MEMORY RULES:
 - The timeline above lists every proposal, discussion quote, vote, and mission outcome in chronological order.
 - Reference specific rounds/players when explaining deductions.
 - Mission failures mean at least one teammate was Evil; successes increase trust in those players.
 
+{game_state}
+Players: {player_names}
+
 You are the leader. You must select exactly {team_size} players for this mission.
 
 STRATEGIC ANALYSIS FRAMEWORK:
@@ -68,10 +73,12 @@ DECISION PROCESS:
 3. Select team that maximizes success probability for YOUR faction
 4. Ensure selection doesn't reveal your role (especially if Merlin or Evil)
 
-IMPORTANT: After your analysis, output ONLY a comma-separated list of {team_size} player names, nothing else.
+YOUR ROLE: {role_info}
+
+""" + (AvalonPrompts.team_json_format(player_names, team_size) if json_output else f"""IMPORTANT: After your analysis, output ONLY a comma-separated list of {team_size} player names, nothing else.
 Example format: Alice,Bob,Charlie
 
-Your selection:"""
+Your selection:""")
 
     @staticmethod
     def discussion(role_info, game_state, leader_name, proposed_team, discussion_history, game_history=""):
@@ -81,15 +88,15 @@ Your selection:"""
 
         timeline_section = f"\nSHARED MEMORY TIMELINE (public record of statements, votes, and missions):\n{game_history}\n" if game_history else ""
 
-        return f"""You are playing Avalon. {role_info}
-
-{game_state}
+        return f"""You are playing Avalon.
 {timeline_section}
 TIMELINE MEMORY RULES:
 - The timeline above lists every proposal, discussion quote, vote, and mission outcome in chronological order.
 - Reference specific rounds/players when supporting or challenging this team.
 - Mission failures guarantee at least one Evil player on that team; successes grant those players more trust.
 
+{game_state}
+
 Leader {leader_name} has proposed this team: {proposed_team}
 
 Previous discussion:
@@ -142,6 +149,8 @@ DISCUSSION STRATEGY FRAMEWORK:
    - Sometimes support Good proposals to blend in
    - Create confusion by questioning trusted players
 
+YOUR ROLE: {role_info}
+
 IMPORTANT RULES:
 - Do NOT explicitly state your role or other players' roles
 - Reference past observations and discussions to support your point
@@ -151,22 +160,22 @@ IMPORTANT RULES:
 Your comment:"""
 
     @staticmethod
-    def leader_final_decision(role_info, game_state, player_names, initial_team, team_size, discussion_history, game_history=""):
-        """Prompt for leader to make final team decision after discussion."""
+    def leader_final_decision(role_info, game_state, player_names, initial_team, team_size, discussion_history,
+                              game_history="", json_output=False):
+        """Prompt for leader to make final team decision after discussion (answered in JSON if `json_output`)."""
         # Format discussion history
         history_text = "\n".join([f"  {name}: {comment}" for name, comment in discussion_history])
 
         timeline_section = f"\nSHARED MEMORY TIMELINE (public record of statements, votes, and missions):\n{game_history}\n" if game_history else ""
 
-        return f"""You are playing Avalon. {role_info}
-
-{game_state}
+        return f"""You are playing Avalon.
 {timeline_section}
 TIMELINE MEMORY RULES:
 - The timeline above lists every earlier proposal, quote, vote, and mission result in order.
 - Cite specific rounds and players when summarizing the discussion feedback.
 - Mission failures confirm at least one Evil player on that mission team; successes increase their trustworthiness.
 
+{game_state}
 Players: {player_names}
 
 You initially proposed: {initial_team}
@@ -227,25 +236,27 @@ DECISION CHECKLIST:
 
 You must select exactly {team_size} players for this mission.
 
-IMPORTANT: After your analysis, output ONLY a comma-separated list of player names for your FINAL team proposal, nothing else.
+YOUR ROLE: {role_info}
+
+""" + (AvalonPrompts.team_json_format(player_names, team_size) if json_output else """IMPORTANT: After your analysis, output ONLY a comma-separated list of player names for your FINAL team proposal, nothing else.
 Example format: Alice,Bob,Charlie
 
-Your final team:"""
+Your final team:""")
 
     @staticmethod
     def vote(role_info, game_state, proposed_team, game_history=""):
         """Prompt for player to vote on proposed team."""
         timeline_section = f"\nSHARED MEMORY TIMELINE (public record of statements, votes, and missions):\n{game_history}\n" if game_history else ""
 
-        return f"""You are playing Avalon. {role_info}
-
-{game_state}
+        return f"""You are playing Avalon.
 {timeline_section}
 TIMELINE MEMORY RULES:
 - The timeline above lists every proposal, quote, vote, and mission outcome in order.
 - Reference specific rounds when explaining why you trust or distrust someone.
 - Failed missions prove at least one Evil player was on that team; successful missions increase confidence in those players.
 
+{game_state}
+
 Proposed team: {proposed_team}
 
 You must vote to APPROVE or REJECT this team.
@@ -330,6 +341,8 @@ DECISION RULES:
 - Everyone: Consider how your vote affects others' perception of you
 - GENERAL RULE: If you're on the proposed team, you should strongly lean toward APPROVE unless you have a powerful strategic reason not to
 
+YOUR ROLE: {role_info}
+
 IMPORTANT: After your analysis, output ONLY one word: either "APPROVE" or "REJECT", nothing else.
 
 Your vote:"""
@@ -339,15 +352,15 @@ Your vote:"""
         """Prompt for player to choose mission action."""
         timeline_section = f"\nSHARED MEMORY TIMELINE (public record of statements, votes, and missions):\n{game_history}\n" if game_history else ""
 
-        return f"""You are playing Avalon. {role_info}
-
-{game_state}
+        return f"""You are playing Avalon.
 {timeline_section}
 TIMELINE MEMORY RULES:
 - The timeline above lists every proposal, discussion quote, vote, and mission result so far.
 - Keep in mind that players will interpret the next timeline entry based on whether this mission succeeds or fails.
 - When a mission fails, everyone immediately knows at least one teammate was Evil; successes increase trust.
 
+{game_state}
+
 You are on the mission. Choose your action.
 
 ROLE-BASED REQUIREMENTS:
@@ -446,6 +459,8 @@ DECISION PROCESS:
 4. Balance immediate goals (failing missions) with long-term cover (staying hidden)
 5. Make the choice that maximizes Evil's overall win probability
 
+YOUR ROLE: {role_info}
+
 IMPORTANT: After your analysis, output ONLY one word: either "SUCCESS" or "FAIL", nothing else.
 
 Your action:"""
@@ -455,17 +470,17 @@ Your action:"""
         """Prompt for Assassin to choose assassination target."""
         timeline_section = f"\nSHARED MEMORY TIMELINE (public record of statements, votes, and missions):\n{game_history}\n" if game_history else ""
 
-        return f"""You are playing Avalon. {role_info}
-
-The Good team has won 3 missions! As the Assassin, you have ONE chance to kill Merlin and win the game for Evil.
-
-Good players: {good_players}
+        return f"""You are playing Avalon.
 {timeline_section}
 TIMELINE MEMORY RULES:
 - The timeline above records every public statement, vote, and mission result—use it to pinpoint who consistently guided Good toward success.
 - Reference concrete rounds and quotes when weighing each target's likelihood of being Merlin.
 - Remember: Failed missions confirm there was Evil on that team, while successful missions boost credibility for those players.
 
+The Good team has won 3 missions! As the Assassin, you have ONE chance to kill Merlin and win the game for Evil.
+
+Good players: {good_players}
+
 CRITICAL MISSION: Identify and assassinate Merlin.
 
 ═══════════════════════════════════════════════════════════════
@@ -598,10 +613,32 @@ Identify the player who:
 
 That player is most likely Merlin.
 
+YOUR ROLE: {role_info}
+
 IMPORTANT: After your analysis, output ONLY the name of one player, nothing else.
 
 Your assassination target:"""
 
+    @staticmethod
+    def team_json_format(player_names, team_size):
+        """Output instructions replacing the comma-separated format in JSON mode."""
+        return f"""IMPORTANT: Output ONLY a JSON object, nothing else:
+{{"reasoning": "<one or two sentences>", "team": ["<name>", ...]}}
+"team" must list exactly {team_size} different players from: {', '.join(player_names)}
+
+JSON:"""
+
+    @staticmethod
+    def json_repair(prompt, response, error):
+        """Re-prompt after an invalid JSON answer, quoting the validation error."""
+        return f"""{prompt}
+{response}
+
+Your answer above is invalid: {error}.
+Output ONLY the corrected JSON object, nothing else.
+
+JSON:"""
+
 
 # Convenience functions for backward compatibility
 def get_team_proposal_prompt(role_info, game_state, player_names, team_size, game_history=""):
@@ -0,0 +1,749 @@
+"""
+Rate limiting, retries and circuit breaking for AI backends.
+Every backend talking to one endpoint shares a token bucket and a circuit
+breaker for the whole process, so parallel games back off together.
+"""
+
+import asyncio
+import collections
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+from avalon_ai_game import BaseAI, ModelResponse, collect_backend_errors, estimated_usage, has_native_decisions, unwrap_ai
+from generation_policy import current_action
+from history_compressor import TokenCounter
+from tracing import trace_interval, trace_span
+
+# Statuses worth retrying; any other 4xx means the request itself is wrong
+RETRYABLE_STATUSES = {408, 409, 425, 429}
+
+
+def retry_after(error):
+    """Seconds the server asked us to wait (Retry-After header) before retrying, or None."""
+    value = (getattr(error, 'headers', None) or {}).get('retry-after')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def is_retryable(error):
+    """False for client errors that will fail the same way on every attempt."""
+    status = getattr(error, 'status', None)
+    return status is None or status >= 500 or status in RETRYABLE_STATUSES
+
+
+def backoff_delay(attempt, error=None, base=0.5, cap=30.0):
+    """
+    Seconds to wait before retry number `attempt` (0-based).
+
+    Exponential backoff with full jitter, so callers that failed together do
+    not retry together. A Retry-After from the server is always honoured.
+    """
+    delay = random.uniform(0, min(cap, base * 2 ** attempt))
+    wait = retry_after(error)
+    if wait is not None:
+        delay = wait + random.uniform(0, base)
+    return delay
+
+
+class TokenBucket:
+    """
+    Requests-per-minute and tokens-per-minute budget for one endpoint.
+
+    Callers reserve their share up front and are told how long to wait;
+    the budget may go into debt, which later callers wait out, so waiting
+    callers are served in the order they arrived. Either limit may be None.
+    """
+
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.requests = float(requests_per_minute or 0)
+        self.tokens = float(tokens_per_minute or 0)
+        self.paused_until = 0.0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self._updated
+        self._updated = now
+        if self.requests_per_minute:
+            self.requests = min(self.requests_per_minute, self.requests + elapsed * self.requests_per_minute / 60)
+        if self.tokens_per_minute:
+            self.tokens = min(self.tokens_per_minute, self.tokens + elapsed * self.tokens_per_minute / 60)
+
+    def reserve(self, tokens=0):
+        """Take one request and `tokens` from the budget; returns seconds to wait before sending."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            wait = max(0.0, self.paused_until - now)
+            if self.requests_per_minute:
+                self.requests -= 1
+                if self.requests < 0:
+                    wait = max(wait, -self.requests * 60 / self.requests_per_minute)
+            if self.tokens_per_minute:
+                self.tokens -= tokens
+                if self.tokens < 0:
+                    wait = max(wait, -self.tokens * 60 / self.tokens_per_minute)
+            return wait
+
+    def settle(self, reserved, used):
+        """Correct a reservation once the server has reported the tokens actually used."""
+        if not self.tokens_per_minute:
+            return
+        with self._lock:
+            self.tokens = min(self.tokens_per_minute, self.tokens + reserved - used)
+
+    def pause(self, seconds):
+        """Hold every caller back for `seconds` (e.g. after a 429 with Retry-After)."""
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def snapshot(self):
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            return {
+                'requests_per_minute': self.requests_per_minute,
+                'tokens_per_minute': self.tokens_per_minute,
+                'requests_available': round(self.requests, 2) if self.requests_per_minute else None,
+                'tokens_available': round(self.tokens) if self.tokens_per_minute else None,
+                'paused_for_s': round(max(0.0, self.paused_until - now), 2)
+            }
+
+
+class CircuitBreaker:
+    """
+    Stops calling an endpoint that keeps failing.
+
+    After `failure_threshold` consecutive failures the circuit opens and
+    calls fail immediately. After `reset_timeout` seconds one trial call is
+    let through (half-open): success closes the circuit, failure reopens it.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """True if a call may go out now."""
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.HALF_OPEN and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                print(f"  [Circuit] {self.name} recovered, closing circuit")
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            self.trial_in_flight = False
+            if self.state == self.HALF_OPEN or (
+                    self.state == self.CLOSED and self.consecutive_failures >= self.failure_threshold):
+                print(f"  [Circuit] {self.name} failing ({self.consecutive_failures} in a row), "
+                      f"failing fast for {self.reset_timeout:.0f}s")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def release(self):
+        """End a call that says nothing about the endpoint's health (cancelled, rate limited, bad request)."""
+        with self._lock:
+            self.trial_in_flight = False
+
+    def snapshot(self):
+        with self._lock:
+            reopens_in = self.reset_timeout - (time.monotonic() - self.opened_at)
+            return {
+                'state': self.state,
+                'consecutive_failures': self.consecutive_failures,
+                'retry_in_s': round(max(0.0, reopens_in), 2) if self.state == self.OPEN else 0.0
+            }
+
+
+class AdaptiveLimiter:
+    """
+    Concurrency limit for one endpoint that adapts to how it copes (AIMD).
+
+    While calls succeed at their usual latency and the limit is in use, it
+    grows by about one slot per `limit` completed calls. A 429, an error or a
+    call `latency_factor` times slower than usual for its action type cuts it
+    by `decrease_factor`, at most once per typical call duration so a burst
+    of failures counts once. Waiting callers, sync or async, are served in
+    the order they arrived.
+    """
+
+    # Weight of the newest call in the per-action latency average
+    LATENCY_SMOOTHING = 0.1
+
+    def __init__(self, name, initial=4, min_limit=1, max_limit=64, decrease_factor=0.5, latency_factor=3.0):
+        self.name = name
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = float(max(min_limit, min(initial, max_limit)))
+        self.decrease_factor = decrease_factor
+        self.latency_factor = latency_factor
+        self.in_flight = 0
+        self.increases = 0
+        self.decreases = 0
+        self.latency = {}  # action type -> average seconds per call
+        self._last_decrease = 0.0
+        self._waiters = collections.deque()
+        self._lock = threading.Lock()
+
+    def _take(self, wake):
+        """Take a slot now (True) or queue `wake` to be called once one is handed over."""
+        if not self._waiters and self.in_flight < int(self.limit):
+            self.in_flight += 1
+            return True
+        self._waiters.append(wake)
+        return False
+
+    def _hand_over(self):
+        while self._waiters and self.in_flight < int(self.limit):
+            self.in_flight += 1
+            self._waiters.popleft()()
+
+    def acquire(self):
+        """Wait for a slot; returns the time the call started."""
+        granted = threading.Event()
+        with self._lock:
+            taken = self._take(granted.set)
+        if not taken:
+            granted.wait()
+        return time.monotonic()
+
+    async def aacquire(self):
+        """Wait for a slot without blocking the event loop; returns the time the call started."""
+        loop = asyncio.get_running_loop()
+        granted = loop.create_future()
+
+        def wake():
+            loop.call_soon_threadsafe(lambda: granted.done() or granted.set_result(None))
+
+        with self._lock:
+            taken = self._take(wake)
+        if not taken:
+            try:
+                await granted
+            except asyncio.CancelledError:
+                with self._lock:
+                    queued = wake in self._waiters
+                    if queued:
+                        self._waiters.remove(wake)
+                if not queued:
+                    self.release(None, None)
+                raise
+        return time.monotonic()
+
+    def release(self, started, outcome):
+        """
+        Free a slot and adapt the limit.
+
+        Args:
+            started: Value returned by acquire, or None for a call never made
+            outcome: 'ok', 'throttled', 'error', or None for calls that say
+                nothing about the endpoint (cancelled, rejected as invalid)
+        """
+        now = time.monotonic()
+        action = current_action() or ''
+        with self._lock:
+            saturated = self.in_flight >= int(self.limit)
+            self.in_flight -= 1
+            if outcome == 'ok' and started is not None:
+                elapsed = now - started
+                usual = self.latency.get(action)
+                self.latency[action] = elapsed if usual is None else usual + self.LATENCY_SMOOTHING * (elapsed - usual)
+                if usual is not None and elapsed > usual * self.latency_factor:
+                    self._decrease(now, usual, f"{elapsed:.1f}s call, usually {usual:.1f}s")
+                elif saturated and self.limit < self.max_limit:
+                    self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+                    self.increases += 1
+            elif outcome in ('throttled', 'error'):
+                self._decrease(now, self.latency.get(action, 1.0), outcome)
+            self._hand_over()
+
+    def _decrease(self, now, cooldown, reason):
+        if now - self._last_decrease < cooldown or self.limit <= self.min_limit:
+            return
+        old = self.limit
+        self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+        self.decreases += 1
+        self._last_decrease = now
+        print(f"  [Limiter] {self.name}: concurrency {int(old)} -> {int(self.limit)} ({reason})")
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'limit': int(self.limit),
+                'in_flight': self.in_flight,
+                'queue_depth': len(self._waiters),
+                'increases': self.increases,
+                'decreases': self.decreases,
+                'latency_s': {action: round(value, 3) for action, value in self.latency.items()}
+            }
+
+
+class EndpointGuard:
+    """
+    Token bucket, circuit breaker, backoff settings and counters for one
+    endpoint, plus an AdaptiveLimiter if max_concurrency is set.
+    """
+
+    def __init__(self, endpoint, requests_per_minute=None, tokens_per_minute=None,
+                 failure_threshold=5, reset_timeout=30.0, backoff_base=0.5, backoff_max=30.0,
+                 max_concurrency=None, initial_concurrency=4):
+        self.endpoint = endpoint
+        self.bucket = TokenBucket(requests_per_minute, tokens_per_minute)
+        self.breaker = CircuitBreaker(endpoint, failure_threshold, reset_timeout)
+        self.limiter = AdaptiveLimiter(endpoint, initial_concurrency, max_limit=max_concurrency) \
+            if max_concurrency else None
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.counters = {
+            'calls': 0, 'successes': 0, 'failures': 0, 'unanswered': 0, 'retries': 0,
+            'throttled': 0, 'short_circuited': 0, 'wait_s': 0.0
+        }
+        self._lock = threading.Lock()
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def admit(self, tokens):
+        """Seconds to wait before sending a call, or None if the circuit is open."""
+        if not self.breaker.allow():
+            self.count('short_circuited')
+            return None
+        wait = self.bucket.reserve(tokens)
+        self.count('calls')
+        if wait > 0:
+            self.count('wait_s', wait)
+        return wait
+
+    def acquire(self):
+        """Wait for a concurrency slot; returns the call's start time (None without a limiter)."""
+        return self.limiter.acquire() if self.limiter else None
+
+    async def aacquire(self):
+        """Async version of acquire."""
+        return await self.limiter.aacquire() if self.limiter else None
+
+    def _release(self, started, outcome):
+        if self.limiter:
+            self.limiter.release(started, outcome)
+
+    def succeeded(self, reserved, response, started=None):
+        self._release(started, 'ok')
+        self.count('successes')
+        self.breaker.record_success()
+        usage = getattr(response, 'usage', None) or {}
+        if usage:
+            self.bucket.settle(reserved, usage.get('prompt_tokens', 0) + usage.get('completion_tokens', 0))
+
+    def unanswered(self, started=None):
+        """
+        Record a call that returned no answer without a transport or HTTP
+        error (no API key, an empty reply, a decision it would not make).
+        The endpoint is up, so this neither backs off nor trips the breaker.
+        """
+        self._release(started, None)
+        self.count('unanswered')
+        self.breaker.release()
+
+    def failed(self, attempt, error, started=None):
+        """Record a failed call; returns seconds to wait before retrying, or None to give up."""
+        self.count('failures')
+        if not is_retryable(error):
+            self._release(started, None)
+            self.breaker.release()
+            return None
+
+        delay = backoff_delay(attempt, error, self.backoff_base, self.backoff_max)
+        throttled = getattr(error, 'status', None) == 429
+        self._release(started, 'throttled' if throttled else 'error')
+        if throttled:
+            # The endpoint is up but over its limit: everyone waits, nobody trips the breaker
+            self.count('throttled')
+            self.bucket.pause(delay)
+            self.breaker.release()
+        else:
+            self.breaker.record_failure()
+            if self.breaker.state == CircuitBreaker.OPEN:
+                return None
+        return delay
+
+    def abandoned(self, started=None):
+        self._release(started, None)
+        self.breaker.release()
+
+    def snapshot(self):
+        with self._lock:
+            counters = dict(self.counters, wait_s=round(self.counters['wait_s'], 2))
+        state = dict(counters, circuit=self.breaker.snapshot(), bucket=self.bucket.snapshot())
+        if self.limiter:
+            state['concurrency'] = self.limiter.snapshot()
+        return state
+
+
+_guards = {}
+_guards_lock = threading.Lock()
+
+
+def get_endpoint_guard(endpoint, **settings):
+    """
+    Return the process-wide EndpointGuard for `endpoint`.
+
+    The first caller decides its settings (see EndpointGuard for the keywords).
+    """
+    with _guards_lock:
+        if endpoint not in _guards:
+            _guards[endpoint] = EndpointGuard(endpoint, **settings)
+        return _guards[endpoint]
+
+
+def resilience_state():
+    """Snapshot of every endpoint guard in this process, for monitoring."""
+    with _guards_lock:
+        guards = dict(_guards)
+    return {endpoint: guard.snapshot() for endpoint, guard in guards.items()}
+
+
+def endpoint_key(ai):
+    """Name of the endpoint a backend talks to: its URL if it has one, else backend and model."""
+    backend = unwrap_ai(ai)
+    url = getattr(backend, 'url', None) or getattr(backend, 'base_url', None)
+    return url or f"{type(backend).__name__}:{backend.get_model_name()}"
+
+
+class ResilientAI(BaseAI):
+    """
+    Wrapper that rate-limits, retries and circuit-breaks calls to a backend,
+    and adapts how many run at once if the endpoint has a max_concurrency.
+
+    It takes over the retry loop: each attempt is a single try of the inner
+    backend, spaced by jittered exponential backoff (or the server's
+    Retry-After). While the endpoint's circuit is open, calls return None at
+    once, so the controller's fallback decision is used instead of waiting
+    out timeouts. Streams are retried only if nothing was received. In a
+    traced game, each attempt and each wait is a span inside the call.
+    """
+
+    # Completion budget assumed for token reservations when the policy sets none
+    DEFAULT_COMPLETION_TOKENS = 256
+
+    def __init__(self, inner, endpoint=None, **settings):
+        """
+        Args:
+            inner: Backend to protect
+            endpoint: Name that backends sharing limits have in common
+                (default: the backend's URL, or backend class and model)
+            **settings: requests_per_minute, tokens_per_minute,
+                failure_threshold, reset_timeout, backoff_base, backoff_max,
+                max_concurrency, initial_concurrency (see EndpointGuard);
+                the first backend for an endpoint decides them
+        """
+        self.inner = inner
+        self.guard = get_endpoint_guard(endpoint or endpoint_key(inner), **settings)
+        self._counter = TokenCounter()
+
+    def get_model_name(self):
+        return self.inner.get_model_name()
+
+    def get_generation_params(self):
+        return self.inner.get_generation_params()
+
+    def extract_choice(self, response, valid_choices):
+        return self.inner.extract_choice(response, valid_choices)
+
+    def _reservation(self, prompt):
+        """Tokens to reserve for a call: the prompt plus the phase's completion budget."""
+        budget = unwrap_ai(self.inner).phase_settings().get('max_tokens', self.DEFAULT_COMPLETION_TOKENS)
+        return self._counter.count(prompt) + budget
+
+    @staticmethod
+    def _settled(prompt, pieces):
+        """
+        Response whose usage settles a stream's token reservation: the usage
+        of its last piece, or an estimate if it stopped before the usage event.
+        """
+        if getattr(pieces[-1], 'usage', None):
+            return pieces[-1]
+        return ModelResponse('', usage=estimated_usage(prompt, ''.join(pieces)))
+
+    def _retry(self, attempt, max_retries, errors, started):
+        """Seconds to wait before the next attempt, or None if there should not be one."""
+        if not errors:
+            # Nothing went wrong on the wire; another attempt would answer the same
+            self.guard.unanswered(started)
+            return None
+        delay = self.guard.failed(attempt, errors[-1], started)
+        if delay is None or attempt + 1 >= max_retries:
+            return None
+        self.guard.count('retries')
+        print(f"  [Retry] {self.guard.endpoint}: attempt {attempt + 2} in {delay:.1f}s")
+        return delay
+
+    def call_model(self, prompt, max_retries=3):
+        reserved = self._reservation(prompt)
+        for attempt in range(max_retries):
+            wait = self.guard.admit(reserved)
+            if wait is None:
+                return None
+            if wait:
+                with trace_span('rate limit wait', 'wait', seconds=round(wait, 3)):
+                    time.sleep(wait)
+
+            with trace_span(f"attempt {attempt + 1}", 'retry', endpoint=self.guard.endpoint):
+                started = self.guard.acquire()
+                with collect_backend_errors() as errors:
+                    try:
+                        response = self.inner.call_model(prompt, 1)
+                    except BaseException:
+                        self.guard.abandoned(started)
+                        raise
+            if response is not None:
+                self.guard.succeeded(reserved, response, started)
+                return response
+
+            delay = self._retry(attempt, max_retries, errors, started)
+            if delay is None:
+                return None
+            with trace_span('backoff', 'wait', seconds=round(delay, 3)):
+                time.sleep(delay)
+        return None
+
+    async def acall_model(self, prompt, max_retries=3):
+        reserved = self._reservation(prompt)
+        for attempt in range(max_retries):
+            wait = self.guard.admit(reserved)
+            if wait is None:
+                return None
+            if wait:
+                with trace_span('rate limit wait', 'wait', seconds=round(wait, 3)):
+                    await asyncio.sleep(wait)
+
+            with trace_span(f"attempt {attempt + 1}", 'retry', endpoint=self.guard.endpoint):
+                started = await self.guard.aacquire()
+                with collect_backend_errors() as errors:
+                    try:
+                        response = await self.inner.acall_model(prompt, 1)
+                    except BaseException:
+                        self.guard.abandoned(started)
+                        raise
+            if response is not None:
+                self.guard.succeeded(reserved, response, started)
+                return response
+
+            delay = self._retry(attempt, max_retries, errors, started)
+            if delay is None:
+                return None
+            with trace_span('backoff', 'wait', seconds=round(delay, 3)):
+                await asyncio.sleep(delay)
+        return None
+
+    def stream_model(self, prompt, max_retries=3):
+        reserved = self._reservation(prompt)
+        for attempt in range(max_retries):
+            wait = self.guard.admit(reserved)
+            if wait is None:
+                return
+            if wait:
+                with trace_span('rate limit wait', 'wait', seconds=round(wait, 3)):
+                    time.sleep(wait)
+
+            attempt_started = time.perf_counter()
+            started = self.guard.acquire()
+            errors, received, pieces, ended = [], False, [], False
+            stream = self.inner.stream_model(prompt, 1)
+            try:
+                while True:
+                    # Collect only while the inner stream runs, not while our consumer does
+                    with collect_backend_errors() as step_errors:
+                        try:
+                            piece = next(stream)
+                        except StopIteration:
+                            break
+                        finally:
+                            errors += step_errors
+                    received = received or bool(piece)
+                    pieces.append(piece)
+                    yield piece
+                ended = True
+            finally:
+                stream.close()
+                if received:
+                    self.guard.succeeded(reserved, self._settled(prompt, pieces), started)
+                elif not ended:
+                    self.guard.abandoned(started)
+                # Recorded afterwards: a span cannot stay open across the yields
+                trace_interval(f"attempt {attempt + 1}", 'retry', attempt_started,
+                               endpoint=self.guard.endpoint, received=received)
+            if received:
+                return
+
+            delay = self._retry(attempt, max_retries, errors, started)
+            if delay is None:
+                return
+            with trace_span('backoff', 'wait', seconds=round(delay, 3)):
+                time.sleep(delay)
+
+    async def astream_model(self, prompt, max_retries=3):
+        reserved = self._reservation(prompt)
+        for attempt in range(max_retries):
+            wait = self.guard.admit(reserved)
+            if wait is None:
+                return
+            if wait:
+                with trace_span('rate limit wait', 'wait', seconds=round(wait, 3)):
+                    await asyncio.sleep(wait)
+
+            attempt_started = time.perf_counter()
+            started = await self.guard.aacquire()
+            errors, received, pieces, ended = [], False, [], False
+            stream = self.inner.astream_model(prompt, 1)
+            try:
+                while True:
+                    # Collect only while the inner stream runs, not while our consumer does
+                    with collect_backend_errors() as step_errors:
+                        try:
+                            piece = await stream.__anext__()
+                        except StopAsyncIteration:
+                            break
+                        finally:
+                            errors += step_errors
+                    received = received or bool(piece)
+                    pieces.append(piece)
+                    yield piece
+                ended = True
+            finally:
+                await stream.aclose()
+                if received:
+                    self.guard.succeeded(reserved, self._settled(prompt, pieces), started)
+                elif not ended:
+                    self.guard.abandoned(started)
+                # Recorded afterwards: a span cannot stay open across the yields
+                trace_interval(f"attempt {attempt + 1}", 'retry', attempt_started,
+                               endpoint=self.guard.endpoint, received=received)
+            if received:
+                return
+
+            delay = self._retry(attempt, max_retries, errors, started)
+            if delay is None:
+                return
+            with trace_span('backoff', 'wait', seconds=round(delay, 3)):
+                await asyncio.sleep(delay)
+
+    def _single(self, call, prompt):
+        """Run a native decision call once under the endpoint's limits."""
+        reserved = self._reservation(prompt)
+        wait = self.guard.admit(reserved)
+        if wait is None:
+            return None
+        if wait:
+            with trace_span('rate limit wait', 'wait', seconds=round(wait, 3)):
+                time.sleep(wait)
+        with trace_span('attempt 1', 'retry', endpoint=self.guard.endpoint):
+            started = self.guard.acquire()
+            with collect_backend_errors() as errors:
+                try:
+                    answer = call()
+                except BaseException:
+                    self.guard.abandoned(started)
+                    raise
+        if answer is None and errors:
+            self.guard.failed(0, errors[-1], started)
+        elif answer is None:
+            self.guard.unanswered(started)
+        else:
+            self.guard.succeeded(reserved, answer, started)
+        return answer
+
+    async def _asingle(self, call, prompt):
+        """Async version of _single."""
+        reserved = self._reservation(prompt)
+        wait = self.guard.admit(reserved)
+        if wait is None:
+            return None
+        if wait:
+            with trace_span('rate limit wait', 'wait', seconds=round(wait, 3)):
+                await asyncio.sleep(wait)
+        with trace_span('attempt 1', 'retry', endpoint=self.guard.endpoint):
+            started = await self.guard.aacquire()
+            with collect_backend_errors() as errors:
+                try:
+                    answer = await call()
+                except BaseException:
+                    self.guard.abandoned(started)
+                    raise
+        if answer is None and errors:
+            self.guard.failed(0, errors[-1], started)
+        elif answer is None:
+            self.guard.unanswered(started)
+        else:
+            self.guard.succeeded(reserved, answer, started)
+        return answer
+
+    def choose(self, prompt, choices, max_retries=3):
+        if not has_native_decisions(self.inner):
+            return super().choose(prompt, choices, max_retries)
+        return self._single(lambda: self.inner.choose(prompt, choices, max_retries), prompt)
+
+    async def achoose(self, prompt, choices, max_retries=3):
+        if not has_native_decisions(self.inner):
+            return await super().achoose(prompt, choices, max_retries)
+        return await self._asingle(lambda: self.inner.achoose(prompt, choices, max_retries), prompt)
+
+    def select_team(self, prompt, player_names, team_size, max_retries=3):
+        if not has_native_decisions(self.inner):
+            return super().select_team(prompt, player_names, team_size, max_retries)
+        return self._single(lambda: self.inner.select_team(prompt, player_names, team_size, max_retries), prompt)
+
+    async def aselect_team(self, prompt, player_names, team_size, max_retries=3):
+        if not has_native_decisions(self.inner):
+            return await super().aselect_team(prompt, player_names, team_size, max_retries)
+        return await self._asingle(
+            lambda: self.inner.aselect_team(prompt, player_names, team_size, max_retries), prompt)
+
+
+class ResilientBackendFactory:
+    """
+    Picklable backend factory that wraps another factory's backends in ResilientAI.
+
+    In process mode each worker process has its own endpoint guards.
+    """
+
+    def __init__(self, backend_factory, **settings):
+        self.backend_factory = backend_factory
+        self.settings = settings
+
+    def __call__(self):
+        return ResilientAI(self.backend_factory(), **self.settings)
@@ -0,0 +1,324 @@
+"""
+Persistent response cache for AI backends.
+Stores (backend, model, generation params, prompt hash) -> response in SQLite.
+"""
+
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from avalon_ai_game import BaseAI, ModelResponse, has_native_decisions, unwrap_ai
+
+
+class CacheMissError(Exception):
+    """Raised in replay mode when a prompt has no cached response."""
+
+
+def _stored_text(response):
+    """Response text with any reasoning kept, as a <think> block, for replay and logs."""
+    return response.full_text() if isinstance(response, ModelResponse) else str(response)
+
+
+class ResponseCache:
+    """
+    SQLite-backed response store with least-recently-used eviction.
+
+    Safe to share between threads, and between processes through SQLite's
+    own file locking. Hit and miss counters cover this instance only.
+    """
+
+    def __init__(self, path='cache/responses.sqlite', max_entries=100000):
+        """
+        Args:
+            path: SQLite database file (created if missing)
+            max_entries: Oldest-used entries are evicted beyond this size
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        with self._lock, self._conn:
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    backend TEXT,
+                    model TEXT,
+                    params TEXT,
+                    response TEXT,
+                    usage TEXT,
+                    created REAL,
+                    last_used REAL
+                )
+            ''')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS idx_last_used ON responses (last_used)')
+
+    @staticmethod
+    def make_key(backend, model, params, prompt):
+        """Hash everything that determines a response into a cache key."""
+        prompt_hash = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+        identity = json.dumps([backend, model, params, prompt_hash], sort_keys=True, default=str)
+        return hashlib.sha256(identity.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """Return the cached ModelResponse for `key`, or None."""
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                'SELECT response, usage FROM responses WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._conn.execute('UPDATE responses SET last_used = ? WHERE key = ?', (time.time(), key))
+
+        return ModelResponse.from_output(row[0], usage=json.loads(row[1] or '{}'))
+
+    def put(self, key, backend, model, params, response):
+        """Store a response and evict the least recently used entries if over size."""
+        now = time.time()
+        usage = getattr(response, 'usage', {})
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (key, backend, model, json.dumps(params, sort_keys=True, default=str),
+                 _stored_text(response), json.dumps(usage), now, now)
+            )
+            count = self._conn.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+            if count > self.max_entries:
+                excess = count - self.max_entries
+                self._conn.execute(
+                    'DELETE FROM responses WHERE key IN '
+                    '(SELECT key FROM responses ORDER BY last_used LIMIT ?)', (excess,)
+                )
+                self.evictions += excess
+
+    def stats(self):
+        """Return counters and current size."""
+        with self._lock:
+            entries = self._conn.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            'entries': entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions
+        }
+
+    def clear(self):
+        """Delete every cached response."""
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM responses')
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_response_cache(path='cache/responses.sqlite', max_entries=100000):
+    """Return the process-wide ResponseCache for `path`."""
+    key = str(Path(path).resolve())
+    with _caches_lock:
+        if key not in _caches:
+            _caches[key] = ResponseCache(path, max_entries=max_entries)
+        return _caches[key]
+
+
+class CachedAI(BaseAI):
+    """
+    Opt-in caching wrapper around any BaseAI backend.
+
+    Failed calls (None) are never cached. In replay mode a cache miss raises
+    CacheMissError instead of calling the backend, so seeded runs can be
+    reproduced offline without touching the network.
+
+    Backends that pick choices or teams natively (see has_native_decisions)
+    have those answers cached under a key that also covers the options;
+    for all others the underlying text response is cached as usual.
+    A stream that was stopped early is cached as far as it got, since that
+    already holds the answer its parser accepted.
+    """
+
+    def __init__(self, inner, cache, replay=False):
+        self.inner = inner
+        self.cache = cache
+        self.replay = replay
+
+    def get_model_name(self):
+        return self.inner.get_model_name()
+
+    def get_generation_params(self):
+        return self.inner.get_generation_params()
+
+    def _identity(self, prompt, decision=None):
+        backend_ai = unwrap_ai(self.inner)
+        backend = type(backend_ai).__name__
+        model = backend_ai.get_model_name()
+        params = backend_ai.get_generation_params()
+        if decision:
+            params = dict(params, decision=decision)
+        return backend, model, params, ResponseCache.make_key(backend, model, params, prompt)
+
+    def _lookup(self, prompt, decision=None):
+        backend, model, params, key = self._identity(prompt, decision)
+        cached = self.cache.get(key)
+        if cached is None and self.replay:
+            raise CacheMissError(f"No cached response for {backend} ({model}), key {key[:12]}")
+        return cached, (key, backend, model, params)
+
+    def _store(self, entry, response):
+        if response:
+            key, backend, model, params = entry
+            self.cache.put(key, backend, model, params, response)
+
+    # SQLite reads and writes block, so the async paths run them off the event loop
+    async def _alookup(self, prompt, decision=None):
+        return await asyncio.to_thread(self._lookup, prompt, decision)
+
+    async def _astore(self, entry, response):
+        if response:
+            await asyncio.to_thread(self._store, entry, response)
+
+    def call_model(self, prompt, max_retries=3):
+        cached, entry = self._lookup(prompt)
+        if cached is not None:
+            return cached
+
+        response = self.inner.call_model(prompt, max_retries)
+        self._store(entry, response)
+        return response
+
+    async def acall_model(self, prompt, max_retries=3):
+        cached, entry = await self._alookup(prompt)
+        if cached is not None:
+            return cached
+
+        response = await self.inner.acall_model(prompt, max_retries)
+        await self._astore(entry, response)
+        return response
+
+    def stream_model(self, prompt, max_retries=3):
+        cached, entry = self._lookup(prompt)
+        if cached is not None:
+            # Replay the reasoning too, so it is split off and logged as on a live call
+            yield ModelResponse(cached.full_text(), usage=cached.usage)
+            return
+
+        received, metadata = [], {}
+        stream = self.inner.stream_model(prompt, max_retries)
+        try:
+            for piece in stream:
+                received.append(piece)
+                metadata = {'usage': getattr(piece, 'usage', None) or metadata.get('usage')}
+                yield piece
+        except Exception:
+            received = []  # never cache a failed stream
+            raise
+        finally:
+            stream.close()
+            self._store(entry, ModelResponse.from_output(''.join(received), **metadata))
+
+    async def astream_model(self, prompt, max_retries=3):
+        cached, entry = await self._alookup(prompt)
+        if cached is not None:
+            # Replay the reasoning too, so it is split off and logged as on a live call
+            yield ModelResponse(cached.full_text(), usage=cached.usage)
+            return
+
+        received, metadata = [], {}
+        stream = self.inner.astream_model(prompt, max_retries)
+        try:
+            async for piece in stream:
+                received.append(piece)
+                metadata = {'usage': getattr(piece, 'usage', None) or metadata.get('usage')}
+                yield piece
+        except Exception:
+            received = []  # never cache a failed stream
+            raise
+        finally:
+            await stream.aclose()
+            await self._astore(entry, ModelResponse.from_output(''.join(received), **metadata))
+
+    def choose(self, prompt, choices, max_retries=3):
+        if not has_native_decisions(self.inner):
+            return super().choose(prompt, choices, max_retries)
+
+        cached, entry = self._lookup(prompt, {'choose': list(choices)})
+        if cached is not None:
+            return cached
+
+        choice = self.inner.choose(prompt, choices, max_retries)
+        self._store(entry, choice)
+        return choice
+
+    async def achoose(self, prompt, choices, max_retries=3):
+        if not has_native_decisions(self.inner):
+            return await super().achoose(prompt, choices, max_retries)
+
+        cached, entry = await self._alookup(prompt, {'choose': list(choices)})
+        if cached is not None:
+            return cached
+
+        choice = await self.inner.achoose(prompt, choices, max_retries)
+        await self._astore(entry, choice)
+        return choice
+
+    def select_team(self, prompt, player_names, team_size, max_retries=3):
+        if not has_native_decisions(self.inner):
+            return super().select_team(prompt, player_names, team_size, max_retries)
+
+        cached, entry = self._lookup(prompt, {'select_team': [list(player_names), team_size]})
+        if cached is not None:
+            return cached
+
+        response = self.inner.select_team(prompt, player_names, team_size, max_retries)
+        self._store(entry, response)
+        return response
+
+    async def aselect_team(self, prompt, player_names, team_size, max_retries=3):
+        if not has_native_decisions(self.inner):
+            return await super().aselect_team(prompt, player_names, team_size, max_retries)
+
+        cached, entry = await self._alookup(prompt, {'select_team': [list(player_names), team_size]})
+        if cached is not None:
+            return cached
+
+        response = await self.inner.aselect_team(prompt, player_names, team_size, max_retries)
+        await self._astore(entry, response)
+        return response
+
+    def extract_choice(self, response, valid_choices):
+        return self.inner.extract_choice(response, valid_choices)
+
+
+class CachedBackendFactory:
+    """
+    Picklable backend factory that wraps another factory's backends in CachedAI.
+
+    Used by the batch runner so process workers each open the shared cache file.
+    """
+
+    def __init__(self, backend_factory, path='cache/responses.sqlite', replay=False, max_entries=100000):
+        self.backend_factory = backend_factory
+        self.path = path
+        self.replay = replay
+        self.max_entries = max_entries
+
+    def __call__(self):
+        cache = get_response_cache(self.path, max_entries=self.max_entries)
+        return CachedAI(self.backend_factory(), cache, replay=self.replay)
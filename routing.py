@@ -0,0 +1,404 @@
+"""
+Routing calls across several endpoints of the same model.
+A shared EndpointPool balances load and tracks health; RouterAI sends each
+player's calls through it, keeping every game on one endpoint.
+"""
+
+import collections
+import itertools
+import threading
+
+from avalon_ai_game import BaseAI, collect_backend_errors, current_game, has_native_decisions
+from resilience import endpoint_key
+
+
+class Endpoint:
+    """One backend in a pool, with its routing weight, load and health."""
+
+    def __init__(self, name, backend, weight=1):
+        self.name = name
+        self.backend = backend
+        self.weight = weight
+        self.outstanding = 0
+        self.healthy = True
+        self.consecutive_failures = 0
+        self.calls = 0
+        self.failures = 0
+        self.current_weight = 0  # smooth weighted round-robin state
+
+    def snapshot(self):
+        return {
+            'weight': self.weight, 'healthy': self.healthy, 'outstanding': self.outstanding,
+            'calls': self.calls, 'failures': self.failures,
+            'consecutive_failures': self.consecutive_failures
+        }
+
+
+class EndpointPool:
+    """
+    Load balancer over backends that serve the same model.
+
+    Strategies:
+        least_outstanding: the endpoint with the fewest calls in flight per
+            unit of weight
+        round_robin: smooth weighted round-robin
+
+    With sticky routing every call of a game goes to the endpoint its first
+    call was given, so server-side prompt and KV caches for that game stay
+    warm; the game moves only if its endpoint turns unhealthy. An endpoint is
+    unhealthy after `unhealthy_after` failed calls in a row or a failed
+    health check; a background thread re-checks every endpoint with
+    check_health() every `health_check_interval` seconds.
+    """
+
+    STRATEGIES = ('least_outstanding', 'round_robin')
+
+    # Games remembered for sticky routing
+    MAX_STICKY_KEYS = 4096
+
+    def __init__(self, backends, weights=None, strategy='least_outstanding', sticky=True,
+                 unhealthy_after=3, health_check_interval=30.0, name=None):
+        """
+        Args:
+            backends: Backend instances, one per endpoint (Ollama hosts, API keys, ...)
+            weights: Relative capacity per backend (default: all 1)
+            strategy: 'least_outstanding' or 'round_robin'
+            sticky: Keep each game on one endpoint
+            unhealthy_after: Consecutive failed calls that take an endpoint out of rotation
+            health_check_interval: Seconds between background health checks
+                (None: only failed calls and recoveries change health)
+            name: Name for routing_state() (default: the first endpoint's)
+        """
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"Unknown routing strategy: {strategy}")
+        if not backends:
+            raise ValueError("EndpointPool needs at least one backend")
+        weights = weights or [1] * len(backends)
+        self.endpoints = [
+            Endpoint(f"{i}:{endpoint_key(backend)}", backend, weight)
+            for i, (backend, weight) in enumerate(zip(backends, weights))
+        ]
+        self.strategy = strategy
+        self.sticky = sticky
+        self.unhealthy_after = unhealthy_after
+        self.health_check_interval = health_check_interval
+        self.name = name or self.endpoints[0].name.split(':', 1)[1]
+        self._assignments = collections.OrderedDict()  # sticky key -> Endpoint
+        self._tiebreak = itertools.count()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._health_thread = None
+
+        with _pools_lock:
+            _pools[self.name] = self
+
+    def _start_health_checks(self):
+        if self.health_check_interval and self._health_thread is None:
+            self._health_thread = threading.Thread(target=self._health_loop, daemon=True)
+            self._health_thread.start()
+
+    def _health_loop(self):
+        while not self._stop.wait(self.health_check_interval):
+            self.check_health()
+
+    def check_health(self):
+        """Probe every endpoint now and update its health."""
+        for endpoint in self.endpoints:
+            healthy = endpoint.backend.check_health()
+            with self._lock:
+                if healthy and not endpoint.healthy:
+                    print(f"  [Router] {endpoint.name} is healthy again")
+                    endpoint.consecutive_failures = 0
+                elif not healthy and endpoint.healthy:
+                    print(f"  [Router] {endpoint.name} failed its health check")
+                endpoint.healthy = healthy
+
+    def close(self):
+        """Stop the background health checks."""
+        self._stop.set()
+
+    def _choose(self, candidates):
+        if self.strategy == 'round_robin':
+            total = sum(e.weight for e in candidates)
+            for endpoint in candidates:
+                endpoint.current_weight += endpoint.weight
+            chosen = max(candidates, key=lambda e: e.current_weight)
+            chosen.current_weight -= total
+            return chosen
+        # Rotate ties so idle endpoints share the load
+        offset = next(self._tiebreak)
+        return min(
+            candidates,
+            key=lambda e: (e.outstanding / e.weight, (self.endpoints.index(e) - offset) % len(self.endpoints))
+        )
+
+    def acquire(self, key=None, exclude=()):
+        """
+        Pick an endpoint for a call and count it as outstanding.
+
+        Args:
+            key: Sticky routing key (a game id), or None
+            exclude: Endpoints that already failed this call
+        """
+        with self._lock:
+            self._start_health_checks()
+            candidates = [e for e in self.endpoints if e.healthy and e not in exclude]
+            if not candidates:
+                # Nothing known to be healthy: try the rest rather than fail outright
+                candidates = [e for e in self.endpoints if e not in exclude] or list(self.endpoints)
+
+            endpoint = None
+            if self.sticky and key is not None and not exclude:
+                endpoint = self._assignments.get(key)
+                if endpoint not in candidates:
+                    endpoint = None
+            if endpoint is None:
+                endpoint = self._choose(candidates)
+                if self.sticky and key is not None and not exclude:
+                    self._assignments[key] = endpoint
+                    while len(self._assignments) > self.MAX_STICKY_KEYS:
+                        self._assignments.popitem(last=False)
+            if key is not None and key in self._assignments:
+                self._assignments.move_to_end(key)
+
+            endpoint.outstanding += 1
+            endpoint.calls += 1
+            return endpoint
+
+    def release(self, endpoint, ok):
+        """Finish a call; `ok` is False for failed calls and None for cancelled ones."""
+        with self._lock:
+            endpoint.outstanding -= 1
+            if ok:
+                endpoint.consecutive_failures = 0
+                if not endpoint.healthy:
+                    print(f"  [Router] {endpoint.name} is healthy again")
+                endpoint.healthy = True
+            elif ok is False:
+                endpoint.failures += 1
+                endpoint.consecutive_failures += 1
+                if endpoint.healthy and endpoint.consecutive_failures >= self.unhealthy_after:
+                    print(f"  [Router] {endpoint.name} failed {endpoint.consecutive_failures} calls in a row, "
+                          f"taking it out of rotation")
+                    endpoint.healthy = False
+
+    def snapshot(self):
+        with self._lock:
+            state = {e.name: e.snapshot() for e in self.endpoints}
+            games = collections.Counter(e.name for e in self._assignments.values())
+        for name, endpoint_state in state.items():
+            endpoint_state['sticky_games'] = games.get(name, 0)
+        return {'strategy': self.strategy, 'endpoints': state}
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+_pool_creation_lock = threading.Lock()
+
+
+def get_endpoint_pool(name, backend_factories, **settings):
+    """
+    Return the process-wide EndpointPool called `name`, creating it from
+    zero-argument `backend_factories` (one per endpoint) on first use.
+    """
+    with _pool_creation_lock:
+        with _pools_lock:
+            pool = _pools.get(name)
+        if pool is None:
+            pool = EndpointPool([factory() for factory in backend_factories], name=name, **settings)
+        return pool
+
+
+def routing_state():
+    """Load and health of every endpoint pool in this process, for monitoring."""
+    with _pools_lock:
+        pools = dict(_pools)
+    return {name: pool.snapshot() for name, pool in pools.items()}
+
+
+class RouterAI(BaseAI):
+    """
+    Backend that sends each call to an endpoint picked by a shared EndpointPool.
+
+    Calls made during a game are routed by its id (see game_context); outside
+    a game, each RouterAI is its own sticky key. A failed call is retried once
+    on another endpoint. Model name and generation parameters (and so cache
+    keys) come from the pool's first endpoint, since every endpoint serves
+    the same model.
+    """
+
+    def __init__(self, pool, failover=True):
+        """
+        Args:
+            pool: EndpointPool shared by every player that should be balanced together
+            failover: Retry a failed call once on another endpoint
+        """
+        self.pool = pool
+        self.failover = failover
+
+    def get_model_name(self):
+        return self.pool.endpoints[0].backend.get_model_name()
+
+    def get_generation_params(self):
+        return self.pool.endpoints[0].backend.get_generation_params()
+
+    def extract_choice(self, response, valid_choices):
+        return self.pool.endpoints[0].backend.extract_choice(response, valid_choices)
+
+    def check_health(self):
+        return any(e.healthy for e in self.pool.endpoints)
+
+    def _key(self):
+        game = current_game()
+        return game if game is not None else id(self)
+
+    def _attempts(self):
+        return 2 if self.failover and len(self.pool.endpoints) > 1 else 1
+
+    @staticmethod
+    def _outcome(answered, errors):
+        """
+        How a call went for the pool: True if it answered, False if it failed
+        with transport or backend errors, None if it merely had no answer
+        (the endpoint is up; another one would answer the same).
+        """
+        if answered:
+            return True
+        return False if errors else None
+
+    def _routed(self, call):
+        """Run call(backend) on a routed endpoint, failing over once if it fails with errors."""
+        tried = []
+        result = None
+        for _ in range(self._attempts()):
+            endpoint = self.pool.acquire(self._key(), exclude=tried)
+            with collect_backend_errors() as errors:
+                try:
+                    result = call(endpoint.backend)
+                except BaseException:
+                    self.pool.release(endpoint, None)
+                    raise
+            outcome = self._outcome(result is not None, errors)
+            self.pool.release(endpoint, outcome)
+            if outcome is not False:
+                return result
+            tried.append(endpoint)
+        return result
+
+    async def _arouted(self, call):
+        """Async version of _routed."""
+        tried = []
+        result = None
+        for _ in range(self._attempts()):
+            endpoint = self.pool.acquire(self._key(), exclude=tried)
+            with collect_backend_errors() as errors:
+                try:
+                    result = await call(endpoint.backend)
+                except BaseException:
+                    self.pool.release(endpoint, None)
+                    raise
+            outcome = self._outcome(result is not None, errors)
+            self.pool.release(endpoint, outcome)
+            if outcome is not False:
+                return result
+            tried.append(endpoint)
+        return result
+
+    def call_model(self, prompt, max_retries=3):
+        return self._routed(lambda backend: backend.call_model(prompt, max_retries))
+
+    async def acall_model(self, prompt, max_retries=3):
+        return await self._arouted(lambda backend: backend.acall_model(prompt, max_retries))
+
+    def stream_model(self, prompt, max_retries=3):
+        tried = []
+        for _ in range(self._attempts()):
+            endpoint = self.pool.acquire(self._key(), exclude=tried)
+            errors, received, ended = [], False, False
+            stream = endpoint.backend.stream_model(prompt, max_retries)
+            try:
+                while True:
+                    # Collect only while the backend's stream runs, not while our consumer does
+                    with collect_backend_errors() as step_errors:
+                        try:
+                            piece = next(stream)
+                        except StopIteration:
+                            break
+                        finally:
+                            errors += step_errors
+                    received = received or bool(piece)
+                    yield piece
+                ended = True
+            finally:
+                stream.close()
+                outcome = self._outcome(received, errors) if received or ended else None
+                self.pool.release(endpoint, outcome)
+            if outcome is not False:
+                return
+            tried.append(endpoint)
+
+    async def astream_model(self, prompt, max_retries=3):
+        tried = []
+        for _ in range(self._attempts()):
+            endpoint = self.pool.acquire(self._key(), exclude=tried)
+            errors, received, ended = [], False, False
+            stream = endpoint.backend.astream_model(prompt, max_retries)
+            try:
+                while True:
+                    # Collect only while the backend's stream runs, not while our consumer does
+                    with collect_backend_errors() as step_errors:
+                        try:
+                            piece = await stream.__anext__()
+                        except StopAsyncIteration:
+                            break
+                        finally:
+                            errors += step_errors
+                    received = received or bool(piece)
+                    yield piece
+                ended = True
+            finally:
+                await stream.aclose()
+                outcome = self._outcome(received, errors) if received or ended else None
+                self.pool.release(endpoint, outcome)
+            if outcome is not False:
+                return
+            tried.append(endpoint)
+
+    def _native(self):
+        return has_native_decisions(self.pool.endpoints[0].backend)
+
+    def choose(self, prompt, choices, max_retries=3):
+        if not self._native():
+            return super().choose(prompt, choices, max_retries)
+        return self._routed(lambda backend: backend.choose(prompt, choices, max_retries))
+
+    async def achoose(self, prompt, choices, max_retries=3):
+        if not self._native():
+            return await super().achoose(prompt, choices, max_retries)
+        return await self._arouted(lambda backend: backend.achoose(prompt, choices, max_retries))
+
+    def select_team(self, prompt, player_names, team_size, max_retries=3):
+        if not self._native():
+            return super().select_team(prompt, player_names, team_size, max_retries)
+        return self._routed(lambda backend: backend.select_team(prompt, player_names, team_size, max_retries))
+
+    async def aselect_team(self, prompt, player_names, team_size, max_retries=3):
+        if not self._native():
+            return await super().aselect_team(prompt, player_names, team_size, max_retries)
+        return await self._arouted(
+            lambda backend: backend.aselect_team(prompt, player_names, team_size, max_retries))
+
+
+class RouterBackendFactory:
+    """
+    Picklable backend factory for batch runs: every backend it makes routes
+    through the process-wide pool `name`, built from `backend_factories`.
+    """
+
+    def __init__(self, name, backend_factories, **settings):
+        self.name = name
+        self.backend_factories = backend_factories
+        self.settings = settings
+
+    def __call__(self):
+        return RouterAI(get_endpoint_pool(self.name, self.backend_factories, **self.settings))
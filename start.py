@@ -8,7 +8,9 @@ from avalon_ai_game import (
     AvalonGame,
     GameController,
     OllamaAI,
+    OllamaHTTPAI,
     DeepSeekAPI,
+    OpenAICompatibleAI,
     LocalModelAI
 )
 
@@ -26,10 +28,11 @@ def select_ai_backend():
     print("  1. Ollama (Local Ollama models)")
     print("  2. DeepSeek API (Online API)")
     print("  3. Local Model (Local Transformers models)")
+    print("  4. OpenAI-compatible server (vLLM, llama.cpp, LM Studio, ...)")
 
     while True:
-        choice = input("\nEnter option (1-3): ").strip()
-        if choice in ['1', '2', '3']:
+        choice = input("\nEnter option (1-4): ").strip()
+        if choice in ['1', '2', '3', '4']:
             return choice
         print("Invalid option, please try again")
 
@@ -46,7 +49,16 @@ def configure_ollama():
     if not model_name:
         model_name = 'deepseek-r1'
 
-    return OllamaAI(model_name=model_name)
+    print("\nConnection type:")
+    print("  1. HTTP API (default, keeps the model loaded between calls)")
+    print("  2. ollama CLI (spawns 'ollama run' for every call)")
+
+    connection = input("\nEnter option (1-2, default 1): ").strip()
+    if connection == '2':
+        return OllamaAI(model_name=model_name)
+
+    host = input("Enter Ollama host (default: $OLLAMA_HOST or http://localhost:11434): ").strip()
+    return OllamaHTTPAI(model_name=model_name, host=host or None)
 
 
 def configure_deepseek_api():
@@ -74,6 +86,24 @@ def configure_deepseek_api():
         return DeepSeekAPI(model=model)
 
 
+def configure_openai_compatible():
+    """Configure an OpenAI-compatible chat completions backend."""
+    print("\nConfigure OpenAI-compatible server:")
+
+    base_url = input("\nEnter API base URL (default: http://localhost:8000/v1): ").strip()
+    if not base_url:
+        base_url = 'http://localhost:8000/v1'
+
+    model = input("Enter model name: ").strip()
+    if not model:
+        print("Error: Model name is required")
+        return None
+
+    api_key = input("Enter API key (or press Enter for $OPENAI_API_KEY / none): ").strip()
+
+    return OpenAICompatibleAI(base_url=base_url, model=model, api_key=api_key or None)
+
+
 def configure_local_model():
     """Configure local model backend."""
     print("\nConfigure Local Model:")
@@ -109,6 +139,8 @@ def configure_player_ai(player_num, player_name):
         return configure_deepseek_api()
     elif backend_choice == '3':
         return configure_local_model()
+    elif backend_choice == '4':
+        return configure_openai_compatible()
 
     return None
 
@@ -125,6 +157,8 @@ def quick_start_mode():
         ai_instance = configure_deepseek_api()
     elif backend_choice == '3':
         ai_instance = configure_local_model()
+    elif backend_choice == '4':
+        ai_instance = configure_openai_compatible()
 
     if not ai_instance:
         print("Configuration failed")
@@ -133,13 +167,26 @@ def quick_start_mode():
     # Create 6 instances with same config
     player_ais = []
     for i in range(6):
-        if backend_choice == '1':
+        if isinstance(ai_instance, OllamaHTTPAI):
+            player_ais.append(OllamaHTTPAI(
+                model_name=ai_instance.model_name,
+                host=ai_instance.host,
+                keep_alive=ai_instance.keep_alive,
+                options=ai_instance.options
+            ))
+        elif backend_choice == '1':
             player_ais.append(OllamaAI(model_name=ai_instance.model_name))
         elif backend_choice == '2':
             player_ais.append(DeepSeekAPI(api_key=ai_instance.api_key, model=ai_instance.model))
         elif backend_choice == '3':
             # Share the same model instance for local models to save memory
             player_ais.append(ai_instance)
+        elif backend_choice == '4':
+            player_ais.append(OpenAICompatibleAI(
+                base_url=ai_instance.base_url,
+                model=ai_instance.model,
+                api_key=ai_instance.api_key
+            ))
 
     return player_ais
 
@@ -202,8 +249,12 @@ def main():
     print("\nPlayer AI Configuration:")
     for i, (name, ai) in enumerate(zip(player_names, player_ais)):
         ai_type = type(ai).__name__
-        if isinstance(ai, OllamaAI):
+        if isinstance(ai, OllamaHTTPAI):
+            config = f"{ai_type} (model: {ai.model_name}, host: {ai.host})"
+        elif isinstance(ai, OllamaAI):
             config = f"{ai_type} (model: {ai.model_name})"
+        elif isinstance(ai, OpenAICompatibleAI):
+            config = f"{ai_type} (model: {ai.model}, url: {ai.base_url})"
         elif isinstance(ai, DeepSeekAPI):
             config = f"{ai_type} (model: {ai.model})"
         elif isinstance(ai, LocalModelAI):
@@ -0,0 +1,166 @@
+"""
+Incremental parsers for streamed model responses.
+Each parser watches the text as it arrives and reports as soon as the
+response holds an unambiguous final answer, so generation can be cancelled.
+"""
+
+import re
+
+# Markup models wrap answers in: **APPROVE**, "Alice", [SUCCESS], `FAIL`
+_MARKUP = ' \t*_`"\'[]()<>.!:'
+
+# "Final answer: X", "My vote - X", "Target: X", ...
+_ANSWER_LABEL = re.compile(
+    r'^(?:final\s+|my\s+)?(?:answer|vote|action|decision|choice|target|selection|team)\s*[:=\-]\s*(.+)$',
+    re.IGNORECASE
+)
+
+
+def split_reasoning(text):
+    """
+    Split a response into (reasoning, answer).
+
+    Reasoning is every <think>...</think> block, an unclosed <think> block
+    cut off by the token budget, or, for chat templates that open the block
+    themselves, everything before a lone </think>.
+    """
+    reasoning = []
+    if '</think>' in text and '<think>' not in text.split('</think>', 1)[0]:
+        head, text = text.split('</think>', 1)
+        reasoning.append(head)
+
+    def keep(match):
+        reasoning.append(match.group(1))
+        return ''
+
+    text = re.sub(r'<think>(.*?)</think>', keep, text, flags=re.DOTALL)
+    if '<think>' in text:
+        text, tail = text.split('<think>', 1)
+        reasoning.append(tail)
+    return '\n\n'.join(part.strip() for part in reasoning if part.strip()), text.strip()
+
+
+class StreamParser:
+    """
+    Base class: accumulate streamed text and decide when the answer is final.
+
+    Reasoning inside <think>...</think> is skipped, since models are free to
+    mention every option while thinking.
+    """
+
+    def __init__(self):
+        self.text = ''
+        self.answer = None
+
+    @property
+    def done(self):
+        return self.answer is not None
+
+    def visible_text(self):
+        """The text so far with reasoning blocks (closed or still open) removed."""
+        visible = re.sub(r'<think>.*?</think>', '', self.text, flags=re.DOTALL)
+        return visible.split('<think>', 1)[0]
+
+    def feed(self, chunk):
+        """Add a chunk of streamed text; returns True once a final answer is known."""
+        self.text += chunk
+        if not self.done:
+            self.answer = self._parse(self.visible_text(), final=False)
+        return self.done
+
+    def finish(self):
+        """Parse whatever arrived once the stream has ended; returns the answer or None."""
+        if not self.done:
+            self.answer = self._parse(self.visible_text(), final=True)
+        return self.answer
+
+    def _parse(self, visible, final):
+        raise NotImplementedError
+
+    @staticmethod
+    def _complete_lines(visible, final):
+        """Lines that can no longer change: all newline-terminated ones, plus the tail at the end."""
+        lines = visible.split('\n')
+        if not final:
+            lines = lines[:-1]
+        return [line.strip(_MARKUP) for line in lines if line.strip(_MARKUP)]
+
+
+class ChoiceParser(StreamParser):
+    """
+    Final answer for a pick-one decision (vote, mission card, assassination target).
+
+    The answer is final when the response opens with a lone choice (the
+    prompts ask for nothing else), or when a completed line holds just a
+    choice or a labelled answer such as "Final vote: REJECT".
+    """
+
+    def __init__(self, choices):
+        super().__init__()
+        self.choices = list(choices)
+        self._by_lower = {choice.lower(): choice for choice in self.choices}
+
+    def _match(self, text):
+        return self._by_lower.get(text.strip(_MARKUP).lower())
+
+    def _parse(self, visible, final):
+        stripped = visible.lstrip(_MARKUP + '\n')
+        # A lone first word ("APPROVE", "**FAIL**", "Alice."); "APPROVE because ..." is prose
+        first_word = re.match(r'([^\s,;:.!*"\'`\]\)]+)[\n.!*"\'`\]\)]', stripped + ('\n' if final else ''))
+        if first_word and self._match(first_word.group(1)):
+            return self._match(first_word.group(1))
+
+        for line in self._complete_lines(visible, final):
+            choice = self._match(line)
+            if choice:
+                return choice
+            labelled = _ANSWER_LABEL.match(line)
+            if labelled and self._match(labelled.group(1)):
+                return self._match(labelled.group(1))
+        return None
+
+
+class TeamParser(StreamParser):
+    """
+    Final answer for a team proposal: a completed line listing exactly
+    `team_size` distinct valid player names, comma separated.
+
+    The answer is normalised to "Name1, Name2, ...".
+    """
+
+    def __init__(self, player_names, team_size):
+        super().__init__()
+        self.player_names = list(player_names)
+        self.team_size = team_size
+
+    def _parse(self, visible, final):
+        for line in self._complete_lines(visible, final):
+            labelled = _ANSWER_LABEL.match(line)
+            if labelled:
+                line = labelled.group(1)
+            names = [name.strip(_MARKUP) for name in line.split(',')]
+            if (len(names) == self.team_size and len(set(names)) == self.team_size
+                    and all(name in self.player_names for name in names)):
+                return ', '.join(names)
+        return None
+
+
+class SentenceParser(StreamParser):
+    """
+    Final answer for a discussion comment: the first `max_sentences`
+    sentences, which is all the controller keeps of a comment.
+    """
+
+    def __init__(self, max_sentences=2):
+        super().__init__()
+        self.max_sentences = max_sentences
+
+    def _parse(self, visible, final):
+        visible = visible.strip()
+        # Same sentence split as the controller: every '.' ends a sentence
+        parts = visible.split('.')
+        if len(parts) > self.max_sentences:
+            return '.'.join(parts[:self.max_sentences]).strip() + '.'
+        if final and visible:
+            return visible
+        return None
@@ -0,0 +1,82 @@
+"""
+Structured (JSON) answers for team decisions.
+Builds the response schema, tracks which schema the current backend call must
+follow, and validates replies.
+"""
+
+import contextvars
+import json
+from contextlib import contextmanager
+
+_response_schema = contextvars.ContextVar('avalon_response_schema', default=None)
+
+
+def current_response_schema():
+    """JSON schema the backend call in this context must answer with, or None."""
+    return _response_schema.get()
+
+
+@contextmanager
+def response_schema_context(schema):
+    """Ask backends to use their JSON mode for calls made inside the block."""
+    token = _response_schema.set(schema)
+    try:
+        yield
+    finally:
+        _response_schema.reset(token)
+
+
+def team_schema(player_names, team_size):
+    """Schema for {"reasoning": ..., "team": [...]} with exactly `team_size` distinct valid names."""
+    return {
+        'type': 'object',
+        'properties': {
+            'reasoning': {'type': 'string'},
+            'team': {
+                'type': 'array',
+                'items': {'type': 'string', 'enum': list(player_names)},
+                'minItems': team_size,
+                'maxItems': team_size,
+                'uniqueItems': True
+            }
+        },
+        'required': ['reasoning', 'team']
+    }
+
+
+def _json_object(text):
+    """Decode the outermost JSON object in a reply, ignoring code fences or prose around it."""
+    start, end = text.find('{'), text.rfind('}')
+    if start == -1 or end < start:
+        raise ValueError("no JSON object found")
+    return json.loads(text[start:end + 1])
+
+
+def validate_team(text, player_names, team_size):
+    """
+    Check a JSON team reply.
+
+    Returns (team, reasoning, None) for a valid reply, with names in their
+    canonical spelling, or (None, None, error) describing the first problem.
+    """
+    try:
+        data = _json_object(text or '')
+    except ValueError as e:
+        return None, None, f"not valid JSON ({e})"
+
+    team = data.get('team') if isinstance(data, dict) else None
+    if not isinstance(team, list) or not all(isinstance(name, str) for name in team):
+        return None, None, '"team" must be a list of player names'
+
+    by_lower = {name.lower(): name for name in player_names}
+    unknown = [name for name in team if name.strip().lower() not in by_lower]
+    if unknown:
+        return None, None, f"unknown players {unknown}"
+    team = [by_lower[name.strip().lower()] for name in team]
+    if len(set(team)) != len(team):
+        return None, None, '"team" repeats a player'
+    if len(team) != team_size:
+        return None, None, f'"team" has {len(team)} players, exactly {team_size} are required'
+
+    reasoning = data.get('reasoning')
+    return team, reasoning.strip() if isinstance(reasoning, str) else '', None
@@ -0,0 +1,31 @@
+import contextlib
+import io
+
+from avalon_ai_game import AvalonGame, BaseAI, GameController, ModelResponse
+from game_logger import GameLogger
+
+
+class RamblingAI(BaseAI):
+    """Always answers, but never with a vote, card, team or name."""
+
+    def call_model(self, prompt, max_retries=3):
+        return ModelResponse('Hmm')
+
+
+def test_fallbacks_are_counted_where_the_game_decides(tmp_path):
+    game = AvalonGame(['Alice', 'Bob', 'Charlie', 'Diana', 'Eve', 'Frank'])
+    logger = GameLogger(str(tmp_path), game_id='fallbacks')
+    controller = GameController(game, [RamblingAI() for _ in range(6)], logger=logger)
+    fallbacks, calls = [], []
+    controller.set_fallback_handler(lambda action, backend: fallbacks.append(action))
+    controller.set_call_handler(calls.append)
+    with contextlib.redirect_stdout(io.StringIO()):
+        controller.run_game()
+
+    # Team proposals came back, yet none could be used
+    proposals = [call for call in calls if call['action'] == 'team_proposal']
+    assert proposals and all(call['ok'] for call in proposals)
+    assert fallbacks.count('team_proposal') == len(proposals)
+    assert fallbacks.count('vote') == sum(1 for call in calls if call['action'] == 'vote')
+    logged = logger.game_log['fallbacks']['RamblingAI']
+    assert sum(logged.values()) == len(fallbacks)
@@ -0,0 +1,26 @@
+import asyncio
+import threading
+
+import pytest
+
+from avalon_ai_game import BaseAI, ModelResponse
+from batch_start import LimitedAI
+
+
+class EchoAI(BaseAI):
+    def call_model(self, prompt, max_retries=3):
+        return ModelResponse(prompt)
+
+
+def test_async_mode_refuses_unlimited_sync_calls():
+    ai = LimitedAI(EchoAI(), asyncio.Semaphore(1))
+    with pytest.raises(TypeError):
+        ai.call_model('p')
+    assert asyncio.run(ai.acall_model('p')) == 'p'
+
+
+def test_sync_calls_hold_a_blocking_semaphore():
+    semaphore = threading.BoundedSemaphore(1)
+    ai = LimitedAI(EchoAI(), semaphore)
+    assert ai.call_model('p') == 'p'
+    assert semaphore.acquire(blocking=False)
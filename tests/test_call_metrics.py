@@ -0,0 +1,30 @@
+from avalon_ai_game import BaseAI, ModelResponse
+from call_metrics import summarize_calls
+from game_logger import GameLogger
+from stream_parsers import SentenceParser
+
+
+class SSEAI(BaseAI):
+    """Streams sentences; like an SSE server, usage only comes with the last event."""
+
+    def stream_model(self, prompt, max_retries=3):
+        yield from ['I trust Alice. ', 'Bob worries me. ', 'Carol is quiet. ', 'Dave too.']
+        yield ModelResponse('', usage={'prompt_tokens': 100, 'completion_tokens': 12})
+
+
+def test_stream_stopped_before_its_usage_event_gets_estimated_usage(tmp_path):
+    prompt = 'x' * 400
+    response = SSEAI().stream_until(prompt, SentenceParser(max_sentences=2))
+    assert response.usage == {'prompt_tokens': 100, 'completion_tokens': 8, 'estimated': True}
+
+    logger = GameLogger(str(tmp_path), game_id='t')
+    record = logger.log_backend_call('Alice', 'discussion', 'SSEAI', response, 0.1)
+    assert record['usage_estimated'] and record['prompt_tokens'] == 100
+    stats = summarize_calls([record])['overall']
+    assert stats['prompt_tokens'] == 100 and stats['calls_with_estimated_usage'] == 1
+    assert stats['calls_without_usage'] == 0
+
+
+def test_stream_read_to_its_end_keeps_the_server_usage():
+    response = SSEAI().stream_until('p', SentenceParser(max_sentences=10))
+    assert response.usage == {'prompt_tokens': 100, 'completion_tokens': 12}
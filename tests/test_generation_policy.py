@@ -0,0 +1,76 @@
+from avalon_ai_game import DeepSeekAPI, OllamaHTTPAI, OpenAICompatibleAI
+from generation_policy import DEFAULT_POLICY, StopScanner, action_context, server_settings
+
+
+def stream(scanner, pieces):
+    """Feed pieces until the scanner is done; return the text it kept."""
+    kept = ''
+    for piece in pieces:
+        text, done = scanner.feed(piece)
+        kept += text
+        if done:
+            break
+    return kept
+
+
+def chunks(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+REASONED = '<think>\nThe team looks safe.\n\nBut Bob rejected twice.\n</think>\n\nI trust this team. Bob worries me.\n\nExtra paragraph.'
+
+
+def test_discussion_stop_applies_after_think_block():
+    for size in (1, 3, 7, len(REASONED)):
+        kept = stream(StopScanner(DEFAULT_POLICY.for_action('discussion')), chunks(REASONED, size))
+        assert kept == REASONED[:REASONED.index('\n\nExtra')]
+
+
+def test_budget_counts_answer_only():
+    answer = 'APPROVE because the team is clean and the leader is trusted'
+    text = '<think>' + 'x' * 500 + '</think>\n\n' + answer
+    kept = stream(StopScanner({'max_tokens': 2}), chunks(text, 5))
+    assert kept.endswith('</think>\n\nAPPROVE ')
+    assert kept == text[:text.index(answer) + 8]
+
+
+def test_unfinished_think_block_passes_through():
+    text = '<think>\n\nstill thinking'
+    assert stream(StopScanner({'stop': ['\n\n'], 'max_tokens': 1}), chunks(text, 4)) == text
+
+
+def test_plain_answer_still_stops():
+    kept = stream(StopScanner({'stop': ['\n\n']}), chunks('\n\nFirst paragraph.\n\nSecond.', 4))
+    assert kept == '\n\nFirst paragraph.'
+
+
+def test_thinking_calls_send_no_budget_or_stops():
+    settings = DEFAULT_POLICY.for_action('discussion')
+    assert server_settings(settings, thinking=False) == settings
+    assert server_settings(settings, thinking=True) == {'temperature': 0.8}
+
+
+def test_reasoning_backends_leave_budget_to_the_answer():
+    reasoner = DeepSeekAPI(api_key='key', model='deepseek-reasoner')
+    chat = DeepSeekAPI(api_key='key', model='deepseek-chat')
+    with action_context('vote', 'good'):
+        assert 'max_tokens' not in reasoner._sampling_params()
+        assert chat._sampling_params()['max_tokens'] == 256
+    with action_context('mission_action', 'good'):
+        # think: False switches to deepseek-chat, which gets the budget back
+        assert reasoner._build_payload('p')['model'] == 'deepseek-chat'
+        assert reasoner._sampling_params()['max_tokens'] == 256
+
+    with action_context('discussion'):
+        assert 'num_predict' not in OllamaHTTPAI('deepseek-r1')._options()
+        assert OllamaHTTPAI('qwen2.5')._options()['stop'] == ['\n\n']
+        qwen3 = OpenAICompatibleAI('http://localhost:8000/v1', 'qwen3', think_field='enable_thinking')
+        assert qwen3._sampling_params()['max_tokens'] == 120
+
+
+def test_possible_stop_is_held_until_resolved():
+    scanner = StopScanner({'stop': ['\n\n']})
+    assert scanner.feed('Yes.\n') == ('Yes.', False)
+    assert scanner.feed('No') == ('\nNo', False)
+    assert scanner.feed('\n') == ('', False)
+    assert scanner.flush() == '\n'
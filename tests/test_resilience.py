@@ -0,0 +1,175 @@
+import asyncio
+import itertools
+import time
+
+from avalon_ai_game import BaseAI, ModelResponse, _report_error
+from generation_policy import action_context
+from resilience import AdaptiveLimiter, ResilientAI
+
+_endpoints = itertools.count()
+
+
+class ScriptedAI(BaseAI):
+    """Answers from a script: a string, None, or an exception it reports and swallows."""
+
+    def __init__(self, *script):
+        self.script = list(script)
+        self.calls = 0
+
+    def call_model(self, prompt, max_retries=3):
+        self.calls += 1
+        step = self.script.pop(0)
+        if isinstance(step, Exception):
+            _report_error(step)
+            return None
+        return None if step is None else ModelResponse(step)
+
+
+class NativeAI(ScriptedAI):
+    """A backend with its own choose(), such as a local model scoring choices."""
+
+    def choose(self, prompt, choices, max_retries=3):
+        return self.call_model(prompt)
+
+
+def resilient(inner):
+    return ResilientAI(inner, endpoint=f"test-{next(_endpoints)}", backoff_base=0, failure_threshold=2)
+
+
+def test_plain_none_is_not_retried_or_counted_against_the_breaker():
+    inner = ScriptedAI(None, None, None)
+    ai = resilient(inner)
+    for _ in range(3):
+        assert ai.call_model('p') is None
+    state = ai.guard.snapshot()
+    assert inner.calls == 3
+    assert state['unanswered'] == 3
+    assert state['failures'] == state['retries'] == 0
+    assert state['circuit']['state'] == 'closed'
+
+
+def test_transport_errors_are_retried_and_trip_the_breaker():
+    inner = ScriptedAI(ConnectionError('refused'), ConnectionError('refused'), 'APPROVE')
+    ai = resilient(inner)
+    assert ai.call_model('p') is None
+    state = ai.guard.snapshot()
+    assert inner.calls == 2
+    assert state['failures'] == 2 and state['retries'] == 1
+    assert state['circuit']['state'] == 'open'
+
+
+def test_native_decision_without_answer_is_unanswered():
+    ai = resilient(NativeAI(None, 'APPROVE'))
+    assert ai.choose('p', ['APPROVE', 'REJECT']) is None
+    assert ai.choose('p', ['APPROVE', 'REJECT']) == 'APPROVE'
+    state = ai.guard.snapshot()
+    assert state['unanswered'] == 1 and state['successes'] == 1 and state['failures'] == 0
+
+
+def test_limiter_grows_while_saturated_and_fast():
+    limiter = AdaptiveLimiter('grow', initial=2, max_limit=3)
+    for _ in range(6):
+        for _ in range(int(limiter.limit)):
+            limiter.acquire()
+        for _ in range(int(limiter.limit)):
+            # Steady 0.1s calls; microsecond timings would jitter into "spikes"
+            limiter.release(time.monotonic() - 0.1, 'ok')
+    assert limiter.limit == 3
+    assert limiter.increases >= 3 and limiter.decreases == 0
+
+
+def test_limiter_does_not_grow_below_its_limit():
+    limiter = AdaptiveLimiter('idle', initial=4)
+    for _ in range(10):
+        limiter.acquire()
+        limiter.release(time.monotonic() - 0.1, 'ok')
+    assert limiter.limit == 4 and limiter.increases == 0
+
+
+def test_limiter_shrinks_once_per_burst_of_429s():
+    limiter = AdaptiveLimiter('throttled', initial=8)
+    starts = [limiter.acquire() for _ in range(4)]
+    for started in starts:
+        limiter.release(started, 'throttled')
+    assert limiter.limit == 4 and limiter.decreases == 1
+
+
+def test_limiter_shrinks_on_latency_spike():
+    limiter = AdaptiveLimiter('slow', initial=8, latency_factor=3.0)
+    with action_context('vote'):
+        limiter.acquire()
+        limiter.release(time.monotonic() - 0.01, 'ok')
+        limiter.acquire()
+        limiter.release(time.monotonic() - 0.2, 'ok')
+    with action_context('assassination'):
+        # Another action type has its own usual latency
+        limiter.acquire()
+        limiter.release(time.monotonic() - 0.2, 'ok')
+    assert limiter.limit == 4 and limiter.decreases == 1
+    assert set(limiter.latency) == {'vote', 'assassination'}
+
+
+def test_release_of_a_call_never_made_frees_the_slot_only():
+    limiter = AdaptiveLimiter('unused', initial=1)
+    limiter.acquire()
+    limiter.release(None, 'ok')
+    assert limiter.snapshot()['in_flight'] == 0
+    assert limiter.latency == {} and limiter.limit == 1 and limiter.increases == 0
+
+
+def test_queued_callers_are_served_in_order():
+    async def main():
+        limiter = AdaptiveLimiter('queue', initial=1)
+        held = await limiter.aacquire()
+        order = []
+
+        async def call(name):
+            await limiter.aacquire()
+            order.append(name)
+
+        tasks = [asyncio.create_task(call(name)) for name in 'abc']
+        await asyncio.sleep(0)
+        assert limiter.snapshot()['queue_depth'] == 3
+        limiter.release(held, None)
+        for _ in range(3):
+            await asyncio.sleep(0.01)
+            limiter.release(None, None)
+        await asyncio.gather(*tasks)
+        assert order == ['a', 'b', 'c']
+        assert limiter.snapshot()['in_flight'] == 0
+
+    asyncio.run(main())
+
+
+def test_cancelled_while_queued_leaves_the_queue():
+    async def main():
+        limiter = AdaptiveLimiter('cancel-queued', initial=1)
+        held = await limiter.aacquire()
+        waiter = asyncio.create_task(limiter.aacquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        assert limiter.snapshot()['queue_depth'] == 0
+        assert limiter.snapshot()['in_flight'] == 1
+        limiter.release(held, None)
+        assert limiter.snapshot()['in_flight'] == 0
+
+    asyncio.run(main())
+
+
+def test_cancelled_after_grant_gives_the_slot_back():
+    async def main():
+        limiter = AdaptiveLimiter('cancel-granted', initial=1)
+        held = await limiter.aacquire()
+        waiter = asyncio.create_task(limiter.aacquire())
+        await asyncio.sleep(0)
+        # The slot is handed over, but the waiter is cancelled before it resumes
+        limiter.release(held, None)
+        assert limiter.snapshot()['in_flight'] == 1
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        assert waiter.cancelled()
+        assert limiter.snapshot()['in_flight'] == 0 and limiter.snapshot()['queue_depth'] == 0
+        await asyncio.wait_for(limiter.aacquire(), 1)
+
+    asyncio.run(main())
@@ -0,0 +1,26 @@
+import asyncio
+
+from avalon_ai_game import BaseAI, ModelResponse
+from response_cache import CachedAI, ResponseCache
+
+
+class ScoringAI(BaseAI):
+    """A backend with its own choose(), reporting the prompt's tokens."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def choose(self, prompt, choices, max_retries=3):
+        self.calls += 1
+        return ModelResponse(choices[0], usage={'prompt_tokens': 42, 'completion_tokens': 0})
+
+
+def test_cached_choice_keeps_its_usage(tmp_path):
+    inner = ScoringAI()
+    ai = CachedAI(inner, ResponseCache(tmp_path / 'cache.sqlite'))
+    first = ai.choose('p', ['APPROVE', 'REJECT'])
+    hit = ai.choose('p', ['APPROVE', 'REJECT'])
+    async_hit = asyncio.run(ai.achoose('p', ['APPROVE', 'REJECT']))
+    assert inner.calls == 1
+    assert first == hit == async_hit == 'APPROVE'
+    assert hit.usage == async_hit.usage == first.usage
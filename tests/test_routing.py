@@ -0,0 +1,56 @@
+import asyncio
+
+from avalon_ai_game import BaseAI, ModelResponse, _report_error
+from routing import EndpointPool, RouterAI
+
+
+class HostAI(BaseAI):
+    """One endpoint: answers, returns nothing, or reports a connection error."""
+
+    def __init__(self, mode):
+        self.mode = mode
+        self.calls = 0
+
+    def _answer(self):
+        self.calls += 1
+        if self.mode == 'down':
+            _report_error(ConnectionError('refused'))
+            return None
+        return ModelResponse('APPROVE') if self.mode == 'up' else None
+
+    def call_model(self, prompt, max_retries=3):
+        return self._answer()
+
+    def choose(self, prompt, choices, max_retries=3):
+        return self._answer()
+
+    def stream_model(self, prompt, max_retries=3):
+        answer = self._answer()
+        if answer:
+            yield answer
+
+
+def router(*modes):
+    hosts = [HostAI(mode) for mode in modes]
+    pool = EndpointPool(hosts, strategy='round_robin', sticky=False, health_check_interval=0)
+    return RouterAI(pool), hosts, pool
+
+
+def test_answerless_calls_keep_the_endpoint_and_do_not_fail_over():
+    ai, hosts, pool = router('empty', 'empty')
+    for _ in range(4):
+        assert ai.choose('p', ['APPROVE', 'REJECT']) is None
+        assert ''.join(ai.stream_model('p')) == ''
+        assert asyncio.run(ai.acall_model('p')) is None
+    # One attempt per call: nothing failed over
+    assert sum(host.calls for host in hosts) == 12
+    assert all(e.healthy and e.failures == 0 for e in pool.endpoints)
+
+
+def test_errors_fail_over_and_take_the_endpoint_out():
+    ai, hosts, pool = router('down', 'up')
+    for _ in range(3):
+        assert ai.call_model('p') == 'APPROVE'
+        assert ''.join(ai.stream_model('p')) == 'APPROVE'
+    down = pool.endpoints[0]
+    assert down.failures >= 3 and not down.healthy
@@ -0,0 +1,176 @@
+"""
+Execution timelines of games.
+A Tracer records nested spans (game, round, proposal, phase, backend call,
+retry attempt) and exports them as Chrome Trace Event JSON, which Perfetto
+(https://ui.perfetto.dev) and chrome://tracing open as a timeline.
+"""
+
+import contextlib
+import contextvars
+import itertools
+import json
+import threading
+import time
+from pathlib import Path
+
+
+# Innermost open span in this context; tasks and to_thread calls inherit it
+_current_span = contextvars.ContextVar('avalon_trace_span', default=None)
+
+
+class Span:
+    """One timed step of a game, nested inside the span that was open when it started."""
+
+    __slots__ = ('tracer', 'span_id', 'parent_id', 'name', 'category', 'lane', 'args', 'start', 'end')
+
+    def __init__(self, tracer, span_id, parent, name, category, lane, args):
+        self.tracer = tracer
+        self.span_id = span_id
+        self.parent_id = parent.span_id if parent else None
+        self.name = name
+        self.category = category
+        self.lane = lane
+        self.args = args
+        self.start = time.perf_counter()
+        self.end = None
+
+
+class Tracer:
+    """
+    Collects the spans of one game and exports them as a Chrome trace.
+
+    Every span is drawn on a lane (a trace "thread"): game, round, proposal
+    and phase spans on the 'game' lane, backend calls on the lane of the
+    player making them, and anything inside a call on its caller's lane.
+    Calls that run at the same time, such as votes, so appear side by side
+    under their phase, and the longest one is the phase's critical path.
+    Parent ids are kept in each event's args for tools that rebuild the tree.
+    """
+
+    MAIN_LANE = 'game'
+
+    def __init__(self, name='Avalon game'):
+        """
+        Args:
+            name: Process name shown for this trace in the viewer
+        """
+        self.name = name
+        self.spans = []
+        self.events = []  # instant events: (name, lane, time, args)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+
+    def _parent(self):
+        parent = _current_span.get()
+        return parent if parent is not None and parent.tracer is self else None
+
+    @contextlib.contextmanager
+    def span(self, name, category, lane=None, **args):
+        """
+        Time the block as a span; yields the Span so results can be added to its args.
+
+        Args:
+            name: Label shown on the timeline
+            category: Kind of span ('game', 'round', 'proposal', 'phase', 'call', 'retry', ...)
+            lane: Lane to draw it on (default: the parent's lane)
+            **args: Details shown when the span is selected
+        """
+        parent = self._parent()
+        lane = lane or (parent.lane if parent else self.MAIN_LANE)
+        span = Span(self, next(self._ids), parent, name, category, lane, args)
+        token = _current_span.set(span)
+        try:
+            yield span
+        finally:
+            span.end = time.perf_counter()
+            _current_span.reset(token)
+            with self._lock:
+                self.spans.append(span)
+
+    def record(self, name, category, started, **args):
+        """
+        Add a span that ran from `started` (a time.perf_counter() reading)
+        until now, for steps that cannot be a with block, such as a stream
+        attempt that yields to its consumer in between.
+        """
+        parent = self._parent()
+        span = Span(self, next(self._ids), parent, name, category,
+                    parent.lane if parent else self.MAIN_LANE, args)
+        span.start, span.end = started, time.perf_counter()
+        with self._lock:
+            self.spans.append(span)
+        return span
+
+    def event(self, name, **args):
+        """Mark a moment (an error, a fallback) on the lane of the current span."""
+        parent = self._parent()
+        with self._lock:
+            self.events.append((name, parent.lane if parent else self.MAIN_LANE, time.perf_counter(), args))
+
+    def _micros(self, moment):
+        return round((moment - self._origin) * 1e6, 1)
+
+    def to_chrome_trace(self):
+        """The trace as a Chrome Trace Event Format object ({'traceEvents': [...]})."""
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: (span.start, span.span_id))
+            events = list(self.events)
+
+        lanes = {self.MAIN_LANE: 1}
+        for span in spans:
+            lanes.setdefault(span.lane, len(lanes) + 1)
+        for _, lane, _, _ in events:
+            lanes.setdefault(lane, len(lanes) + 1)
+
+        trace = [{'name': 'process_name', 'ph': 'M', 'pid': 1, 'tid': 0, 'args': {'name': self.name}}]
+        for lane, tid in lanes.items():
+            trace.append({'name': 'thread_name', 'ph': 'M', 'pid': 1, 'tid': tid, 'args': {'name': lane}})
+            trace.append({'name': 'thread_sort_index', 'ph': 'M', 'pid': 1, 'tid': tid, 'args': {'sort_index': tid}})
+
+        for span in spans:
+            args = dict(span.args, span_id=span.span_id)
+            if span.parent_id is not None:
+                args['parent_id'] = span.parent_id
+            trace.append({
+                'name': span.name, 'cat': span.category, 'ph': 'X', 'pid': 1, 'tid': lanes[span.lane],
+                'ts': self._micros(span.start), 'dur': round((span.end - span.start) * 1e6, 1),
+                'args': args
+            })
+        for name, lane, moment, args in events:
+            trace.append({
+                'name': name, 'cat': 'event', 'ph': 'i', 's': 't', 'pid': 1, 'tid': lanes[lane],
+                'ts': self._micros(moment), 'args': args
+            })
+        return {'traceEvents': trace, 'displayTimeUnit': 'ms'}
+
+    def save(self, path):
+        """Write the Chrome trace JSON to `path` and return the path."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_chrome_trace(), f, default=str)
+        print(f"[TRACE] Timeline saved to: {path}")
+        return path
+
+
+def trace_span(name, category, **args):
+    """A span in the trace of the enclosing span, or a no-op when nothing is being traced."""
+    parent = _current_span.get()
+    if parent is None:
+        return contextlib.nullcontext()
+    return parent.tracer.span(name, category, **args)
+
+
+def trace_interval(name, category, started, **args):
+    """Tracer.record in the trace of the enclosing span, if there is one."""
+    parent = _current_span.get()
+    if parent is not None:
+        parent.tracer.record(name, category, started, **args)
+
+
+def trace_event(name, **args):
+    """An instant event in the trace of the enclosing span, if there is one."""
+    parent = _current_span.get()
+    if parent is not None:
+        parent.tracer.event(name, **args)
@@ -9,11 +9,59 @@ import json
 import subprocess
 from datetime import datetime
 from avalon_ai_game import AvalonGame, GameController, OllamaAI, DeepSeekAPI, LocalModelAI, HumanPlayer
+from resilience import ResilientAI, resilience_state
+from prometheus_metrics import CONTENT_TYPE, Counter, Gauge, MetricsRegistry
 from threading import Thread, Event
 import time
 
 app = Flask(__name__)
 
+# Prometheus metrics served at /metrics
+metrics = MetricsRegistry()
+games_started = metrics.counter('avalon_games_started_total', 'Games started')
+games_completed = metrics.counter('avalon_games_completed_total', 'Games played to the end', ['winner'])
+games_failed = metrics.counter('avalon_games_failed_total', 'Games stopped by an error')
+active_game_threads = metrics.gauge('avalon_active_game_threads', 'Game threads currently running')
+backend_call_seconds = metrics.histogram(
+    'avalon_backend_call_duration_seconds',
+    'Time for a backend to make one decision, including queueing and retries', ['action', 'backend'])
+backend_call_errors = metrics.counter(
+    'avalon_backend_call_errors_total', 'Failed attempts during backend calls, retried or not', ['action', 'backend'])
+fallback_decisions = metrics.counter(
+    'avalon_fallback_decisions_total',
+    'Decisions the game made at random or by default because the backend gave no usable answer',
+    ['action', 'backend'])
+tokens_consumed = metrics.counter(
+    'avalon_tokens_total', 'Tokens reported by backends', ['backend', 'kind'])
+human_input_wait_seconds = metrics.histogram(
+    'avalon_human_input_wait_seconds', 'Time the game waited for a human decision', ['action'],
+    buckets=(1, 5, 10, 30, 60, 120, 300, 600))
+
+
+def endpoint_metrics():
+    """Per-endpoint counters and circuit state of the ResilientAI guards."""
+    counters = {
+        'calls': Counter('avalon_endpoint_calls_total', 'Calls admitted to the endpoint', ['endpoint']),
+        'failures': Counter('avalon_endpoint_failures_total', 'Failed attempts at the endpoint', ['endpoint']),
+        'unanswered': Counter(
+            'avalon_endpoint_unanswered_total', 'Calls that returned no answer without an error', ['endpoint']),
+        'retries': Counter('avalon_endpoint_retries_total', 'Attempts retried after a failure', ['endpoint']),
+        'throttled': Counter('avalon_endpoint_throttled_total', 'Rate-limit responses (429)', ['endpoint']),
+        'short_circuited': Counter(
+            'avalon_endpoint_short_circuited_total', 'Calls refused while the circuit was open', ['endpoint']),
+        'wait_s': Counter(
+            'avalon_endpoint_rate_limit_wait_seconds_total', 'Time calls waited for the rate limiter', ['endpoint'])
+    }
+    circuit_open = Gauge('avalon_endpoint_circuit_open', "1 while the endpoint's circuit is open", ['endpoint'])
+    for endpoint, state in resilience_state().items():
+        for name, counter in counters.items():
+            counter.inc(state[name], endpoint=endpoint)
+        circuit_open.set(int(state['circuit']['state'] != 'closed'), endpoint=endpoint)
+    return list(counters.values()) + [circuit_open]
+
+
+metrics.add_collector(endpoint_metrics)
+
 # Global variable to track running game
 running_game = {
     'is_running': False,
@@ -36,6 +84,22 @@ def load_env_api_key():
                     return line.strip().split('=', 1)[1]
     return os.environ.get('DEEPSEEK_API_KEY')
 
+def record_backend_call(call):
+    """Callback to count a backend call's latency, errors and tokens."""
+    action, backend = call['action'], call['backend']
+    backend_call_seconds.observe(call['latency_ms'] / 1000, action=action, backend=backend)
+    if call['errors']:
+        backend_call_errors.inc(call['errors'], action=action, backend=backend)
+    if call['prompt_tokens'] is not None:
+        tokens_consumed.inc(call['prompt_tokens'], backend=backend, kind='prompt')
+        tokens_consumed.inc(call['completion_tokens'] or 0, backend=backend, kind='completion')
+    if call.get('cached_tokens'):
+        tokens_consumed.inc(call['cached_tokens'], backend=backend, kind='cached')
+
+def record_fallback(action_type, backend):
+    """Callback to count a decision the game made itself after a backend gave no usable answer."""
+    fallback_decisions.inc(action=action_type, backend=backend)
+
 def handle_log_action(message):
     """Callback to handle game log updates."""
     global running_game
@@ -54,7 +118,9 @@ def handle_human_input(player_name, action_type, **kwargs):
     
     # Clear event and wait for input
     running_game['input_event'].clear()
+    started = time.perf_counter()
     running_game['input_event'].wait()
+    human_input_wait_seconds.observe(time.perf_counter() - started, action=action_type)
     
     # Get response and clear state
     response = running_game['input_response']
@@ -67,6 +133,8 @@ def run_game_thread(config):
     """Run game in a separate thread"""
     global running_game
 
+    games_started.inc()
+    active_game_threads.inc()
     try:
         running_game['status'] = 'initializing'
 
@@ -87,11 +155,11 @@ def run_game_thread(config):
         if user_mode == 'play':
             player_ais.append(HumanPlayer(name=player_names[0]))
         else:
-            player_ais.append(DeepSeekAPI(api_key=api_key, model='deepseek-chat'))
+            player_ais.append(ResilientAI(DeepSeekAPI(api_key=api_key, model='deepseek-chat')))
             
         # Players 1-5 - Fixed DeepSeek AI
         for i in range(1, 6):
-            player_ais.append(DeepSeekAPI(api_key=api_key, model='deepseek-chat'))
+            player_ais.append(ResilientAI(DeepSeekAPI(api_key=api_key, model='deepseek-chat')))
 
         # Run the game
         running_game['status'] = 'running'
@@ -102,6 +170,10 @@ def run_game_thread(config):
         
         # Set log handler for status updates
         controller.set_log_handler(handle_log_action)
+
+        # Count backend calls for /metrics
+        controller.set_call_handler(record_backend_call)
+        controller.set_fallback_handler(record_fallback)
         
         controller.run_game()
 
@@ -109,14 +181,17 @@ def run_game_thread(config):
         running_game['status'] = 'completed'
         running_game['game_id'] = controller.logger.game_log['game_id']
         running_game['log_path'] = os.path.join('logs', f"game_{running_game['game_id']}.json")
+        games_completed.inc(winner=controller.logger.game_log['final_result']['winner'])
 
     except Exception as e:
+        games_failed.inc()
         running_game['status'] = 'error'
         running_game['error'] = str(e)
         print(f"Game error: {e}")
 
     finally:
         running_game['is_running'] = False
+        active_game_threads.dec()
 
 @app.route('/')
 def index():
@@ -266,6 +341,16 @@ def check_ollama():
     except Exception as e:
         return jsonify({'available': False, 'models': [], 'error': str(e)})
 
+@app.route('/api/backends')
+def backend_status():
+    """Rate limit, retry and circuit breaker state per backend endpoint"""
+    return jsonify(resilience_state())
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Game, backend call and human input metrics in the Prometheus text format"""
+    return metrics.render(), 200, {'Content-Type': CONTENT_TYPE}
+
 def find_free_port(start_port=5000, max_port=5010):
     """Find a free port to use"""
     import socket